@@ -0,0 +1,241 @@
+"""
+Throughput and peak-memory benchmarks for the parse, transform and load stages.
+
+Invoices come from benchmarks/synthetic_invoices.py, so every run at a given
+scale and seed processes the same data. For each scale the suite measures:
+
+    parse      provider regex parsers on generated bill text -> bronze DataFrames
+    parse_pdf  the full parse stage on real generated PDFs (only with --pdfs)
+    transform  run_transform_stage on the bronze DataFrames -> silver
+    load       run_load_stage on the silver DataFrames, writing the gold layer
+
+Each stage is timed on its own pass, then re-run under tracemalloc to record
+its peak Python/NumPy allocation, so tracing does not distort the timings.
+The transform and load stages also report the memory per row of the silver
+and gold frames they return (--dtypes optimized for the compact dtypes).
+Stages use config/config.example.yaml unless --config is given.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark                            # 100, 1,000 and 10,000 invoices
+    python -m benchmarks.pipeline_benchmark --scales 100000 1000000 --output bench.json
+    python -m benchmarks.pipeline_benchmark --pdfs 500                 # also parse 500 real PDFs per utility
+    python -m benchmarks.pipeline_benchmark --pdfs 500 --extractor pdfminer  # ... with another text backend
+    python -m benchmarks.pipeline_benchmark --dtypes optimized         # silver/gold in categoricals and small ints
+    python -m benchmarks.pipeline_benchmark --baseline bench.json      # exit 1 on a regression
+
+Scales are invoices per utility (up to 1M).
+"""
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+import main as pipeline
+from parse.registry import get_parser
+from transform.standardize_df_cols import bytes_per_row
+from benchmarks.synthetic_invoices import UTILITY_TYPES, generate_invoices, write_invoice_pdfs
+
+DEFAULT_SCALES = [100, 1000, 10000]
+DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "config" / "config.example.yaml"
+
+
+def parse_texts(utility_type, invoices):
+    """Run a provider parser over (file path, text) pairs, as parse_pdf_files does after extraction."""
+    parser = get_parser(utility_type)
+    table_data = parser.new_rows()
+    for file_path, text in invoices:
+        table_data.extend(parser.parse(text, file_path))
+    return table_data.to_frame()
+
+
+def measure(func, trace_memory=True):
+    """
+    Time func(), then run it again under tracemalloc for its peak allocation.
+
+    Returns:
+        tuple: (result of the timed call, seconds, peak MB or None)
+    """
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - started
+
+        peak_mb = None
+        if trace_memory:
+            tracemalloc.start()
+            try:
+                func()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            peak_mb = peak / (1024 * 1024)
+    return result, seconds, peak_mb
+
+
+def _record(results, scale, stage, invoices, rows, seconds, peak_mb, frames=None):
+    entry = {
+        "scale": scale,
+        "stage": stage,
+        "invoices": invoices,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "invoices_per_s": round(invoices / max(seconds, 1e-9), 1),
+        "rows_per_s": round(rows / max(seconds, 1e-9), 1),
+        "peak_mb": None if peak_mb is None else round(peak_mb, 2),
+        # Memory per row of the DataFrames the stage returns
+        "bytes_per_row": None,
+    }
+    if frames:
+        total_rows = sum(len(df) for df in frames)
+        if total_rows:
+            entry["bytes_per_row"] = round(sum(bytes_per_row(df) * len(df) for df in frames) / total_rows, 1)
+    results.append(entry)
+    peak = "-" if peak_mb is None else f"{peak_mb:.1f} MB"
+    per_row = "" if entry["bytes_per_row"] is None else f"  {entry['bytes_per_row']:,.0f} bytes/row"
+    print(f"  {stage:<10} {invoices:>9} invoices {rows:>9} rows  {seconds:8.3f}s  "
+          f"{entry['invoices_per_s']:>11,.0f} invoices/s  peak {peak}{per_row}")
+
+
+def _configure_pipeline(config, work_dir):
+    """Point main.py's stage functions at a scratch copy of the data folders."""
+    pipeline.config = config
+    pipeline.BASE_DIR = Path(work_dir)
+    for key, path in config["paths"].items():
+        target = Path(work_dir) / path
+        # Keys ending in _raw / _dir are folders; the rest are files inside one
+        folder = target if key.endswith(("_pdf_raw", "_dir")) else target.parent
+        folder.mkdir(parents=True, exist_ok=True)
+
+
+def run_scale(scale, config, seed=0, pdfs=0, trace_memory=True):
+    """Benchmark every stage for scale invoices per utility. Returns a list of result dicts."""
+    results = []
+    total_invoices = scale * len(UTILITY_TYPES)
+    print(f"=== {scale:,} invoices per utility ===")
+
+    invoices = {utility: list(generate_invoices(utility, scale, seed)) for utility in UTILITY_TYPES}
+    bronze, seconds, peak_mb = measure(
+        lambda: {utility: parse_texts(utility, invoices[utility]) for utility in UTILITY_TYPES}, trace_memory
+    )
+    del invoices
+    bronze_rows = sum(len(df) for df in bronze.values())
+    _record(results, scale, "parse", total_invoices, bronze_rows, seconds, peak_mb)
+
+    with tempfile.TemporaryDirectory(prefix="utility-bench-") as work_dir:
+        _configure_pipeline(config, work_dir)
+
+        if pdfs:
+            pdf_count = min(pdfs, scale)
+            for utility in UTILITY_TYPES:
+                write_invoice_pdfs(Path(work_dir) / config["paths"][f"{utility}_pdf_raw"], utility, pdf_count, seed)
+            parsed, seconds, peak_mb = measure(lambda: pipeline.run_parse_stage(persist=False), trace_memory)
+            rows = sum(len(df) for df in parsed.values())
+            _record(results, scale, "parse_pdf", pdf_count * len(UTILITY_TYPES), rows, seconds, peak_mb)
+
+        silver, seconds, peak_mb = measure(
+            lambda: pipeline.run_transform_stage(bronze, persist=False), trace_memory
+        )
+        _record(results, scale, "transform", total_invoices, bronze_rows, seconds, peak_mb, silver.values())
+
+        gold, seconds, peak_mb = measure(lambda: pipeline.run_load_stage(silver, persist=True), trace_memory)
+        _record(results, scale, "load", total_invoices, len(gold["gold"]), seconds, peak_mb, [gold["gold"]])
+
+    return results
+
+
+def find_regressions(results, baseline, tolerance=0.2):
+    """
+    Compare results with a previous run's results.
+
+    A stage regresses when its invoices/s drops, or its peak memory or the
+    memory per row of its output grows, by more than tolerance (a fraction)
+    at the same scale.
+
+    Returns:
+        list: Human-readable regression descriptions
+    """
+    previous = {(entry["scale"], entry["stage"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["scale"], entry["stage"]))
+        if before is None:
+            continue
+        label = f"{entry['stage']} @ {entry['scale']:,}"
+        if entry["invoices_per_s"] < before["invoices_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: {entry['invoices_per_s']:,.0f} invoices/s (was {before['invoices_per_s']:,.0f})"
+            )
+        if entry["peak_mb"] and before.get("peak_mb") and entry["peak_mb"] > before["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{label}: peak {entry['peak_mb']:.1f} MB (was {before['peak_mb']:.1f} MB)")
+        if (entry.get("bytes_per_row") and before.get("bytes_per_row")
+                and entry["bytes_per_row"] > before["bytes_per_row"] * (1 + tolerance)):
+            regressions.append(
+                f"{label}: {entry['bytes_per_row']:,.0f} bytes/row (was {before['bytes_per_row']:,.0f})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parse, transform and load stages")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Invoices per utility for each run (default: 100 1000 10000)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic invoices")
+    parser.add_argument("--pdfs", type=int, default=0,
+                        help="Also benchmark the real parse stage on up to this many generated PDFs per utility")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="Pipeline config to benchmark with")
+    parser.add_argument("--extractor", help="PDF text backend for the parse_pdf stage (default: parse.extractor)")
+    parser.add_argument("--dtypes", choices=["standard", "optimized"],
+                        help="Silver/gold dtypes for the transform and load stages (default: transform.dtypes)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed throughput drop / memory growth before a regression is reported (default: 0.2)")
+    args = parser.parse_args()
+
+    config = pipeline.load_config(args.config)
+    # Generated PDFs are parsed fresh on every pass
+    config.setdefault("parse", {}).setdefault("text_cache", {})["enabled"] = False
+    if args.extractor:
+        config["parse"]["extractor"] = args.extractor
+    if args.dtypes:
+        config.setdefault("transform", {})["dtypes"] = args.dtypes
+
+    results = []
+    for scale in args.scales:
+        results.extend(run_scale(scale, config, seed=args.seed, pdfs=args.pdfs, trace_memory=not args.no_memory))
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "seed": args.seed,
+            "extractor": config["parse"].get("extractor"),
+            "dtypes": config.get("transform", {}).get("dtypes", "standard"),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            for regression in regressions:
+                print(f"✗ Regression: {regression}")
+            sys.exit(1)
+        print("✓ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Cold start-up budget for each pipeline command.
+
+Every command is started in fresh interpreters, which import main.py, read
+the config and import the modules the command uses (main.STAGE_IMPORTS),
+exactly as `python main.py --stage <stage>` does before its first line of
+work. The fastest of --repeat runs is compared against the command's budget.
+
+A command also fails when it loads a heavy library it has no use for (e.g.
+the load stage importing pdfplumber or the Google client), since that is
+what a stray top-level import in main.py looks like.
+
+Usage:
+    python -m benchmarks.startup_benchmark                      # default budgets, 5 runs per command
+    python -m benchmarks.startup_benchmark --budget load=0.5 --repeat 10
+    python -m benchmarks.startup_benchmark --output startup.json
+
+Exits with status 1 if a command is over budget or loads a forbidden library.
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIG = REPO_DIR / "config" / "config.example.yaml"
+
+HEAVY_LIBRARIES = ["pandas", "pyarrow", "pdfplumber", "googleapiclient", "google_auth_oauthlib"]
+
+# Seconds from process start until the command could start working; "cli" is
+# main.py with no stage modules (argument parsing, --help, config loading)
+DEFAULT_BUDGETS = {
+    "cli": 0.25,
+    "extract": 0.6,
+    "parse": 1.0,
+    "transform": 1.0,
+    "load": 1.0,
+    "query": 1.0,
+}
+
+# Libraries each command must not import
+FORBIDDEN = {
+    "cli": ["pandas", "pdfplumber", "googleapiclient"],
+    "extract": ["pandas", "pdfplumber"],
+    "parse": ["googleapiclient"],
+    "transform": ["pdfplumber", "googleapiclient"],
+    "load": ["pdfplumber", "googleapiclient"],
+    "query": ["pdfplumber", "googleapiclient"],
+}
+
+# Run in the child interpreter: argv = [config path, stages...]
+CHILD = """
+import sys, json, time
+started = time.perf_counter()
+import main
+main.load_config(sys.argv[1])
+main.preload_stages(sys.argv[2:])
+seconds = time.perf_counter() - started
+print(json.dumps({"import_seconds": seconds, "libraries": [name for name in %r if name in sys.modules]}))
+""" % HEAVY_LIBRARIES
+
+
+def measure_command(command, config_path, repeat=5):
+    """Start command repeat times in fresh interpreters. Returns the fastest run."""
+    stages = [] if command == "cli" else [command]
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, str(config_path), *stages],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        run["process_seconds"] = time.perf_counter() - started
+        runs.append(run)
+    return min(runs, key=lambda run: run["process_seconds"])
+
+
+def parse_budgets(overrides):
+    budgets = dict(DEFAULT_BUDGETS)
+    for override in overrides or []:
+        command, _, seconds = override.partition("=")
+        if command not in budgets or not seconds:
+            raise SystemExit(f"Invalid budget '{override}', expected one of {', '.join(budgets)}=SECONDS")
+        budgets[command] = float(seconds)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold start-up time of each pipeline command")
+    parser.add_argument("--commands", nargs="+", choices=list(DEFAULT_BUDGETS), default=list(DEFAULT_BUDGETS),
+                        help="Commands to measure (default: all)")
+    parser.add_argument("--budget", action="append", metavar="COMMAND=SECONDS",
+                        help="Override a command's budget (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command; the fastest counts (default: 5)")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="Pipeline config to load")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    budgets = parse_budgets(args.budget)
+
+    results = []
+    failures = []
+    for command in args.commands:
+        run = measure_command(command, args.config, args.repeat)
+        forbidden = [name for name in FORBIDDEN[command] if name in run["libraries"]]
+        over_budget = run["process_seconds"] > budgets[command]
+        results.append({"command": command, "budget_seconds": budgets[command], **run})
+
+        status = "✗" if over_budget or forbidden else "✓"
+        print(f"{status} {command:<10} {run['process_seconds']:6.3f}s start-up ({run['import_seconds']:.3f}s imports, "
+              f"budget {budgets[command]:.2f}s)  loads: {', '.join(run['libraries']) or '-'}")
+        if over_budget:
+            failures.append(f"{command} took {run['process_seconds']:.3f}s, over its {budgets[command]:.2f}s budget")
+        if forbidden:
+            failures.append(f"{command} imports {', '.join(forbidden)}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+    if failures:
+        for failure in failures:
+            print(f"✗ Start-up budget exceeded: {failure}")
+        sys.exit(1)
+    print("✓ All commands within their start-up budget")
+
+
+if __name__ == "__main__":
+    main()
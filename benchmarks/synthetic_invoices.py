@@ -0,0 +1,175 @@
+"""
+Deterministic synthetic invoices for the benchmarks.
+
+Generates bill text laid out the way each provider's parser expects
+(parse/parse_electricity.py, parse_gas.py, parse_water.py), and optionally
+writes it out as real single-page PDFs that pdfplumber can read. Invoice i
+of a utility is the same for a given seed whatever the total count, so runs
+at different scales share their first invoices.
+
+Example:
+    for file_path, text in generate_invoices("gas", 1000, seed=0):
+        rows = parser.parse(text, file_path)
+
+    pdf_paths = write_invoice_pdfs("/tmp/bench/gas", "gas", 100)
+"""
+import os
+import random
+from pathlib import Path
+
+UTILITY_TYPES = ("elec", "gas", "water")
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+MONTH_DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+FIRST_YEAR = 2015
+
+INVOICE_PREFIXES = {"elec": "E", "gas": "G", "water": "W"}
+
+
+def _billing_month(index):
+    """Year and month index (0-11) of an invoice; invoices cycle through 20 years of bills."""
+    month_number = index % (20 * 12)
+    return FIRST_YEAR + month_number // 12, month_number % 12
+
+
+def _next_month(year, month):
+    return (year + 1, 0) if month == 11 else (year, month + 1)
+
+
+def _elec_lines(rng, year, month):
+    issue_year, issue_month = _next_month(year, month)
+    usage = rng.randint(100, 900)
+    rate = rng.randint(20, 35) / 100
+    days = MONTH_DAYS[month]
+    return [
+        f"Tax Invoice issuedate {rng.randint(1, 28)}{MONTHS[issue_month].upper()}{issue_year % 100:02d}",
+        f"ElectricityCharges ${rng.uniform(60, 400):.2f}",
+        f"YourPlanSingleRate From01{MONTHS[month]}{year}to{days}{MONTHS[month]}{year}",
+        f"Total Anytime {usage} ${rate:.2f} ${usage * rate:.2f}",
+        f"Service to Property Charge {days} days $1.10 /day ${days * 1.10:.2f}",
+    ]
+
+
+def _gas_lines(rng, year, month):
+    issue_year, issue_month = _next_month(year, month)
+    lines = [
+        f"IssueDate {rng.randint(1, 28)}{MONTHS[issue_month]}{issue_year}",
+        f"GasCharges ${rng.uniform(40, 300):.2f}",
+    ]
+    # One or two billing periods, each with up to three steps and its own season total
+    period_month = month
+    for _ in range(rng.randint(1, 2)):
+        days = MONTH_DAYS[period_month]
+        lines.append(f"From01{MONTHS[period_month]}{year}to{days}{MONTHS[period_month]}{year}")
+        for step in range(1, rng.randint(1, 3) + 1):
+            usage = rng.randint(10, 2000)
+            rate = rng.randint(2, 4) / 100
+            lines.append(f"Step{step} {usage} ${rate:.2f} ${usage * rate:.2f}")
+        lines.append("TotalSummer" if period_month >= 10 or period_month <= 3 else "TotalWinter")
+        lines.append(f"ServicetoPropertyCharge {days}days $0.80/day ${days * 0.80:.2f}")
+        period_month = min(period_month + 1, 11)
+    return lines
+
+
+def _water_lines(rng, year, month):
+    end_year, end_month = _next_month(*_next_month(year, month))
+    lines = [
+        f"Issuedate {rng.randint(1, 28)}{MONTHS[end_month]}{end_year}",
+        f"Totalusagecharges ${rng.uniform(20, 200):.2f}",
+        f"From1{MONTHS[month]}{year}-28{MONTHS[end_month]}{end_year}",
+    ]
+
+    def steps():
+        step_lines = []
+        for step in range(1, rng.randint(1, 2) + 1):
+            usage = round(rng.uniform(1, 40), 1)
+            price = 2.10 if step == 1 else 3.00
+            step_lines.append(f"STEP{step} usage {usage}kL x ${price:.2f} = ${usage * price:.2f}")
+        return step_lines
+
+    if rng.random() < 0.5:
+        # Price change: steps split into dated sub-periods
+        lines.append(f"01/{month + 1:02d}/{year}-15/{month + 1:02d}/{year}")
+        lines.extend(steps())
+        lines.append(f"16/{month + 1:02d}/{year}-28/{month + 1:02d}/{year}")
+        lines.extend(steps())
+    else:
+        lines.extend(steps())
+    return lines
+
+
+LINE_BUILDERS = {"elec": _elec_lines, "gas": _gas_lines, "water": _water_lines}
+
+
+def invoice_lines(utility_type, index, seed=0):
+    """
+    Return (file name, text lines) of synthetic invoice number index.
+
+    Parameters:
+        utility_type (str): 'elec', 'gas' or 'water'
+        index (int): Invoice number within the utility
+        seed (int): Seed of the generated data set
+    """
+    rng = random.Random(f"{seed}-{utility_type}-{index}")
+    year, month = _billing_month(index)
+    file_name = f"{INVOICE_PREFIXES[utility_type]}{index:07d}.pdf"
+    return file_name, LINE_BUILDERS[utility_type](rng, year, month)
+
+
+def generate_invoices(utility_type, count, seed=0):
+    """
+    Yield (file path, bill text) for count invoices, lines joined like extracted
+    PDF text. Paths are '<utility_type>/<file name>', since the parsers take
+    utility_type from the parent folder and invoice_number from the file name.
+    """
+    for index in range(count):
+        file_name, lines = invoice_lines(utility_type, index, seed)
+        yield os.path.join(utility_type, file_name), "\n".join(lines)
+
+
+def write_pdf(path, lines):
+    """Write text lines as a minimal single-page PDF using the built-in Helvetica font."""
+
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    content = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({escape(line)}) Tj T*" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+
+    with open(path, "w", encoding="latin-1") as f:
+        f.write(pdf)
+
+
+def write_invoice_pdfs(folder, utility_type, count, seed=0):
+    """
+    Write count synthetic invoices of a utility as PDFs into folder.
+
+    Returns:
+        list: Paths of the written PDFs
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        file_name, lines = invoice_lines(utility_type, index, seed)
+        path = os.path.join(folder, file_name)
+        write_pdf(path, lines)
+        paths.append(path)
+    return paths
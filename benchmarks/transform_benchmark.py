@@ -0,0 +1,157 @@
+"""
+Timings of the transform engines.
+
+Runs every function of transform/data_preprocess.py and its counterpart in
+transform/vectorized_preprocess.py on the same inputs and times both.
+tests/test_vectorized_preprocess.py checks on the same generated inputs that
+their outputs are identical.
+
+Inputs are generated invoices covering the awkward cases: several steps per
+invoice, unparseable and missing dates, missing invoice numbers and missing
+service columns.
+
+Usage:
+    python -m benchmarks.transform_benchmark                # default 20,000 invoices per utility
+    python -m benchmarks.transform_benchmark --invoices 200000 --seed 7
+"""
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from transform import data_preprocess, vectorized_preprocess
+
+SUMMER_MONTHS = {"start_month": 11, "end_month": 4}
+
+def _random_dates(rng, n, missing_rate=0.02, bad_rate=0.01):
+    """dd/mm/yyyy strings with some missing and some unparseable values."""
+    days = rng.integers(0, 3 * 365, size=n)
+    dates = (pd.Timestamp("2022-01-01") + pd.to_timedelta(days, unit="D")).strftime("%d/%m/%Y")
+    values = np.array(dates, dtype=object)
+    values[rng.random(n) < missing_rate] = None
+    values[rng.random(n) < bad_rate] = "not a date"
+    return values
+
+
+def make_gas_frame(rng, invoices):
+    steps = rng.integers(1, 4, size=invoices)
+    numbers = np.repeat([f"GAS{i:07d}" for i in range(invoices)], steps).astype(object)
+    n = len(numbers)
+    step_number = np.concatenate([np.arange(1, s + 1) for s in steps])
+    # Every invoice keeps at least one parseable step date, as the legacy function requires,
+    # so only later steps lose their invoice number
+    first_step = step_number == 1
+    numbers[(rng.random(n) < 0.005) & ~first_step] = None
+    step_start = np.where(first_step, _random_dates(rng, n, 0, 0), _random_dates(rng, n))
+    step_end = np.where(first_step, _random_dates(rng, n, 0, 0), _random_dates(rng, n))
+    return pd.DataFrame({
+        "invoice_number": numbers,
+        "utility_type": "gas",
+        "invoice_date": _random_dates(rng, n),
+        "invoice_start": None,
+        "invoice_end": None,
+        "step_number": step_number,
+        "step_start": step_start,
+        "step_end": step_end,
+        "usage": rng.random(n) * 500,
+        "rate": rng.random(n),
+        "charge": rng.random(n) * 200,
+        "season": rng.choice(["TotalWinter", "TotalSummer", " TotalWinter ", None], size=n),
+    })
+
+
+def make_elec_frame(rng, invoices):
+    return pd.DataFrame({
+        "invoice_number": [f"EL{i:07d}" for i in range(invoices)],
+        "utility_type": "elec",
+        "invoice_date": _random_dates(rng, invoices),
+        "invoice_start": _random_dates(rng, invoices),
+        "invoice_end": _random_dates(rng, invoices),
+        "step_number": np.nan,
+        "step_start": None,
+        "step_end": None,
+        "usage": rng.random(invoices) * 900,
+        "rate": rng.random(invoices),
+        "charge": rng.random(invoices) * 300,
+        "season": None,
+    })
+
+
+def make_water_frame(rng, invoices, with_service_columns=True):
+    steps = rng.integers(1, 3, size=invoices)
+    n = int(steps.sum())
+    df = pd.DataFrame({
+        "invoice_number": np.repeat([f"WA{i:07d}" for i in range(invoices)], steps),
+        "utility_type": "water",
+        "invoice_date": _random_dates(rng, n),
+        "invoice_start": _random_dates(rng, n),
+        "invoice_end": _random_dates(rng, n),
+        "step_number": np.concatenate([np.arange(1, s + 1) for s in steps]),
+        "step_start": _random_dates(rng, n, missing_rate=0.3),
+        "step_end": _random_dates(rng, n, missing_rate=0.3),
+        "usage": rng.random(n) * 50,
+        "rate": rng.random(n) * 3,
+        "charge": rng.random(n) * 100,
+        "season": None,
+    })
+    if with_service_columns:
+        service_days = rng.integers(28, 95, size=n).astype(float)
+        service_days[rng.random(n) < 0.1] = np.nan
+        df["service_days"] = service_days
+        df["service_rate"] = rng.random(n)
+        df["service_charge"] = np.where(rng.random(n) < 0.1, np.nan, rng.random(n) * 60)
+    return df
+
+
+def transform_cases(rng, invoices):
+    """Yield (name, function name, argument builder) for every function both engines implement."""
+    gas = make_gas_frame(rng, invoices)
+    elec = make_elec_frame(rng, invoices)
+    water = make_water_frame(rng, invoices)
+    water_no_service = make_water_frame(rng, invoices, with_service_columns=False)
+    dates = pd.to_datetime(pd.Series(_random_dates(rng, invoices)), errors="coerce", dayfirst=True)
+
+    yield "gas invoice start/end", "fill_gas_invoice_start_end", lambda: (gas.copy(),)
+    yield "gas season cleanup", "clean_gas_season", lambda: (gas.copy(),)
+    yield "elec step fields", "fill_electricity_step_fields", lambda: (elec.copy(),)
+    yield "water service columns", "fill_missing_service_columns_for_water", lambda: (water.copy(),)
+    yield "water service columns (absent)", "fill_missing_service_columns_for_water", lambda: (water_no_service.copy(),)
+    yield "water step dates", "fill_water_step_dates", lambda: (water.copy(),)
+    yield "season classification", "classify_season_series", lambda: (dates.copy(), SUMMER_MONTHS)
+
+
+def _timed(func, args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def run_benchmark(invoices=20000, seed=0):
+    """
+    Time both engines on generated data.
+
+    Returns:
+        dict: {case name: (legacy seconds, vectorized seconds)}
+    """
+    rng = np.random.default_rng(seed)
+    timings = {}
+    for name, func_name, build_args in transform_cases(rng, invoices):
+        _, legacy_seconds = _timed(getattr(data_preprocess, func_name), build_args())
+        _, vectorized_seconds = _timed(getattr(vectorized_preprocess, func_name), build_args())
+        timings[name] = (legacy_seconds, vectorized_seconds)
+        speedup = legacy_seconds / max(vectorized_seconds, 1e-9)
+        print(f"✓ {name}: {legacy_seconds * 1000:.1f} ms -> {vectorized_seconds * 1000:.1f} ms ({speedup:.1f}x)")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the legacy and vectorized transform engines")
+    parser.add_argument("--invoices", type=int, default=20000, help="Invoices generated per utility")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated data")
+    args = parser.parse_args()
+    run_benchmark(args.invoices, args.seed)
+
+
+if __name__ == "__main__":
+    main()
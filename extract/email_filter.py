@@ -1,5 +1,27 @@
-def search_emails(service, query):
-    """Search Gmail messages using a query and return list of message IDs."""
-    results = service.users().messages().list(userId='me', q=query).execute()
-    messages = results.get('messages', [])
-    return messages
\ No newline at end of file
+# Partial response of messages.list: only the ids and the next page token
+LIST_FIELDS = "messages/id,nextPageToken"
+
+
+def search_emails(service, query, after=None, page_size=500, http=None):
+    """
+    Search Gmail messages using a query and return list of message IDs.
+
+    Follows nextPageToken until every page has been read. When after (epoch
+    seconds) is given, only messages received after that time are listed.
+    Pass http to run the search from a thread other than the service's own.
+    Responses carry only the fields used (LIST_FIELDS).
+    """
+    if after is not None:
+        query = f"{query} after:{int(after)}"
+
+    messages = []
+    page_token = None
+    while True:
+        results = service.users().messages().list(
+            userId='me', q=query, maxResults=page_size, pageToken=page_token, fields=LIST_FIELDS
+        ).execute(http=http)
+        messages.extend(results.get('messages', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+    return messages
@@ -0,0 +1,118 @@
+import time
+import random
+
+from googleapiclient.errors import HttpError
+
+# Gmail accepts up to 100 calls per batch but recommends 50 to avoid rate limiting
+MAX_BATCH_SIZE = 100
+
+# Statuses worth retrying; anything else (e.g. 404 for a deleted message) fails immediately
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    """Return True if a request that failed with error may succeed on retry."""
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUSES
+    # Connection resets, timeouts and similar transport errors
+    return isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+
+def execute_with_backoff(request, http=None, max_retries=5, backoff_seconds=1.0, max_backoff_seconds=60.0):
+    """
+    Execute a single Gmail API request, retrying 429/5xx and transport errors
+    with exponential backoff and jitter.
+
+    Parameters:
+        request: googleapiclient HttpRequest
+        http: Optional HTTP object to send the request on (one per thread)
+        max_retries (int): Retries before the last error is raised
+        backoff_seconds (float): Delay before the first retry, doubled each retry
+        max_backoff_seconds (float): Upper bound for a single delay
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return request.execute(http=http)
+        except Exception as error:
+            if attempt == max_retries or not is_retryable(error):
+                raise
+            delay = min(max_backoff_seconds, backoff_seconds * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def execute_batched(service, requests, batch_size=50, max_retries=3, backoff_seconds=1.0, on_result=None,
+                    http=None):
+    """
+    Execute Gmail API requests grouped into batch HTTP requests.
+
+    Each sub-request succeeds or fails on its own. Failed sub-requests with a
+    retryable status are collected and re-sent in a later batch, with
+    exponential backoff between rounds.
+
+    Parameters:
+        service: Gmail API service object
+        requests (dict): Mapping of key -> zero-argument callable building the
+            HttpRequest, e.g. lambda: service.users().messages().get(...)
+        batch_size (int): Sub-requests per batch (max 100)
+        max_retries (int): Retry rounds for retryable failures
+        backoff_seconds (float): Delay before the first retry round, doubled each round
+        on_result (callable): Optional callback(key, response). When given,
+            responses are handed over as each batch completes instead of
+            being kept in the returned results dict
+        http: Optional HTTP object to send the batches on (one per thread)
+
+    Returns:
+        tuple: (results, errors) dicts keyed like requests
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    results = {}
+    errors = {}
+    pending = list(requests)
+
+    for attempt in range(max_retries + 1):
+        if attempt > 0:
+            time.sleep(backoff_seconds * 2 ** (attempt - 1))
+
+        failed = []
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            succeeded = set()
+            chunk_errors = {}
+
+            def callback(request_id, response, exception, chunk=chunk, succeeded=succeeded, chunk_errors=chunk_errors):
+                key = chunk[int(request_id)]
+                if exception is not None:
+                    chunk_errors[key] = exception
+                    return
+                succeeded.add(key)
+                if on_result is not None:
+                    on_result(key, response)
+                else:
+                    results[key] = response
+
+            batch = service.new_batch_http_request(callback=callback)
+            for i, key in enumerate(chunk):
+                batch.add(requests[key](), request_id=str(i))
+
+            try:
+                batch.execute(http=http)
+            except Exception as e:
+                # The batch itself failed in transport; every sub-request without a response is retried
+                for key in chunk:
+                    if key not in succeeded:
+                        chunk_errors.setdefault(key, e)
+
+            for key in succeeded:
+                errors.pop(key, None)
+            for key, error in chunk_errors.items():
+                errors[key] = error
+                if is_retryable(error):
+                    failed.append(key)
+
+        pending = failed
+        if not pending:
+            break
+        if attempt < max_retries:
+            print(f"Retrying {len(pending)} failed Gmail requests...")
+
+    return results, errors
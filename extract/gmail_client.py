@@ -0,0 +1,147 @@
+import re
+import threading
+from contextlib import contextmanager
+
+from extract.email_filter import search_emails
+from extract.gmail_connector import authorized_http
+from extract.pdf_downloader import fetch_messages
+
+FROM_TERM_RE = re.compile(r"\bfrom:(\S+)", re.IGNORECASE)
+
+
+def sender_address(query):
+    """The from: address of a Gmail search query (lower case), or None if it has none."""
+    match = FROM_TERM_RE.search(query or "")
+    return match.group(1).lower() if match else None
+
+
+def message_sender(message):
+    """The From header of a fetched message (lower case), or '' if it has none."""
+    for header in message.get("payload", {}).get("headers", []):
+        if header.get("name", "").lower() == "from":
+            return header.get("value", "").lower()
+    return ""
+
+
+def _sender_order(message):
+    """Sort key of fetched messages: sender, then receive time."""
+    return message_sender(message), int(message.get("internalDate", 0))
+
+
+class GmailClient:
+    """
+    One Gmail session shared by the extract tracks, and by the daemon across polls.
+
+    HTTP connections are pooled: each request borrows an idle authorized
+    connection (connection()) and hands it back afterwards, so calls made
+    one after another reuse a single keep-alive connection. Concurrent calls
+    each get a connection of their own, since httplib2 connections are not
+    thread-safe; the pool grows to the number of concurrent calls.
+
+    search_by_sender() lists the messages of every provider query with one
+    combined OR search, fetches their headers and attachment parts in batch
+    requests, and sorts them back to the providers by sender.
+
+    Example:
+        client = GmailClient(connect_gmail(...))
+        emails, incomplete = client.search_by_sender({"elec": "from:bills@power.example has:attachment"})
+        with client.connection() as http:
+            ...
+    """
+
+    def __init__(self, service, http_factory=None):
+        """
+        Parameters:
+            service: Gmail API service object (connect_gmail)
+            http_factory (callable): Returns a new authorized HTTP object
+                (default: authorized_http(service))
+        """
+        self.service = service
+        self.http_factory = http_factory or (lambda: authorized_http(service))
+        self.connections_opened = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """Lend an idle HTTP connection (opening one if none is idle) for the duration of the block."""
+        with self._lock:
+            http = self._idle.pop() if self._idle else None
+        if http is None:
+            http = self.http_factory()
+            with self._lock:
+                self.connections_opened += 1
+        try:
+            yield http
+        finally:
+            with self._lock:
+                self._idle.append(http)
+
+    def search(self, query, after=None, page_size=500):
+        """List the messages matching query (search_emails) on a pooled connection."""
+        with self.connection() as http:
+            return search_emails(self.service, query, after=after, page_size=page_size, http=http)
+
+    def search_by_sender(self, queries: dict, after: dict = None, page_size=500, batch_size=50, max_retries=3):
+        """
+        Find the messages of several provider queries with one combined search.
+
+        Queries with a from: term are OR-ed into one search, listed from the
+        earliest of their after watermarks. The listed messages are fetched
+        (headers and attachment parts only) and each is given to the query
+        whose from: address appears in its From header, skipping messages
+        older than that query's own watermark. Queries without a from: term
+        cannot be told apart by sender and are searched on their own.
+
+        A message that cannot be fetched (e.g. deleted between the list and
+        the fetch) is reported and skipped; the others are still sorted to
+        their queries. Its sender is unknown, so the search of every combined
+        query is marked incomplete, and their watermarks should not advance.
+
+        Parameters:
+            queries (dict): {key: Gmail search query}
+            after (dict): {key: epoch seconds or None} (default: no watermarks)
+            page_size (int): Messages per list page
+            batch_size (int): Gmail API calls per batch request
+            max_retries (int): Retries for calls failing with 429/5xx
+
+        Returns:
+            tuple: ({key: messages}, set of keys whose search is incomplete).
+                Messages are sorted by sender then receive time. Fetched
+                messages carry their 'payload', so download_pdf_attachments
+                does not look them up again
+        """
+        after = after or {}
+        senders = {key: sender_address(query) for key, query in queries.items()}
+        combined = [key for key, sender in senders.items() if sender]
+        results = {key: self.search(query, after.get(key), page_size)
+                   for key, query in queries.items() if key not in combined}
+        incomplete = set()
+        if not combined:
+            return results, incomplete
+
+        watermarks = [after.get(key) for key in combined]
+        since = None if None in watermarks else min(watermarks)
+        query = "(" + " OR ".join(f"({queries[key]})" for key in combined) + ")"
+        listed = self.search(query, since, page_size)
+
+        with self.connection() as http:
+            fetched, errors = fetch_messages(self.service, listed, batch_size, max_retries, http)
+        for msg_id, error in errors.items():
+            print(f"✗ Failed to fetch message {msg_id}: {error}")
+
+        if errors:
+            # The sender of a message that could not be fetched is unknown
+            incomplete.update(combined)
+
+        for key in combined:
+            results[key] = []
+        for message in sorted(fetched.values(), key=_sender_order):
+            sender = message_sender(message)
+            for key in combined:
+                if senders[key] not in sender:
+                    continue
+                watermark = after.get(key)
+                if watermark is None or int(message.get("internalDate", 0)) // 1000 > watermark:
+                    results[key].append(message)
+        return results, incomplete
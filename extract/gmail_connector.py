@@ -1,12 +1,65 @@
 import os
-from googleapiclient.discovery import build
+import json
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.version import __version__ as CLIENT_VERSION
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
+from utils.atomic_write import atomic_write_text
 
-def connect_gmail(credentials_file='credentials.json', token_file='token.json'):
-    """Connect to Gmail API and return a service object."""
+
+# Parsed discovery documents by cache path, so reconnecting (e.g. in the daemon) skips the file too
+_discovery_documents = {}
+
+
+def load_discovery_document(discovery_cache):
+    """
+    Return the Gmail discovery document cached at discovery_cache, or None
+    if there is none yet or it was saved by another google-api-python-client
+    version (whose document may describe the API differently).
+    """
+    if discovery_cache in _discovery_documents:
+        return _discovery_documents[discovery_cache]
+    if not os.path.exists(discovery_cache):
+        return None
+    with open(discovery_cache) as f:
+        cached = json.load(f)
+    if cached.get("client_version") != CLIENT_VERSION:
+        return None
+    _discovery_documents[discovery_cache] = cached["document"]
+    return cached["document"]
+
+
+def save_discovery_document(discovery_cache, document):
+    """Cache a discovery document atomically, tagged with the client version."""
+    atomic_write_text(discovery_cache, json.dumps({"client_version": CLIENT_VERSION, "document": document}))
+    _discovery_documents[discovery_cache] = document
+
+
+def build_gmail_service(creds, discovery_cache=None):
+    """
+    Build the Gmail service. With discovery_cache (a JSON file path) the
+    discovery document is read from that file instead of being looked up
+    and parsed again; the first build saves it there.
+    """
+    if discovery_cache is None:
+        return build('gmail', 'v1', credentials=creds)
+
+    discovery_cache = str(discovery_cache)
+    document = load_discovery_document(discovery_cache)
+    if document is not None:
+        return build_from_document(document, credentials=creds)
+
+    service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+    save_discovery_document(discovery_cache, service._rootDesc)
+    return service
+
+
+def connect_gmail(credentials_file='credentials.json', token_file='token.json', discovery_cache=None):
+    """Connect to Gmail API and return a service object (see build_gmail_service for discovery_cache)."""
     
     # Define Gmail API Scope
     SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
@@ -21,6 +74,13 @@ def connect_gmail(credentials_file='credentials.json', token_file='token.json'):
             creds = flow.run_local_server(port=0)
         with open(token_file, 'w') as token:
             token.write(creds.to_json())
-    service = build('gmail', 'v1', credentials=creds)
+    service = build_gmail_service(creds, discovery_cache)
     return service
 
+
+def authorized_http(service):
+    """
+    Return a new authorized HTTP object using the service's credentials.
+    httplib2 connections are not thread-safe, so each thread needs its own.
+    """
+    return AuthorizedHttp(service._http.credentials, http=httplib2.Http())
@@ -1,32 +1,175 @@
-import os
+import time
 import base64
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def download_pdf_attachments(service, messages, save_folder='downloads'):
-    """Download all PDF attachments from a list of messages, skipping existing files."""
-    if not os.path.exists(save_folder):
-        os.makedirs(save_folder)
+from extract.gmail_batch import execute_batched, execute_with_backoff
+from extract.raw_store import RawPdfStore
 
+# Partial response of messages.get: the headers and, per top-level part, the
+# file name and attachment id. Message bodies are left out; format=metadata
+# would drop the parts that carry the attachment ids
+MESSAGE_FIELDS = "id,internalDate,payload(headers,parts(filename,body/attachmentId))"
+
+
+def fetch_messages(service, messages, batch_size=50, max_retries=3, http=None):
+    """
+    Fetch the headers and attachment parts (MESSAGE_FIELDS) of messages in batch requests.
+
+    Returns:
+        tuple: (fetched, errors) dicts keyed by message id
+    """
+    users = service.users()
+    requests = {
+        msg['id']: (lambda msg_id=msg['id']: users.messages().get(userId='me', id=msg_id, fields=MESSAGE_FIELDS))
+        for msg in messages
+    }
+    return execute_batched(service, requests, batch_size=batch_size, max_retries=max_retries, http=http)
+
+
+def download_pdf_attachments(service, messages, save_folder='downloads', batch_size=50, max_retries=3,
+                             max_workers=1, connection=None):
+    """
+    Download all PDF attachments from a list of messages, skipping ones already stored.
+
+    Files go through a RawPdfStore: writes are atomic, PDFs are indexed by
+    SHA-256, and an attachment identical to one already stored is not
+    written again.
+
+    Message lookups are grouped into Gmail batch requests of batch_size calls
+    each; messages already fetched (with a 'payload', e.g. by
+    GmailClient.search_by_sender) are not looked up again. Attachments are
+    then downloaded either in batches (max_workers=1) or by a pool of
+    max_workers threads, each request on a connection of its own and
+    retrying 429/5xx responses with exponential backoff. A failed message or
+    attachment is reported without affecting the others.
+
+    Parameters:
+        service: Gmail API service object
+        messages (list): Message dicts with an 'id' key, as returned by search_emails,
+            or fetched messages (fetch_messages)
+        save_folder (str): Raw folder the PDFs are stored in
+        batch_size (int): Gmail API calls per batch request
+        max_retries (int): Retries for calls failing with 429/5xx
+        max_workers (int): Concurrent attachment downloads (1 = batched, no threads)
+        connection (callable): Returns a context manager lending an authorized
+            HTTP object (GmailClient.connection). Required when called from
+            several threads, since HTTP objects are not thread-safe
+
+    Returns:
+        dict: Download statistics (files, bytes, duplicates, seconds, failed)
+    """
+    store = RawPdfStore(save_folder)
+
+    started = time.perf_counter()
+    connection = connection or nullcontext
+    users = service.users()
+
+    # Round 1: fetch every message not fetched yet in batches
+    fetched_messages = {msg['id']: msg for msg in messages if 'payload' in msg}
+    with connection() as http:
+        new_messages, message_errors = fetch_messages(
+            service, [msg for msg in messages if 'payload' not in msg], batch_size, max_retries, http
+        )
+    fetched_messages.update(new_messages)
+    for msg_id, error in message_errors.items():
+        print(f"✗ Failed to fetch message {msg_id}: {error}")
+
+    attachment_files = _plan_pdf_attachments(messages, fetched_messages, store)
+
+    def request_attachment(key):
+        msg_id, attachment_id = key
+        return users.messages().attachments().get(userId='me', messageId=msg_id, id=attachment_id)
+
+    stats = {"files": 0, "bytes": 0, "duplicates": 0, "failed": len(message_errors)}
+    stats_lock = threading.Lock()
+
+    def save_attachment(key, attachment):
+        msg_id, _ = key
+        filename = attachment_files[key]
+        file_data = base64.urlsafe_b64decode(attachment['data'].encode('UTF-8'))
+        _, stored_name, is_new = store.put(file_data, msg_id, filename)
+        with stats_lock:
+            if is_new:
+                stats["files"] += 1
+                stats["bytes"] += len(file_data)
+            else:
+                stats["duplicates"] += 1
+        if is_new:
+            print(f"Downloaded: {stored_name}")
+        else:
+            print(f"Skipped (duplicate of {stored_name}): {filename}")
+
+    # Round 2: download attachments
+    if max_workers > 1:
+        attachment_errors = _download_concurrently(
+            attachment_files, request_attachment, save_attachment, max_workers, max_retries, connection
+        )
+    else:
+        attachment_requests = {key: (lambda key=key: request_attachment(key)) for key in attachment_files}
+        with connection() as http:
+            _, attachment_errors = execute_batched(
+                service, attachment_requests, batch_size=batch_size, max_retries=max_retries,
+                on_result=save_attachment, http=http
+            )
+    for key, error in attachment_errors.items():
+        print(f"✗ Failed to download {attachment_files[key]}: {error}")
+    stats["failed"] += len(attachment_errors)
+    store.flush()
+
+    stats["seconds"] = time.perf_counter() - started
+    _print_throughput(stats)
+    return stats
+
+
+def _plan_pdf_attachments(messages, fetched_messages, store):
+    """Return {(msg_id, attachment_id): filename} for PDFs not yet in the store, in message order."""
+    attachment_files = {}
     for msg in messages:
         msg_id = msg['id']
-        message = service.users().messages().get(userId='me', id=msg_id).execute()
+        message = fetched_messages.get(msg_id)
+        if message is None:
+            continue
         parts = message.get('payload', {}).get('parts', [])
         for part in parts:
             filename = part.get('filename')
             if filename and filename.lower().endswith('.pdf'):
-                file_path = os.path.join(save_folder, filename)
-                
-                # Check if file already exists
-                if os.path.exists(file_path):
+
+                # Check if this attachment was already stored
+                if store.has_attachment(msg_id, filename):
                     print(f"Skipped (already exists): {filename}")
                     continue
-                
+
                 body = part.get('body', {})
                 attachment_id = body.get('attachmentId')
                 if attachment_id:
-                    attachment = service.users().messages().attachments().get(
-                        userId='me', messageId=msg_id, id=attachment_id
-                    ).execute()
-                    file_data = base64.urlsafe_b64decode(attachment['data'].encode('UTF-8'))
-                    with open(file_path, 'wb') as f:
-                        f.write(file_data)
-                    print(f"Downloaded: {filename}")
\ No newline at end of file
+                    attachment_files[(msg_id, attachment_id)] = filename
+    return attachment_files
+
+
+def _download_concurrently(attachment_files, request_attachment, save_attachment, max_workers, max_retries,
+                           connection):
+    """Download attachments on a thread pool, each on a connection lent to it alone. Returns {key: error}."""
+    def download(key):
+        with connection() as http:
+            attachment = execute_with_backoff(request_attachment(key), http=http, max_retries=max_retries)
+        save_attachment(key, attachment)
+
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(download, key): key for key in attachment_files}
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is not None:
+                errors[futures[future]] = error
+    return errors
+
+
+def _print_throughput(stats):
+    seconds = max(stats["seconds"], 1e-9)
+    megabytes = stats["bytes"] / (1024 * 1024)
+    print(
+        f"✓ Downloaded {stats['files']} PDFs ({megabytes:.2f} MB, {stats['duplicates']} duplicates) "
+        f"in {stats['seconds']:.1f}s - {stats['files'] / seconds:.1f} files/s, {megabytes / seconds:.2f} MB/s"
+    )
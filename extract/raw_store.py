@@ -0,0 +1,104 @@
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+from utils.atomic_write import atomic_write_bytes
+
+
+class RawPdfStore:
+    """
+    Content-addressed store for the PDFs of one raw folder (e.g. data/raw/elec).
+
+    Every PDF is identified by the SHA-256 of its bytes and written through a
+    temporary file and an atomic rename, so an interrupted download never
+    leaves a truncated PDF behind. The index (<folder>/.raw_index.json) maps:
+
+        objects:      sha256 -> stored file name
+        attachments:  "<message_id>/<filename>" -> sha256
+
+    Files keep their attachment name because the parsers take invoice_number
+    from it. A different PDF arriving under a name already in use (a
+    corrected or re-issued bill) replaces the stored file, as a download
+    always did; the replaced digest stays in the index so the older email is
+    not downloaded again. An identical PDF attached to several emails is
+    stored (and parsed) once.
+    """
+
+    INDEX_NAME = ".raw_index.json"
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.folder / self.INDEX_NAME
+        self._lock = threading.Lock()
+
+        self.objects = {}
+        self.attachments = {}
+        if self.index_path.exists():
+            with open(self.index_path) as f:
+                index = json.load(f)
+            self.objects = index.get("objects", {})
+            self.attachments = index.get("attachments", {})
+
+        self._remove_stale_temp_files()
+        self._drop_missing_files()
+        self._index_untracked_files()
+
+    def has_attachment(self, message_id, filename):
+        """Return True if this attachment of this message is already stored (or being stored)."""
+        with self._lock:
+            return self.attachments.get(f"{message_id}/{filename}") in self.objects
+
+    def put(self, data, message_id, filename):
+        """
+        Store PDF bytes received as filename on message message_id.
+
+        Returns:
+            tuple: (sha256, stored file name, True if new content was written)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self.attachments[f"{message_id}/{filename}"] = digest
+
+            # Files were checked when the index was loaded; a digest in objects is
+            # stored, or being written by a concurrent put, so this is a duplicate
+            stored_name = self.objects.get(digest)
+            if stored_name is not None:
+                return digest, stored_name, False
+
+            stored_name = filename
+            # Claim the digest before releasing the lock so concurrent puts see it
+            self.objects[digest] = stored_name
+
+        try:
+            atomic_write_bytes(self.folder / stored_name, data)
+        except BaseException:
+            with self._lock:
+                del self.objects[digest]
+            raise
+        return digest, stored_name, True
+
+    def flush(self):
+        """Persist the index atomically."""
+        with self._lock:
+            index = {"objects": self.objects, "attachments": self.attachments}
+            atomic_write_bytes(self.index_path, json.dumps(index, indent=1).encode("utf-8"))
+
+    def _remove_stale_temp_files(self):
+        for tmp_path in self.folder.glob(".*.tmp"):
+            tmp_path.unlink(missing_ok=True)
+
+    def _drop_missing_files(self):
+        """Forget indexed PDFs that were deleted from the folder, so they are downloaded again."""
+        self.objects = {digest: name for digest, name in self.objects.items() if (self.folder / name).is_file()}
+
+    def _index_untracked_files(self):
+        """Hash PDFs saved before the store existed (or before an interrupted flush) into the index."""
+        tracked = set(self.objects.values())
+        for pdf_path in sorted(self.folder.glob("*.pdf")):
+            if pdf_path.name in tracked:
+                continue
+            digest = hashlib.sha256(pdf_path.read_bytes()).hexdigest()
+            self.objects.setdefault(digest, pdf_path.name)
+
@@ -0,0 +1,50 @@
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from utils.atomic_write import atomic_write_text
+
+
+class SyncState:
+    """
+    Per-query watermarks for incremental Gmail sync, persisted as JSON.
+
+    The watermark is the time (epoch seconds) a sync of the query started.
+    The next run lists only messages after the watermark, minus an overlap
+    window that absorbs clock skew and late-indexed mail. Messages seen
+    twice in the overlap are skipped by the downloader. set() and save() may
+    be called from the concurrent extract tracks of different utilities.
+
+    File format:
+        {"<query>": {"after": 1718000000, "synced_at": "2024-06-10T06:13:20+00:00"}}
+    """
+
+    def __init__(self, state_path, overlap_seconds=24 * 60 * 60):
+        self.state_path = Path(state_path)
+        self.overlap_seconds = overlap_seconds
+        self.watermarks = {}
+        self._lock = threading.Lock()
+        if self.state_path.exists():
+            with open(self.state_path) as f:
+                self.watermarks = json.load(f)
+
+    def after(self, query):
+        """Return the epoch seconds to list messages after, or None for a full sync."""
+        entry = self.watermarks.get(query)
+        if entry is None:
+            return None
+        return max(0, entry["after"] - self.overlap_seconds)
+
+    def set(self, query, watermark):
+        """Record that query was fully synced up to watermark (epoch seconds)."""
+        with self._lock:
+            self.watermarks[query] = {
+                "after": int(watermark),
+                "synced_at": datetime.fromtimestamp(watermark, tz=timezone.utc).isoformat(),
+            }
+
+    def save(self):
+        """Write the watermarks atomically so an interrupted run keeps the previous state."""
+        with self._lock:
+            atomic_write_text(self.state_path, json.dumps(self.watermarks, indent=2))
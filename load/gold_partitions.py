@@ -0,0 +1,250 @@
+import os
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from load.save_load import save_layer, load_layer, apply_column_schema
+from utils.atomic_write import atomic_write_text
+
+MANIFEST_NAME = "_manifest.json"
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Top-level partition of the gold dataset merged across accounts
+ACCOUNT_COLUMN = "account"
+
+
+def partition_labels(df: pd.DataFrame, date_column: str = "invoice_date") -> pd.Series:
+    """
+    Return the partition of every row, e.g. 'utility_type=gas/year=2024/month=03'.
+    Rows without a parseable date go to the NULL_PARTITION year/month.
+    """
+    dates = pd.to_datetime(df[date_column], errors="coerce")
+    year = dates.dt.year.astype("Int64").astype("string").fillna(NULL_PARTITION)
+    month = dates.dt.month.astype("Int64").astype("string").str.zfill(2).fillna(NULL_PARTITION)
+    utility = df["utility_type"].astype("string").fillna(NULL_PARTITION)
+    return "utility_type=" + utility + "/year=" + year + "/month=" + month
+
+
+def _invoice_ids(df: pd.DataFrame) -> pd.Series:
+    """Invoices are tracked per utility, so equal invoice numbers of two providers never collide."""
+    return df["utility_type"].astype("string").fillna("") + "/" + df["invoice_number"].astype("string").fillna("")
+
+
+def _invoice_digests(df: pd.DataFrame, invoice_ids: pd.Series) -> dict:
+    """Order-independent content hash of each invoice's rows, used to skip unchanged invoices."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    sums = row_hashes.groupby(invoice_ids.to_numpy()).sum()
+    counts = invoice_ids.value_counts()
+    return {invoice: f"{int(total):016x}-{int(counts[invoice])}" for invoice, total in sums.items()}
+
+
+def load_manifest(root) -> dict:
+    """Read the manifest of a partitioned gold dataset (empty if it does not exist yet)."""
+    manifest_path = Path(root) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {"partitions": {}, "invoices": {}}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def _save_manifest(root, manifest):
+    atomic_write_text(Path(root) / MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True))
+
+
+def _partition_file(root, partition, storage_format):
+    suffix = ".parquet" if storage_format == "parquet" else ".csv"
+    return Path(root) / partition / f"part{suffix}"
+
+
+def _write_partition(df, path, storage_format, column_dtypes):
+    """Write a partition through a temporary file so readers never see a half-written one."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    written = save_layer(df, tmp_path, storage_format, column_dtypes)
+    os.replace(written, path)
+
+
+def upsert_gold_partitions(df: pd.DataFrame, root, storage_format: str = "csv", column_dtypes: dict = None,
+                           date_column: str = "invoice_date") -> dict:
+    """
+    Merge gold rows into a dataset partitioned by utility_type / year / month.
+
+    Rows are upserted per invoice (utility_type, invoice_number): every
+    stored row of a new or changed invoice is replaced by its incoming rows,
+    so an invoice that comes back with fewer steps loses the extra ones.
+    Invoices whose rows are
+    unchanged since the last run (same content digest in the manifest) are
+    skipped, so only the partitions holding new or changed invoices are
+    read and rewritten. An invoice whose date moved is removed from its old
+    partition.
+
+    Parameters:
+        df (pd.DataFrame): Gold rows (final_labels columns)
+        root (str): Folder of the partitioned dataset
+        storage_format (str): 'csv' or 'parquet'
+        column_dtypes (dict): Schema applied to incoming and existing rows
+        date_column (str): Date column the year/month partitions come from
+
+    Returns:
+        dict: {"rows": upserted rows, "invoices": changed invoice count,
+               "partitions": rewritten partition names, "files": partition files written}
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(root)
+
+    if column_dtypes:
+        df = apply_column_schema(df, column_dtypes)
+    df = df.reset_index(drop=True)
+
+    invoice_ids = _invoice_ids(df)
+    digests = _invoice_digests(df, invoice_ids)
+    changed = [invoice for invoice, digest in digests.items()
+               if manifest["invoices"].get(invoice, {}).get("digest") != digest]
+    incoming = df[invoice_ids.isin(changed).to_numpy()]
+    if incoming.empty:
+        return {"rows": incoming, "invoices": 0, "partitions": [], "files": []}
+
+    labels = partition_labels(incoming, date_column)
+    affected = set(labels.unique())
+    for invoice in changed:
+        affected.update(manifest["invoices"].get(invoice, {}).get("partitions", []))
+
+    written = []
+    for partition in sorted(affected):
+        path = _partition_file(root, partition, storage_format)
+        frames = []
+        if path.exists():
+            existing = load_layer(path, storage_format)
+            if column_dtypes:
+                existing = apply_column_schema(existing, column_dtypes)
+            frames.append(existing[~_invoice_ids(existing).isin(changed).to_numpy()])
+        frames.append(incoming[(labels == partition).to_numpy()])
+        merged = pd.concat(frames, ignore_index=True)
+
+        if merged.empty:
+            shutil.rmtree(path.parent, ignore_errors=True)
+            manifest["partitions"].pop(partition, None)
+            continue
+
+        _write_partition(merged, path, storage_format, column_dtypes)
+        written.append(path)
+        merged_dates = pd.to_datetime(merged[date_column], errors="coerce")
+        manifest["partitions"][partition] = {
+            "rows": len(merged),
+            "min_date": None if merged_dates.isna().all() else merged_dates.min().isoformat(),
+            "max_date": None if merged_dates.isna().all() else merged_dates.max().isoformat(),
+        }
+
+    incoming_ids = invoice_ids[incoming.index]
+    for invoice, invoice_labels in labels.groupby(incoming_ids.to_numpy()):
+        manifest["invoices"][invoice] = {
+            "digest": digests[invoice],
+            "partitions": sorted(invoice_labels.unique()),
+        }
+    _save_manifest(root, manifest)
+
+    return {"rows": incoming, "invoices": len(changed), "partitions": sorted(affected), "files": written}
+
+
+def _partition_overlaps(partition: str, start, end) -> bool:
+    """True if the year/month of a partition can hold dates in [start, end]."""
+    fields = dict(part.split("=", 1) for part in partition.split("/"))
+    if NULL_PARTITION in (fields["year"], fields["month"]):
+        return False
+    month_start = pd.Timestamp(year=int(fields["year"]), month=int(fields["month"]), day=1)
+    next_month = month_start + pd.offsets.MonthBegin(1)
+    return (start is None or next_month > start) and (end is None or month_start <= end)
+
+
+def read_gold_partitions(root, storage_format: str = "csv", start=None, end=None, utility_types=None,
+                         columns: list = None, date_column: str = "invoice_date") -> pd.DataFrame:
+    """
+    Read a partitioned gold dataset, opening only the partitions that can
+    match the filters.
+
+    Parameters:
+        root (str): Folder of the partitioned dataset
+        storage_format (str): 'csv' or 'parquet'
+        start, end (str or Timestamp): Optional inclusive date range on date_column
+        utility_types (list): Optional utility types to read, e.g. ['gas']
+        columns (list): Optional subset of columns to read
+        date_column (str): Column the partitions were built from
+
+    Returns:
+        pd.DataFrame
+    """
+    manifest = load_manifest(root)
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    if end is not None and end == end.normalize():
+        # A bare end date includes that whole day
+        end = end + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+
+    read_columns = columns
+    if columns is not None and (start is not None or end is not None) and date_column not in columns:
+        read_columns = list(columns) + [date_column]
+
+    frames = []
+    for partition in sorted(manifest["partitions"]):
+        utility = partition.split("/", 1)[0].split("=", 1)[1]
+        if utility_types is not None and utility not in utility_types:
+            continue
+        if (start is not None or end is not None) and not _partition_overlaps(partition, start, end):
+            continue
+        frames.append(load_layer(_partition_file(root, partition, storage_format), storage_format, columns=read_columns))
+
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    gold = pd.concat(frames, ignore_index=True)
+
+    if start is not None or end is not None:
+        dates = pd.to_datetime(gold[date_column], errors="coerce")
+        in_range = dates.notna()
+        if start is not None:
+            in_range &= dates >= start
+        if end is not None:
+            in_range &= dates <= end
+        gold = gold[in_range.to_numpy()].reset_index(drop=True)
+
+    if columns is not None:
+        gold = gold[columns]
+    return gold
+
+
+def account_datasets(root) -> dict:
+    """{account: folder} of the per-account datasets (account=<name>/) of a merged gold root."""
+    root = Path(root)
+    if not root.exists():
+        return {}
+    return {path.name.split("=", 1)[1]: path for path in sorted(root.glob(f"{ACCOUNT_COLUMN}=*"))
+            if (path / MANIFEST_NAME).exists()}
+
+
+def read_account_partitions(root, storage_format: str = "csv", accounts=None, **filters) -> pd.DataFrame:
+    """
+    Read the merged gold dataset of several accounts, partitioned by
+    account / utility_type / year / month.
+
+    Parameters:
+        root (str): Folder holding the account=<name> datasets
+        storage_format (str): 'csv' or 'parquet'
+        accounts (list): Optional accounts to read (default: all)
+        **filters: start, end, utility_types, columns and date_column, as for read_gold_partitions
+
+    Returns:
+        pd.DataFrame: Gold rows with an account column first
+    """
+    frames = []
+    for account, path in account_datasets(root).items():
+        if accounts is not None and account not in accounts:
+            continue
+        gold = read_gold_partitions(path, storage_format, **filters)
+        gold.insert(0, ACCOUNT_COLUMN, account)
+        frames.append(gold)
+
+    if not frames:
+        return pd.DataFrame(columns=[ACCOUNT_COLUMN] + list(filters.get("columns") or []))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,47 @@
+# Table the gold layer is stored as in the query store
+GOLD_TABLE = "gold"
+
+# Canned aggregates for `python main.py query <name>`. {where} receives the
+# filters given on the command line; invoice-level measures count each
+# invoice once, since invoice_total repeats on every step row. This module
+# imports nothing, so the command line can list the queries without pandas.
+CANNED_QUERIES = {
+    "season_spend": {
+        "description": "Usage and usage charges per utility, year and season",
+        "sql": """
+            SELECT utility_type, strftime('%Y', invoice_date) AS year, season,
+                   COUNT(DISTINCT invoice_number) AS invoices,
+                   ROUND(SUM(usage_amount), 2) AS usage_amount,
+                   ROUND(SUM(usage_charge), 2) AS usage_charge
+            FROM gold {where}
+            GROUP BY utility_type, year, season
+            ORDER BY utility_type, year, season
+        """,
+    },
+    "monthly_spend": {
+        "description": "Invoice totals per utility and billing month",
+        "sql": """
+            SELECT utility_type, strftime('%Y-%m', invoice_date) AS month,
+                   COUNT(*) AS invoices, ROUND(SUM(invoice_total), 2) AS invoice_total
+            FROM (SELECT DISTINCT utility_type, invoice_number, invoice_date, invoice_total FROM gold {where})
+            GROUP BY utility_type, month
+            ORDER BY utility_type, month
+        """,
+    },
+    "top_invoices": {
+        "description": "The most expensive invoices",
+        "sql": """
+            SELECT DISTINCT utility_type, invoice_number, invoice_date, invoice_start, invoice_end, invoice_total
+            FROM gold {where}
+            ORDER BY invoice_total DESC
+            LIMIT :limit
+        """,
+    },
+    "invoice": {
+        "description": "All step rows of one invoice (--invoice)",
+        "sql": """
+            SELECT * FROM gold {where}
+            ORDER BY utility_type, step_start, step_number
+        """,
+    },
+}
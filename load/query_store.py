@@ -0,0 +1,158 @@
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from load.save_load import apply_column_schema
+from load.queries import GOLD_TABLE, CANNED_QUERIES
+
+# Columns indexed on every table, so filters on them do not scan the table
+INDEXED_COLUMNS = ["invoice_date", "utility_type", "invoice_number", "season"]
+
+SQL_TYPES = {"datetime": "DATE", "float": "REAL", "int": "INTEGER", "string": "TEXT"}
+
+
+def _sql_frame(df: pd.DataFrame, column_dtypes: dict) -> pd.DataFrame:
+    """Type the columns like column_dtypes, with dates as ISO 'YYYY-MM-DD' text so SQLite's date functions work."""
+    df = apply_column_schema(df, column_dtypes or {})
+    for col, dtype in (column_dtypes or {}).items():
+        if dtype == "datetime" and col in df.columns:
+            df[col] = df[col].dt.strftime("%Y-%m-%d").astype(object).where(df[col].notna(), None)
+    return df
+
+
+def _create_indexes(conn, table, columns):
+    for col in INDEXED_COLUMNS:
+        if col in columns:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{table}_{col}" ON "{table}" ("{col}")')
+    if {"utility_type", "invoice_date"} <= set(columns):
+        # Serves the common 'one utility over a date range' filter from one index
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{table}_utility_date" ON "{table}" (utility_type, invoice_date)')
+
+
+def _table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def has_table(db_path, table: str = GOLD_TABLE) -> bool:
+    """Return whether the query store exists and holds table."""
+    if not Path(db_path).exists():
+        return False
+    conn = sqlite3.connect(db_path)
+    try:
+        return _table_exists(conn, table)
+    finally:
+        conn.close()
+
+
+def write_query_store(db_path, tables: dict, column_dtypes: dict = None, upsert_tables=()) -> dict:
+    """
+    Write DataFrames as indexed tables of a local SQLite database.
+
+    Tables are replaced as a whole: each is written under a temporary name
+    and swapped in within one transaction, so queries never see a partly
+    written table. Tables listed in upsert_tables are instead updated per
+    invoice: rows of the invoices in the DataFrame replace that invoice's
+    existing rows (used with the incremental gold layer, which only hands
+    over new or changed invoices).
+
+    Parameters:
+        db_path (str): SQLite database file (created if missing)
+        tables (dict): {table name: DataFrame}
+        column_dtypes (dict): Column types from config, used for the SQL column types
+        upsert_tables (iterable): Names of tables to update per invoice
+
+    Returns:
+        dict: {table name: rows written}
+
+    Example:
+        write_query_store("data/gold/utilities.sqlite", {"gold": gold_df, "silver_elec": elec_df},
+                          config["column_dtypes"])
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    written = {}
+
+    conn = sqlite3.connect(db_path)
+    try:
+        for table, df in tables.items():
+            df = _sql_frame(df, column_dtypes)
+            sql_types = {col: SQL_TYPES[dtype] for col, dtype in (column_dtypes or {}).items()
+                         if col in df.columns and dtype in SQL_TYPES}
+
+            with conn:
+                if table in upsert_tables and _table_exists(conn, table):
+                    invoices = df[["utility_type", "invoice_number"]].drop_duplicates()
+                    conn.executemany(
+                        f'DELETE FROM "{table}" WHERE utility_type = ? AND invoice_number = ?',
+                        invoices.itertuples(index=False, name=None)
+                    )
+                    df.to_sql(table, conn, if_exists="append", index=False, dtype=sql_types)
+                else:
+                    staging = f"{table}__staging"
+                    df.to_sql(staging, conn, if_exists="replace", index=False, dtype=sql_types)
+                    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+                    conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}"')
+                _create_indexes(conn, table, df.columns)
+            written[table] = len(df)
+
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return written
+
+
+def run_query(db_path, name, utility_type=None, year=None, start=None, end=None, invoice_number=None,
+              limit=10) -> tuple:
+    """
+    Run one of CANNED_QUERIES against the query store.
+
+    Parameters:
+        db_path (str): SQLite database written by write_query_store
+        name (str): Key of CANNED_QUERIES
+        utility_type (str): Only this utility
+        year (int): Only invoices dated in this year
+        start, end (str): Only invoices dated in this range ('YYYY-MM-DD', inclusive)
+        invoice_number (str): Only this invoice
+        limit (int): Row limit of queries that take one
+
+    Returns:
+        tuple: (result DataFrame, seconds the query took)
+
+    Raises:
+        FileNotFoundError: If the query store has not been written yet
+    """
+    db_path = Path(db_path)
+    if not db_path.exists():
+        raise FileNotFoundError(f"Query store '{db_path}' does not exist. Run the load stage with query_store.enabled.")
+
+    filters = []
+    params = {"limit": limit}
+    if utility_type:
+        filters.append("utility_type = :utility_type")
+        params["utility_type"] = utility_type
+    if year:
+        # A date range rather than strftime(), so the invoice_date index is used
+        start, end = start or f"{year}-01-01", end or f"{year}-12-31"
+    if start:
+        filters.append("invoice_date >= :start")
+        params["start"] = str(start)
+    if end:
+        filters.append("invoice_date <= :end")
+        params["end"] = str(end)
+    if invoice_number:
+        filters.append("invoice_number = :invoice_number")
+        params["invoice_number"] = invoice_number
+
+    where = "WHERE " + " AND ".join(filters) if filters else ""
+    sql = CANNED_QUERIES[name]["sql"].format(where=where)
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        started = time.perf_counter()
+        result = pd.read_sql_query(sql, conn, params={key: value for key, value in params.items() if f":{key}" in sql})
+        seconds = time.perf_counter() - started
+    finally:
+        conn.close()
+    return result, seconds
@@ -1,5 +1,10 @@
+import os
 import pandas as pd
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+STORAGE_FORMATS = ("csv", "parquet")
+
 
 def save_dataframe_to_csv(df: pd.DataFrame, output_path: str, index: bool = False, sep: str = ",") -> None:
     """
@@ -21,4 +26,276 @@ def save_dataframe_to_csv(df: pd.DataFrame, output_path: str, index: bool = Fals
         raise FileNotFoundError(f"Output folder '{output_folder}' does not exist. Please create it first.")
 
     # Save the CSV
-    df.to_csv(output_path, index=index, sep=sep)
\ No newline at end of file
+    df.to_csv(output_path, index=index, sep=sep)
+
+
+def save_dataframe_to_parquet(df: pd.DataFrame, output_path: str, index: bool = False) -> None:
+    """
+    Save a pandas DataFrame to a Parquet file. Throws an error if the output folder does not exist.
+
+    Parameters:
+        df (pd.DataFrame): The DataFrame to save.
+        output_path (str): Full path to the output Parquet file (including filename).
+        index (bool): Whether to write row names (default: False).
+
+    Raises:
+        FileNotFoundError: If the folder containing output_path does not exist.
+    """
+    output_path = Path(output_path)
+    output_folder = output_path.parent
+
+    if not output_folder.exists():
+        raise FileNotFoundError(f"Output folder '{output_folder}' does not exist. Please create it first.")
+
+    df.to_parquet(output_path, index=index, engine="pyarrow")
+
+
+def apply_column_schema(df: pd.DataFrame, column_dtypes: dict) -> pd.DataFrame:
+    """
+    Cast columns to the Arrow-friendly pandas dtypes matching column_dtypes,
+    so the Parquet schema carries the types from config:
+        datetime -> datetime64[ns], float -> float64,
+        int -> Int64 (nullable), string -> string
+
+    Parameters:
+        df (pd.DataFrame): Input DataFrame
+        column_dtypes (dict): Mapping of column names to target dtypes
+
+    Returns:
+        pd.DataFrame: DataFrame with typed columns
+    """
+    df = df.copy()
+    for col, dtype in column_dtypes.items():
+        if col not in df.columns:
+            continue
+        if dtype == "datetime":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif dtype == "float":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        elif dtype == "int":
+            numbers = pd.to_numeric(df[col], errors="coerce")
+            try:
+                df[col] = numbers.astype("Int64")
+            except (TypeError, ValueError):
+                # Fractional values cannot be stored as integers; keep them as floats
+                df[col] = numbers.astype("float64")
+        elif dtype == "string":
+            df[col] = df[col].astype("string")
+    return df
+
+
+def layer_path(path, storage_format: str = "csv") -> Path:
+    """Return the file path of a layer for a storage format (Parquet swaps the extension)."""
+    path = Path(path)
+    if storage_format == "parquet":
+        return path.with_suffix(".parquet")
+    return path
+
+
+def save_layer(df: pd.DataFrame, output_path, storage_format: str = "csv", column_dtypes: dict = None) -> Path:
+    """
+    Save a bronze, silver or gold layer in the configured storage format.
+
+    Parameters:
+        df (pd.DataFrame): The DataFrame to save.
+        output_path (str): Configured path of the layer (CSV path; the extension
+            is swapped to .parquet for the parquet format).
+        storage_format (str): 'csv' or 'parquet'
+        column_dtypes (dict): Optional schema applied before writing Parquet
+
+    Returns:
+        Path: The file written
+    """
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(f"Unsupported storage format: {storage_format}")
+
+    output_path = layer_path(output_path, storage_format)
+    if storage_format == "parquet":
+        if column_dtypes:
+            df = apply_column_schema(df, column_dtypes)
+        save_dataframe_to_parquet(df, output_path)
+    else:
+        save_dataframe_to_csv(df, output_path)
+    return output_path
+
+
+def upsert_layer(df: pd.DataFrame, output_path, storage_format: str = "csv", key_columns=("invoice_number",),
+                 column_dtypes: dict = None) -> Path:
+    """
+    Merge rows into a saved layer: rows of the saved layer whose key matches
+    a row of df are replaced by df's rows, and the rest of df is appended.
+    Used by the daemon to add newly parsed invoices without re-processing
+    the PDFs already in the layer. Writes df alone if the layer does not exist.
+
+    Parameters:
+        df (pd.DataFrame): New or re-processed rows
+        output_path (str): Configured path of the layer
+        storage_format (str): 'csv' or 'parquet'
+        key_columns (iterable): Columns identifying an invoice (compared as text)
+        column_dtypes (dict): Optional schema applied to both sides before
+            they are combined, so dates and numbers read back from CSV line
+            up with the new rows
+
+    Returns:
+        Path: The file written
+    """
+    key_columns = list(key_columns)
+    if layer_path(output_path, storage_format).exists():
+        existing = load_layer(output_path, storage_format)
+        if column_dtypes:
+            existing = apply_column_schema(existing, column_dtypes)
+            df = apply_column_schema(df, column_dtypes)
+        replaced = pd.MultiIndex.from_frame(existing[key_columns].astype(str)).isin(
+            pd.MultiIndex.from_frame(df[key_columns].astype(str))
+        )
+        df = pd.concat([existing[~replaced], df], ignore_index=True)
+    return save_layer(df, output_path, storage_format, column_dtypes)
+
+
+def load_layer(input_path, storage_format: str = "csv", columns: list = None) -> pd.DataFrame:
+    """
+    Read a layer written by save_layer.
+
+    Parquet layers come back with their stored types, so dates and numbers
+    are not re-parsed, and only the requested columns are read from disk.
+
+    Parameters:
+        input_path (str): Configured path of the layer
+        storage_format (str): 'csv' or 'parquet'
+        columns (list): Optional subset of columns to read
+
+    Returns:
+        pd.DataFrame
+    """
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(f"Unsupported storage format: {storage_format}")
+
+    input_path = layer_path(input_path, storage_format)
+    if storage_format == "parquet":
+        return pd.read_parquet(input_path, columns=columns, engine="pyarrow")
+    return pd.read_csv(input_path, usecols=columns)
+
+
+def _save_and_notify(df, output_path, storage_format, column_dtypes, on_saved):
+    written = save_layer(df, output_path, storage_format, column_dtypes)
+    if on_saved is not None:
+        on_saved(written)
+    return written
+
+
+class LayerWriter:
+    """
+    Persists layers on a background thread so the next stage does not wait
+    for disk. Each DataFrame is snapshotted when submitted, so a later stage
+    modifying it in place cannot change what gets written.
+
+    Example:
+        writer = LayerWriter()
+        writer.save(df, "data/silver/elec (silver).csv", "parquet")
+        ...
+        writer.close()  # waits for pending writes, raises the first error
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="layer-writer")
+        self._futures = []
+
+    def save(self, df: pd.DataFrame, output_path, storage_format: str = "csv", column_dtypes: dict = None,
+             on_saved=None) -> None:
+        """Queue save_layer(df, ...) on the writer thread; on_saved(path) is called there once written."""
+        self._futures.append(
+            self._executor.submit(_save_and_notify, df.copy(), output_path, storage_format, column_dtypes, on_saved)
+        )
+
+    def close(self) -> None:
+        """Wait for all queued writes to finish; raises the first write error."""
+        self._executor.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
+
+
+class BatchLayerWriter:
+    """
+    Writes a layer in batches as they are produced, so the whole layer never
+    has to be held in memory. Batches go to a temporary file that replaces
+    the layer on close(), so readers never see a half-written layer.
+
+    The columns of the first batch (even one without rows) fix the layer's
+    columns; later batches are aligned to them. Parquet files get one row group per batch.
+
+    Example:
+        with BatchLayerWriter("data/raw_csv (bronze)/elec_raw.csv", "parquet") as writer:
+            for df in iter_parsed_batches(pdf_files, "elec"):
+                writer.write(df)
+        print(writer.path, writer.rows)
+    """
+
+    def __init__(self, output_path, storage_format: str = "csv", column_dtypes: dict = None):
+        if storage_format not in STORAGE_FORMATS:
+            raise ValueError(f"Unsupported storage format: {storage_format}")
+        self.path = layer_path(output_path, storage_format)
+        self.storage_format = storage_format
+        self.column_dtypes = column_dtypes
+        self.columns = None
+        self.rows = 0
+        self._tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        self._parquet_writer = None
+        self._schema = None
+
+        if not self.path.parent.exists():
+            raise FileNotFoundError(f"Output folder '{self.path.parent}' does not exist. Please create it first.")
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Append one batch to the layer (batches without rows only contribute their columns)."""
+        if self.columns is None:
+            # Kept even from an empty batch, so a layer without rows still has its header
+            self.columns = list(df.columns)
+        if df.empty:
+            return
+        df = df.reindex(columns=self.columns)
+
+        if self.storage_format == "parquet":
+            self._write_parquet(df)
+        else:
+            df.to_csv(self._tmp_path, index=False, mode="w" if self.rows == 0 else "a", header=self.rows == 0)
+        self.rows += len(df)
+
+    def _write_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.column_dtypes:
+            df = apply_column_schema(df, self.column_dtypes)
+        if self._parquet_writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # A column that is empty in the first batch would be typed null; store it as text
+            self._schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema
+            ])
+            self._parquet_writer = pq.ParquetWriter(self._tmp_path, self._schema)
+        self._parquet_writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+
+    def close(self) -> Path:
+        """Finish the layer and move it into place. Returns the file written."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self.rows == 0:
+            # No rows at all: write an empty layer, as save_layer would
+            return save_layer(pd.DataFrame(columns=self.columns), self.path, self.storage_format)
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        """Discard the batches written so far, leaving any previous layer in place."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
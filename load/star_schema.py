@@ -0,0 +1,381 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from load.save_load import save_layer, load_layer, layer_path, apply_column_schema
+from load.gold_partitions import (partition_labels, load_manifest, _save_manifest, _partition_file, _write_partition,
+                                  MANIFEST_NAME, NULL_PARTITION)
+
+UTILITY_TYPE_NAMES = {"elec": "Electricity", "gas": "Gas", "water": "Water"}
+
+# Types of the star schema's own columns; gold columns keep their column_dtypes types
+STAR_DTYPES = {
+    "date": "datetime",
+    "date_key": "int",
+    "invoice_date_key": "int",
+    "step_start_date_key": "int",
+    "year": "int",
+    "quarter": "int",
+    "month": "int",
+    "day": "int",
+    "start_month": "int",
+    "end_month": "int",
+    "step_count": "int",
+    "invoices": "int",
+    "invoice_key": "string",
+    "utility_type_key": "string",
+    "season_key": "string",
+}
+
+FACT_COLUMNS = [
+    "invoice_key", "utility_type_key", "season_key", "invoice_date_key", "step_start_date_key",
+    "step_number", "step_start", "step_end", "usage_amount", "usage_rate", "usage_charge",
+    "service_days", "service_rate", "service_charge",
+]
+
+INVOICE_COLUMNS = [
+    "invoice_key", "invoice_number", "utility_type_key", "invoice_date_key", "invoice_date",
+    "invoice_start", "invoice_end", "invoice_total", "step_count",
+]
+
+MEASURES = ["usage_amount", "usage_charge", "service_charge"]
+
+# Rollup grains: monthly by invoice date, seasonal by the season of each step
+ROLLUPS = {
+    "rollup_monthly": ["utility_type_key", "year", "month"],
+    "rollup_seasonal": ["utility_type_key", "year", "season_key"],
+}
+
+TABLES = ["fact_step", "dim_invoice", "dim_date", "dim_season", "dim_utility_type", *ROLLUPS]
+
+# Tables stored as folders partitioned by utility_type / year / month of the invoice date,
+# so an incremental refresh reads and rewrites only the partitions of changed invoices
+PARTITIONED_TABLES = ["fact_step", "dim_invoice"]
+
+
+def _date_keys(dates: pd.Series) -> pd.Series:
+    """YYYYMMDD integer keys of dates (missing dates get no key)."""
+    return (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).astype("Int64")
+
+
+def invoice_keys(df: pd.DataFrame) -> pd.Series:
+    """Invoice numbers are only unique per provider, so invoices are keyed 'utility_type/invoice_number'."""
+    return df["utility_type"].astype("string").fillna("") + "/" + df["invoice_number"].astype("string").fillna("")
+
+
+def build_fact_step(gold_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per pricing step, with keys into the dimensions."""
+    fact = pd.DataFrame({
+        "invoice_key": invoice_keys(gold_df),
+        "utility_type_key": gold_df["utility_type"],
+        "season_key": gold_df["season"],
+        "invoice_date_key": _date_keys(gold_df["invoice_date"]),
+        "step_start_date_key": _date_keys(gold_df["step_start"]),
+    })
+    for col in FACT_COLUMNS[5:]:
+        fact[col] = gold_df[col]
+    return fact
+
+
+def build_dim_invoice(gold_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per invoice: billing period, total and number of steps."""
+    invoices = gold_df.assign(invoice_key=invoice_keys(gold_df), utility_type_key=gold_df["utility_type"])
+    dim = invoices.groupby("invoice_key", sort=True).agg(
+        invoice_number=("invoice_number", "first"),
+        utility_type_key=("utility_type_key", "first"),
+        invoice_date=("invoice_date", "first"),
+        invoice_start=("invoice_start", "first"),
+        invoice_end=("invoice_end", "first"),
+        invoice_total=("invoice_total", "first"),
+        step_count=("invoice_number", "size"),
+    ).reset_index()
+    dim["invoice_date_key"] = _date_keys(dim["invoice_date"])
+    return dim[INVOICE_COLUMNS]
+
+
+def build_dim_date(start, end) -> pd.DataFrame:
+    """A continuous calendar from start to end, as PowerBI's time intelligence expects."""
+    dates = pd.Series(pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D"))
+    return pd.DataFrame({
+        "date_key": _date_keys(dates),
+        "date": dates,
+        "year": dates.dt.year,
+        "quarter": dates.dt.quarter,
+        "month": dates.dt.month,
+        "month_name": dates.dt.strftime("%B"),
+        "day": dates.dt.day,
+        "month_year": dates.dt.strftime("%b %Y"),
+        "month_year_sorted": dates.dt.strftime("%Y-%m"),
+    })
+
+
+def build_dim_season(seasons: dict) -> pd.DataFrame:
+    """Seasons from the seasons config, with the months they span."""
+    return pd.DataFrame([
+        {"season_key": name.capitalize(), "season": name.capitalize(),
+         "start_month": months.get("start_month"), "end_month": months.get("end_month")}
+        for name, months in seasons.items()
+    ])
+
+
+def build_dim_utility_type(utility_types) -> pd.DataFrame:
+    """The utility types present in the fact table, with display names."""
+    return pd.DataFrame([
+        {"utility_type_key": utility, "utility_type": UTILITY_TYPE_NAMES.get(utility, utility)}
+        for utility in sorted(utility_types)
+    ])
+
+
+def _with_invoice_month(fact: pd.DataFrame, dim_invoice: pd.DataFrame) -> pd.DataFrame:
+    """Add the year and month of each step's invoice date (the rollup calendar)."""
+    # reindex rather than map: map casts an empty mapper (no previous rows of brand-new invoices) to float
+    invoice_dates = pd.Series(
+        dim_invoice.set_index("invoice_key")["invoice_date"].reindex(fact["invoice_key"]).to_numpy(), index=fact.index
+    )
+    return fact.assign(year=invoice_dates.dt.year.astype("Int64"), month=invoice_dates.dt.month.astype("Int64"))
+
+
+def _group_ids(df: pd.DataFrame, grain: list) -> pd.MultiIndex:
+    return pd.MultiIndex.from_frame(df[grain].astype("string").fillna(""))
+
+
+def build_rollups(fact: pd.DataFrame, dim_invoice: pd.DataFrame) -> dict:
+    """
+    Aggregate the fact table to the ROLLUPS grains.
+
+    Service charges are per billing period and repeat on each step of the
+    period, so they are counted once per (invoice, step period). Invoice
+    totals are added once per invoice, to the month of the invoice date.
+    """
+    steps = _with_invoice_month(fact, dim_invoice)
+    period_repeat = steps.duplicated(["invoice_key", "step_start", "step_end"])
+    steps["service_charge"] = steps["service_charge"].where(~period_repeat, 0.0)
+
+    rollups = {}
+    for table, grain in ROLLUPS.items():
+        grouped = steps.groupby(grain, dropna=False)
+        rollup = grouped[MEASURES].sum().round(2)
+        rollup.insert(0, "invoices", grouped["invoice_key"].nunique())
+        if table == "rollup_monthly":
+            invoices = dim_invoice.assign(
+                year=dim_invoice["invoice_date"].dt.year.astype("Int64"),
+                month=dim_invoice["invoice_date"].dt.month.astype("Int64"),
+            )
+            rollup["invoice_total"] = invoices.groupby(grain, dropna=False)["invoice_total"].sum().round(2)
+        rollups[table] = rollup.reset_index().sort_values(grain, ignore_index=True)
+    return rollups
+
+
+def refresh_rollups(previous: dict, old_fact: pd.DataFrame, old_dim_invoice: pd.DataFrame,
+                    fact: pd.DataFrame, dim_invoice: pd.DataFrame, changed_keys: set) -> dict:
+    """
+    Recompute only the rollup groups that hold a changed invoice, before or
+    after the change, and keep every other group of the previous rollups.
+
+    Parameters:
+        previous (dict): {rollup table: DataFrame or None} of the last refresh
+        old_fact, old_dim_invoice: Rows of the changed invoices as previously stored
+        fact, dim_invoice: The refreshed fact_step and dim_invoice tables
+        changed_keys (set): invoice_key of every changed invoice
+    """
+    steps = _with_invoice_month(fact, dim_invoice)
+    old_steps = _with_invoice_month(old_fact, old_dim_invoice)
+    changed_steps = steps[steps["invoice_key"].isin(changed_keys)]
+
+    rollups = {}
+    for table, grain in ROLLUPS.items():
+        affected = _group_ids(changed_steps, grain).union(_group_ids(old_steps, grain))
+        affected_keys = set(steps.loc[_group_ids(steps, grain).isin(affected), "invoice_key"])
+        fresh = build_rollups(
+            fact[fact["invoice_key"].isin(affected_keys)], dim_invoice[dim_invoice["invoice_key"].isin(affected_keys)]
+        )[table]
+        fresh = fresh[_group_ids(fresh, grain).isin(affected)]
+        kept = previous.get(table)
+        if kept is not None:
+            kept = kept[~_group_ids(kept, grain).isin(affected)]
+        rollups[table] = pd.concat([kept, fresh], ignore_index=True).sort_values(grain, ignore_index=True)
+    return rollups
+
+
+def _table_path(root, table):
+    return Path(root) / f"{table}.csv"
+
+
+def _invoice_partitions(dim_invoice: pd.DataFrame) -> pd.Series:
+    """Partition of each invoice, e.g. 'utility_type=gas/year=2024/month=03', indexed by invoice_key."""
+    labels = partition_labels(dim_invoice.rename(columns={"utility_type_key": "utility_type"}), "invoice_date")
+    return pd.Series(labels.to_numpy(), index=dim_invoice["invoice_key"].to_numpy())
+
+
+def _year_of(partition: str) -> str:
+    """The utility_type/year part of a partition name, which holds every rollup group of its invoices."""
+    return partition.rsplit("/", 1)[0]
+
+
+def star_schema_exists(root) -> bool:
+    """True if a partitioned star schema has been written to root (full=False can refresh it)."""
+    return (Path(root) / MANIFEST_NAME).exists()
+
+
+def _read_partitions(root, table, partitions, storage_format, schema):
+    frames = [load_layer(_partition_file(Path(root) / table, partition, storage_format), storage_format)
+              for partition in sorted(partitions)]
+    if not frames:
+        return None
+    return apply_column_schema(pd.concat(frames, ignore_index=True), schema)
+
+
+def load_star_table(root, table: str, storage_format: str = "csv", column_dtypes: dict = None) -> pd.DataFrame:
+    """Read one table of the star schema, all partitions of a partitioned one (None if it has not been written yet)."""
+    schema = {**(column_dtypes or {}), **STAR_DTYPES}
+    if table in PARTITIONED_TABLES:
+        if not star_schema_exists(root):
+            return None
+        partitions = load_manifest(root)["partitions"]
+        table_df = _read_partitions(root, table, partitions, storage_format, schema)
+        return table_df if table_df is not None else pd.DataFrame(
+            columns=FACT_COLUMNS if table == "fact_step" else INVOICE_COLUMNS)
+    path = _table_path(root, table)
+    if not layer_path(path, storage_format).exists():
+        return None
+    return apply_column_schema(load_layer(path, storage_format), schema)
+
+
+def _write_star_partitions(root, fact, dim_invoice, invoice_partitions, partitions, storage_format, schema, manifest):
+    """Write the fact_step and dim_invoice rows of partitions, removing partitions left without invoices."""
+    fact_partitions = invoice_partitions.reindex(fact["invoice_key"]).to_numpy()
+    dim_partitions = invoice_partitions.reindex(dim_invoice["invoice_key"]).to_numpy()
+    files = []
+    for partition in sorted(partitions):
+        dim_rows = dim_invoice[dim_partitions == partition]
+        if dim_rows.empty:
+            for table in PARTITIONED_TABLES:
+                shutil.rmtree(Path(root) / table / partition, ignore_errors=True)
+            manifest["partitions"].pop(partition, None)
+            continue
+        fact_rows = fact[fact_partitions == partition]
+        for table, rows in (("fact_step", fact_rows), ("dim_invoice", dim_rows)):
+            path = _partition_file(Path(root) / table, partition, storage_format)
+            _write_partition(rows, path, storage_format, schema)
+            files.append(path)
+        manifest["partitions"][partition] = {"invoices": len(dim_rows), "steps": len(fact_rows)}
+    return files
+
+
+def refresh_star_schema(gold_df: pd.DataFrame, root, storage_format: str = "csv", column_dtypes: dict = None,
+                        seasons: dict = None, full: bool = False) -> dict:
+    """
+    Materialise the star schema and rollups from gold rows.
+
+    fact_step and dim_invoice are written as folders partitioned by
+    utility_type / year / month of the invoice date (PARTITIONED_TABLES);
+    the other tables are one file each. A manifest maps every invoice to its
+    partition.
+
+    With full, the tables are rebuilt from gold_df (the whole gold layer).
+    Otherwise gold_df holds only new or changed invoices (as returned by
+    upsert_gold_partitions): their rows replace those invoices in the
+    partitions they are in now or were in before, the calendar is extended
+    to cover their dates, and only the rollup groups they fall into are
+    recomputed. Rollup groups never span more than one utility and invoice
+    year, so a refresh reads the partitions of those years only, and its
+    cost does not grow with the length of the history.
+
+    Parameters:
+        gold_df (pd.DataFrame): Gold rows (final_labels columns)
+        root (str): Folder the tables are written to
+        storage_format (str): 'csv' or 'parquet'
+        column_dtypes (dict): Schema of the gold columns
+        seasons (dict): The seasons config, for dim_season
+        full (bool): Rebuild instead of refreshing the changed invoices
+
+    Returns:
+        dict: {"invoices": invoices refreshed, "tables": {table: rows written}, "files": files written}
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    schema = {**(column_dtypes or {}), **STAR_DTYPES}
+    gold_df = apply_column_schema(gold_df, column_dtypes or {})
+
+    if not full and not star_schema_exists(root):
+        raise FileNotFoundError(f"No star schema in '{root}' to refresh; build it with full=True first")
+    if not full and gold_df.empty:
+        return {"invoices": 0, "tables": {}, "files": []}
+
+    fact = build_fact_step(gold_df)
+    dim_invoice = build_dim_invoice(gold_df)
+    changed_keys = set(dim_invoice["invoice_key"])
+    invoice_partitions = _invoice_partitions(dim_invoice)
+
+    if full:
+        manifest = {"partitions": {}, "invoices": {}}
+        for table in PARTITIONED_TABLES:
+            shutil.rmtree(root / table, ignore_errors=True)
+            # Single-file tables of earlier versions
+            layer_path(_table_path(root, table), storage_format).unlink(missing_ok=True)
+        partitions = set(invoice_partitions)
+    else:
+        manifest = load_manifest(root)
+        previous = {key: manifest["invoices"][key] for key in changed_keys if key in manifest["invoices"]}
+        partitions = set(invoice_partitions) | set(previous.values())
+
+        # Every invoice of the affected utility years: the rows the changed rollup groups are built from
+        years = {_year_of(partition) for partition in partitions}
+        context = [partition for partition in manifest["partitions"] if _year_of(partition) in years]
+        stored_fact = _read_partitions(root, "fact_step", context, storage_format, schema)
+        stored_dim_invoice = _read_partitions(root, "dim_invoice", context, storage_format, schema)
+        if stored_fact is None:
+            stored_fact = fact.iloc[:0]
+            stored_dim_invoice = dim_invoice.iloc[:0]
+        old_fact = stored_fact[stored_fact["invoice_key"].isin(changed_keys)]
+        old_dim_invoice = stored_dim_invoice[stored_dim_invoice["invoice_key"].isin(changed_keys)]
+
+        fact = pd.concat([stored_fact[~stored_fact["invoice_key"].isin(changed_keys)], fact], ignore_index=True)
+        dim_invoice = pd.concat(
+            [stored_dim_invoice[~stored_dim_invoice["invoice_key"].isin(changed_keys)], dim_invoice],
+            ignore_index=True
+        ).sort_values("invoice_key", ignore_index=True)
+        invoice_partitions = pd.concat([
+            pd.Series({key: label for key, label in manifest["invoices"].items()
+                       if _year_of(label) in years and key not in changed_keys}, dtype=object),
+            invoice_partitions,
+        ])
+
+    files = _write_star_partitions(root, fact, dim_invoice, invoice_partitions, partitions, storage_format, schema,
+                                   manifest)
+    for key in changed_keys:
+        manifest["invoices"][key] = invoice_partitions[key]
+    _save_manifest(root, manifest)
+
+    written_partitions = set(partitions) & set(manifest["partitions"])
+    tables = {}
+    rows = {
+        "fact_step": sum(manifest["partitions"][partition]["steps"] for partition in written_partitions),
+        "dim_invoice": sum(manifest["partitions"][partition]["invoices"] for partition in written_partitions),
+    }
+
+    date_columns = [col for col, dtype in (column_dtypes or {}).items() if dtype == "datetime" and col in gold_df]
+    dates = pd.concat([gold_df[col] for col in date_columns]).dropna()
+    existing_dim_date = None if full else load_star_table(root, "dim_date", storage_format, column_dtypes)
+    if existing_dim_date is not None:
+        dates = pd.concat([dates, existing_dim_date["date"]])
+    if not dates.empty and (existing_dim_date is None
+                            or dates.min() < existing_dim_date["date"].min()
+                            or dates.max() > existing_dim_date["date"].max()):
+        tables["dim_date"] = build_dim_date(dates.min(), dates.max())
+
+    tables["dim_season"] = build_dim_season(seasons or {})
+    utility_types = {partition.split("/", 1)[0].split("=", 1)[1] for partition in manifest["partitions"]}
+    utility_types.discard(NULL_PARTITION)
+    tables["dim_utility_type"] = build_dim_utility_type(utility_types)
+
+    if full:
+        tables.update(build_rollups(fact, dim_invoice))
+    else:
+        previous_rollups = {table: load_star_table(root, table, storage_format, column_dtypes) for table in ROLLUPS}
+        tables.update(refresh_rollups(previous_rollups, old_fact, old_dim_invoice, fact, dim_invoice, changed_keys))
+
+    files += [save_layer(df, _table_path(root, table), storage_format, schema) for table, df in tables.items()]
+    rows.update({table: len(df) for table, df in tables.items()})
+    return {"invoices": len(changed_keys), "tables": rows, "files": files}
@@ -1,220 +1,1097 @@
 import os
+import time
 import yaml
-import pandas as pd
 import argparse
+import importlib
+import threading
 from dotenv import load_dotenv
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
-from googleapiclient.errors import HttpError
+# Only the standard library, yaml and dependency-free pipeline modules are
+# imported here. Stage functions import pandas, pdfplumber and the Google
+# client themselves (see STAGE_IMPORTS), so e.g. `--stage load` never loads
+# the Gmail or PDF libraries
+from extract.sync_state import SyncState
+from parse.extractors import DEFAULT_EXTRACTOR
+from parse.text_cache import TextCache
+from load.queries import CANNED_QUERIES, GOLD_TABLE
+from monitor.metrics import RunMetrics
+from orchestrate.dag import Task, run_dag, save_dag_state, completed_tasks, task_id, FAILED, CANCELLED
+from orchestrate.watch import FolderWatcher
+from orchestrate.accounts import (account_names, account_config, account_environment, create_account_folders, cpu_share,
+                                  run_account, run_accounts)
 
-from extract.gmail_connector import connect_gmail
-from extract.email_filter import search_emails
-from extract.pdf_downloader import download_pdf_attachments
+UTILITY_NAMES = {"elec": "electricity", "water": "water", "gas": "gas"}
 
-from parse.pdf_parser_base import parse_all_pdfs
-from transform.standardize_df_cols import standardize_column_names, standardize_column_datatypes
-from transform.data_preprocess import fill_gas_invoice_start_end,fill_electricity_step_fields, clean_gas_season, classify_season, fill_missing_service_columns_for_water, fill_water_step_dates
+# Modules each command imports when it runs. Stage functions import what they
+# use themselves; this list lets long runs import everything up front and lets
+# benchmarks/startup_benchmark.py time each command's cold start
+STAGE_IMPORTS = {
+    "extract": ["extract.gmail_connector", "extract.gmail_client", "extract.email_filter", "extract.pdf_downloader"],
+    "parse": ["parse.pdf_parser_base", "load.save_load"],
+    "transform": ["transform.standardize_df_cols", "transform.date_parsing", "transform.data_preprocess",
+                  "transform.vectorized_preprocess", "load.save_load"],
+    "load": ["load.save_load", "load.gold_partitions", "load.star_schema", "load.query_store",
+             "transform.standardize_df_cols"],
+    "query": ["load.query_store"],
+}
 
-from load.save_load import save_dataframe_to_csv
+# Timings, row and byte counts of this run, written out by write_run_report
+metrics = RunMetrics()
 
+# Gmail client shared by the extract tracks, connected by the first one to need it
+_gmail_client = None
+_gmail_lock = threading.Lock()
 
-def run_extract_stage():
-    """Stage 1: Connect to Gmail and download PDFs"""
-    print("=== EXTRACT STAGE ===")
+# (start time, {utility: emails}) of the combined Gmail search of this run or daemon poll
+_gmail_search = None
+_gmail_search_lock = threading.Lock()
+
+
+def load_config(config_path):
+    """Read the pipeline config (with libyaml's C loader when available)"""
+    with open(config_path) as f:
+        return yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def preload_stages(stages):
+    """Import the modules of stages up front, so tasks on worker threads do not import them mid-run"""
+    for stage in stages:
+        for module in STAGE_IMPORTS[stage]:
+            importlib.import_module(module)
+
+
+def extract_utility(client, utility, emails, download_kwargs):
+    """Download the PDFs of one utility's emails, on connections from the client's pool"""
+    from extract.pdf_downloader import download_pdf_attachments
     
-    # Gmail connection
-    credentials_relative = os.getenv("GMAIL_CREDENTIALS_PATH")
-    token_relative = os.getenv("GMAIL_TOKEN_PATH")
+    with metrics.stage("extract", utility, per_thread=True) as record:
+        print(f"✓ Found {len(emails)} {UTILITY_NAMES[utility]} emails")
+        
+        pdf_filepath = BASE_DIR / config["paths"][f"{utility}_pdf_raw"]
+        stats = download_pdf_attachments(
+            client.service, emails, save_folder=pdf_filepath, connection=client.connection, **download_kwargs
+        )
+        record.rows_in = len(emails)
+        record.rows_out = stats["files"]
+        record.bytes_written = stats["bytes"]
+        record.succeeded = not stats["failed"]
+    return stats
+
+
+def persist_layer(df, output_path, writer=None, column_dtypes=None, storage_format=None, record=None):
+    """Save a layer now, or queue it on the background writer when one is given.
+    The size of the written file is added to the metrics record, if any"""
+    from load.save_load import save_layer
     
-    credentials_path = BASE_DIR / credentials_relative
-    token_path = BASE_DIR / token_relative
+    storage_format = storage_format or config.get("storage", {}).get("format", "csv")
+    on_saved = record.add_written if record is not None else None
+    if writer is not None:
+        writer.save(df, output_path, storage_format, column_dtypes, on_saved=on_saved)
+    else:
+        written = save_layer(df, output_path, storage_format, column_dtypes)
+        if on_saved is not None:
+            on_saved(written)
+
+
+def record_pdf_metrics(df, utility, record):
+    """Move the per-PDF timings of a parsed DataFrame (or batch) into the run metrics and flag slow PDFs"""
+    slow_pdf_seconds = config.get("monitoring", {}).get("slow_pdf_seconds")
+    pdf_timings = df.attrs.pop("pdf_timings", [])
     
-    service = connect_gmail(credentials_file=credentials_path, token_file=token_path)
+    record.rows_in += len(pdf_timings)
+    record.rows_out += len(df)
+    for pdf_path, extract_seconds, parse_seconds, backend_seconds, fell_back in pdf_timings:
+        record.add_read(pdf_path)
+        if extract_seconds is not None:
+            metrics.observe("pdf_extract_seconds", extract_seconds, utility, pdf_path)
+        # Per-backend latency, to compare a fast backend against pdfplumber
+        for backend, seconds in backend_seconds.items():
+            metrics.observe(f"pdf_extract_{backend}_seconds", seconds, utility, pdf_path)
+        metrics.observe("pdf_parse_seconds", parse_seconds, utility, pdf_path)
+        if fell_back:
+            metrics.count("pdf_extractor_fallbacks", utility)
+        
+        total_seconds = (extract_seconds or 0) + parse_seconds
+        if slow_pdf_seconds and total_seconds > slow_pdf_seconds:
+            print(f"✗ Slow PDF ({total_seconds:.1f}s): {pdf_path}")
+
+
+def transform_engine():
+    """Return the preprocessing module selected by transform.engine (vectorized or legacy)"""
+    from transform import data_preprocess, vectorized_preprocess
     
+    engine = config.get("transform", {}).get("engine", "vectorized")
+    if engine == "vectorized":
+        return vectorized_preprocess
+    if engine == "legacy":
+        return data_preprocess
+    raise ValueError(f"Unsupported transform engine: {engine}")
+
+
+def optimized_dtypes():
+    """True when transform.dtypes selects the memory-optimized dtypes"""
+    dtypes = config.get("transform", {}).get("dtypes", "standard")
+    if dtypes not in ("standard", "optimized"):
+        raise ValueError(f"Unsupported transform dtypes: {dtypes}")
+    return dtypes == "optimized"
+
+
+def optimize_dtypes(df, label):
+    """Store df in the optimized dtypes from the transform config, reporting its bytes per row before and after"""
+    from transform.standardize_df_cols import CATEGORICAL_COLUMNS, optimize_column_dtypes, bytes_per_row
     
+    transform_options = config.get("transform", {})
+    before = bytes_per_row(df)
+    df = optimize_column_dtypes(
+        df, config["column_dtypes"],
+        transform_options.get("categorical_columns", CATEGORICAL_COLUMNS),
+        transform_options.get("downcast_floats", False)
+    )
+    if transform_options.get("memory_report", True):
+        after = bytes_per_row(df)
+        if after < before:
+            print(f"✓ {label} memory: {before:,.0f} -> {after:,.0f} bytes/row "
+                  f"({(before - after) / before:.0%} smaller, {len(df) * after / 1e6:,.1f} MB for {len(df):,} rows)")
+        else:
+            print(f"✓ {label} memory: {after:,.0f} bytes/row ({len(df) * after / 1e6:,.1f} MB for {len(df):,} rows)")
+    return df
 
-    # Verify connection
-    try:
-        profile = service.users().getProfile(userId='me').execute()
-        print("✓ Gmail connection successful!")
-        print(f"✓ Email address: {profile.get('emailAddress')}")
+
+def connect_gmail_service():
+    """Connect to Gmail once per process. Returns the shared GmailClient, or None if it failed.
+    No request is sent to check the connection: the first search reports a failing one"""
+    from extract.gmail_connector import connect_gmail
+    from extract.gmail_client import GmailClient
+    
+    global _gmail_client
+    with _gmail_lock:
+        if _gmail_client is not None:
+            return _gmail_client
+        
+        # Gmail connection
+        credentials_relative = os.getenv("GMAIL_CREDENTIALS_PATH")
+        token_relative = os.getenv("GMAIL_TOKEN_PATH")
         
-        messages = service.users().messages().list(userId='me', maxResults=5).execute()
-        print(f"✓ Found {len(messages.get('messages', []))} messages")
+        credentials_path = BASE_DIR / credentials_relative
+        token_path = BASE_DIR / token_relative
+        
+        # The discovery document is read from a local cache instead of being rebuilt every run
+        discovery_cache = config["paths"].get("gmail_discovery_cache")
+        try:
+            service = connect_gmail(
+                credentials_file=credentials_path, token_file=token_path,
+                discovery_cache=BASE_DIR / discovery_cache if discovery_cache else None
+            )
+        except Exception as error:
+            print(f"✗ Gmail connection failed: {type(error).__name__}: {error}")
+            return None
+        print("✓ Gmail connection ready")
         
-    except HttpError as error:
-        print(f"✗ Gmail connection failed: {error}")
+        _gmail_client = GmailClient(service)
+        return _gmail_client
+
+
+def search_gmail(sync_state, download_kwargs):
+    """
+    Find the emails of every utility with one combined Gmail search, run by
+    the first extract track to need it; the other tracks reuse its result.
+    Returns (search start time, {utility: emails}, utilities whose search is incomplete),
+    or None if Gmail is unavailable
+    """
+    global _gmail_search
+    client = connect_gmail_service()
+    if client is None:
+        return None
+    
+    with _gmail_search_lock:
+        if _gmail_search is None:
+            queries = config["gmail_queries"]
+            after = {utility: sync_state.after(query) if sync_state else None for utility, query in queries.items()}
+            started = time.time()
+            with metrics.stage("extract", "search") as record:
+                emails, incomplete = client.search_by_sender(
+                    queries, after, batch_size=download_kwargs["batch_size"], max_retries=download_kwargs["max_retries"]
+                )
+                record.rows_out = sum(len(messages) for messages in emails.values())
+            _gmail_search = (started, emails, incomplete)
+        return _gmail_search
+
+
+def extract_settings(incremental=None):
+    """Return the sync state (None unless gmail.incremental, or incremental overrides it) and
+    download options of the extract tracks"""
+    # Incremental sync lists only messages newer than each query's watermark
+    gmail_options = config.get("gmail", {})
+    sync_state = None
+    if incremental if incremental is not None else gmail_options.get("incremental", False):
+        sync_state = SyncState(
+            BASE_DIR / config["paths"]["gmail_sync_state"],
+            overlap_seconds=gmail_options.get("sync_overlap_hours", 24) * 60 * 60
+        )
+    
+    download_kwargs = {
+        "batch_size": gmail_options.get("batch_size", 50),
+        "max_retries": gmail_options.get("max_retries", 3),
+        "max_workers": gmail_options.get("download_workers", 1),
+    }
+    return sync_state, download_kwargs
+
+
+def extract_track(utility, sync_state, download_kwargs):
+    """Extract one utility's PDFs and advance its sync watermark. Returns False on failure"""
+    search = search_gmail(sync_state, download_kwargs)
+    if search is None:
+        return False
+    
+    sync_started, emails, incomplete = search
+    stats = extract_utility(connect_gmail_service(), utility, emails.get(utility, []), download_kwargs)
+    if stats["failed"]:
+        print(f"✗ {stats['failed']} {UTILITY_NAMES[utility]} downloads failed")
         return False
     
-    # Search for emails
-    elec_search_query = config["gmail_queries"]["elec"]
-    water_search_query = config["gmail_queries"]["water"]
-    gas_search_query = config["gmail_queries"]["gas"]
+    if sync_state and utility in incomplete:
+        # An email the search could not fetch may be this utility's, so it is listed again next time
+        print(f"{UTILITY_NAMES[utility].capitalize()} sync watermark not advanced: some emails could not be fetched")
+    elif sync_state:
+        # Only advance a watermark once all of that query's downloads have completed
+        sync_state.set(config["gmail_queries"][utility], sync_started)
+        sync_state.save()
+    return True
+
+
+def run_extract_stage():
+    """Stage 1: Connect to Gmail and download PDFs"""
+    print("=== EXTRACT STAGE ===")
     
-    elec_emails = search_emails(service, elec_search_query)
-    water_emails = search_emails(service, water_search_query)
-    gas_emails = search_emails(service, gas_search_query)
+    if connect_gmail_service() is None:
+        return False
+    
+    sync_state, download_kwargs = extract_settings()
     
-    print(f"✓ Found {len(elec_emails)} electricity emails")
-    print(f"✓ Found {len(water_emails)} water emails") 
-    print(f"✓ Found {len(gas_emails)} gas emails")
+    # One combined search, then the three utilities download concurrently
+    with ThreadPoolExecutor(max_workers=len(UTILITY_NAMES)) as executor:
+        futures = {
+            utility: executor.submit(extract_track, utility, sync_state, download_kwargs)
+            for utility in UTILITY_NAMES
+        }
     
-    # Download PDFs
-    elec_pdf_filepath = BASE_DIR / config["paths"]["elec_pdf_raw"]
-    water_pdf_filepath = BASE_DIR / config["paths"]["water_pdf_raw"]
-    gas_pdf_filepath = BASE_DIR / config["paths"]["gas_pdf_raw"]
+    all_succeeded = True
+    for utility, future in futures.items():
+        error = future.exception()
+        if error is not None:
+            print(f"✗ {UTILITY_NAMES[utility]} extract failed: {error}")
+            all_succeeded = False
+        elif future.result() is False:
+            all_succeeded = False
     
-    download_pdf_attachments(service, elec_emails, save_folder=elec_pdf_filepath)
-    download_pdf_attachments(service, gas_emails, save_folder=gas_pdf_filepath)
-    download_pdf_attachments(service, water_emails, save_folder=water_pdf_filepath)
+    if not all_succeeded:
+        print("✗ Extract stage finished with failures")
+        return False
     
     print("✓ Extract stage completed!")
     return True
 
 
-def run_parse_stage():
-    """Stage 2: Parse PDFs to CSV"""
-    print("=== PARSE STAGE ===")
+def parse_settings(utility=None):
+    """Return the parse_all_pdfs options for a utility from the parse config, with a text cache if enabled"""
+    from parse.pdf_parser_base import EXTRACTOR_VERSION
     
-    elec_pdf_filepath = BASE_DIR / config["paths"]["elec_pdf_raw"]
-    water_pdf_filepath = BASE_DIR / config["paths"]["water_pdf_raw"]
-    gas_pdf_filepath = BASE_DIR / config["paths"]["gas_pdf_raw"]
+    parse_options = config.get("parse", {})
     
-    # Parse PDFs
-    elec_df = parse_all_pdfs(elec_pdf_filepath, "elec")
-    water_df = parse_all_pdfs(water_pdf_filepath, "water")
-    gas_df = parse_all_pdfs(gas_pdf_filepath, "gas")
+    # Per-utility backend overrides, else parse.extractor, else the provider parser's own choice
+    extractor = parse_options.get("extractors", {}).get(utility) or parse_options.get("extractor")
+    
+    # Cache extracted text so a regex change only re-runs the parsers
+    text_cache = None
+    text_cache_options = parse_options.get("text_cache", {})
+    if text_cache_options.get("enabled", False):
+        text_cache = TextCache(
+            BASE_DIR / config["paths"]["text_cache_dir"],
+            version=EXTRACTOR_VERSION,
+            max_bytes=text_cache_options.get("max_mb", 512) * 1024 * 1024
+        )
     
-    print(f"✓ Parsed {len(elec_df)} electricity records")
-    print(f"✓ Parsed {len(water_df)} water records")
-    print(f"✓ Parsed {len(gas_df)} gas records")
+    return {
+        "workers": parse_options.get("workers", 1),
+        "chunksize": parse_options.get("chunksize", 8),
+        "text_cache": text_cache,
+        "parser_modules": parse_options.get("parser_modules", []),
+        "extractor": extractor,
+        "fallback_extractor": parse_options.get("extractor_fallback", DEFAULT_EXTRACTOR),
+    }
+
+
+def parse_track(utility, persist=True, writer=None):
+    """Parse one utility's PDFs into its bronze DataFrame, saving it when persist is set"""
+    from parse.pdf_parser_base import parse_all_pdfs
     
-    # Save raw CSVs
-    elec_raw_df_output_path = BASE_DIR / config["paths"]["elec_df_raw"]
-    water_raw_df_output_path = BASE_DIR / config["paths"]["water_df_raw"]
-    gas_raw_df_output_path = BASE_DIR / config["paths"]["gas_df_raw"]
+    if config.get("parse", {}).get("streaming", False):
+        return stream_parse_track(utility)
     
-    save_dataframe_to_csv(elec_df, elec_raw_df_output_path)
-    save_dataframe_to_csv(water_df, water_raw_df_output_path)
-    save_dataframe_to_csv(gas_df, gas_raw_df_output_path)
+    with metrics.stage("parse", utility) as record:
+        pdf_filepath = BASE_DIR / config["paths"][f"{utility}_pdf_raw"]
+        df = parse_all_pdfs(pdf_filepath, utility, **parse_settings(utility))
+        record_pdf_metrics(df, utility, record)
+    print(f"✓ Parsed {len(df)} {UTILITY_NAMES[utility]} records")
     
-    print("✓ Parse stage completed!")
-    return True
+    failed_count = len(df.attrs["failed_files"])
+    if failed_count:
+        print(f"✗ {failed_count} {UTILITY_NAMES[utility]} PDFs could not be parsed and were skipped")
+    
+    # Save raw CSV
+    if persist:
+        persist_layer(df, BASE_DIR / config["paths"][f"{utility}_df_raw"], writer, record=record)
+    return df
 
 
-def run_transform_stage():
-    """Stage 3: Transform data to silver layer"""
-    print("=== TRANSFORM STAGE ===")
+def stream_parse_track(utility):
+    """
+    Parse one utility's PDFs in streaming mode: rows are written to the bronze
+    layer in batches of parse.batch_rows as the PDFs are parsed, so memory
+    stays flat however many PDFs there are. The bronze layer is always
+    written, and None is returned, so the transform reads it back from disk
+    """
+    from parse.pdf_parser_base import iter_parsed_batches, list_pdfs
+    from load.save_load import BatchLayerWriter
+    
+    parse_options = config.get("parse", {})
+    storage_format = config.get("storage", {}).get("format", "csv")
+    pdf_filepath = BASE_DIR / config["paths"][f"{utility}_pdf_raw"]
+    parse_kwargs = parse_settings(utility)
     
-    # Load raw data
-    elec_raw_df_output_path = BASE_DIR / config["paths"]["elec_df_raw"]
-    water_raw_df_output_path = BASE_DIR / config["paths"]["water_df_raw"]
-    gas_raw_df_output_path = BASE_DIR / config["paths"]["gas_df_raw"]
+    failed_count = 0
+    with metrics.stage("parse", utility) as record:
+        with BatchLayerWriter(BASE_DIR / config["paths"][f"{utility}_df_raw"], storage_format) as batch_writer:
+            batches = iter_parsed_batches(
+                list_pdfs(pdf_filepath), utility, batch_rows=parse_options.get("batch_rows", 50000), **parse_kwargs
+            )
+            for batch in batches:
+                failed_count += len(batch.attrs["failed_files"])
+                record_pdf_metrics(batch, utility, record)
+                batch_writer.write(batch)
+        record.add_written(batch_writer.path)
+    print(f"✓ Parsed {batch_writer.rows} {UTILITY_NAMES[utility]} records")
+    
+    if failed_count:
+        print(f"✗ {failed_count} {UTILITY_NAMES[utility]} PDFs could not be parsed and were skipped")
+    return None
+
+
+def run_parse_stage(persist=True, writer=None):
+    """Stage 2: Parse PDFs to CSV. Returns the bronze DataFrames by utility (None in streaming mode)"""
+    print("=== PARSE STAGE ===")
+    
+    # Parse PDFs
+    bronze = {utility: parse_track(utility, persist, writer) for utility in UTILITY_NAMES}
     
-    elec_df_silver = pd.read_csv(elec_raw_df_output_path)
-    water_df_silver = pd.read_csv(water_raw_df_output_path)
-    gas_df_silver = pd.read_csv(gas_raw_df_output_path)
+    print("✓ Parse stage completed!")
+    return bronze
+
+
+def transform_utility(df, utility, preprocess, date_parser=None):
+    """Turn one utility's bronze DataFrame into its silver DataFrame"""
+    from transform.standardize_df_cols import standardize_column_names, standardize_column_datatypes
     
     # Rename columns
     final_labels = config["columns"]["final_labels"]
-    elec_rename = config["columns"]["elec_rename"]
-    water_rename = config["columns"]["water_rename"]
-    gas_rename = config["columns"]["gas_rename"]
-    
-    elec_df_silver.columns = elec_rename
-    water_df_silver.columns = water_rename
-    gas_df_silver.columns = gas_rename
+    df.columns = config["columns"][f"{utility}_rename"]
     
     # Standardize columns
-    elec_df_silver = standardize_column_names(elec_df_silver, final_labels)
-    water_df_silver = standardize_column_names(water_df_silver, final_labels)
-    gas_df_silver = standardize_column_names(gas_df_silver, final_labels)
+    df = standardize_column_names(df, final_labels)
     
     # Process missing values
-    elec_df_silver = fill_electricity_step_fields(elec_df_silver)
-    water_df_silver = fill_missing_service_columns_for_water(water_df_silver)
-    gas_df_silver = fill_gas_invoice_start_end(gas_df_silver)
-    gas_df_silver = clean_gas_season(gas_df_silver)
+    if utility == "elec":
+        df = preprocess.fill_electricity_step_fields(df)
+    elif utility == "water":
+        df = preprocess.fill_missing_service_columns_for_water(df)
+    elif utility == "gas":
+        df = preprocess.fill_gas_invoice_start_end(df)
+        df = preprocess.clean_gas_season(df)
     
     # Standardize data types
-    dtypes = config["column_dtypes"]
-    elec_df_silver = standardize_column_datatypes(elec_df_silver, dtypes, "elec")
-    water_df_silver = standardize_column_datatypes(water_df_silver, dtypes, "water")
-    gas_df_silver = standardize_column_datatypes(gas_df_silver, dtypes, "gas")
-    
-    # Add seasons
-    summer_months = config["seasons"]["summer"]
-    elec_df_silver["season"] = elec_df_silver["invoice_start"].apply(
-        lambda x: classify_season(x, summer_months)
-    )
-    water_df_silver["season"] = water_df_silver["invoice_start"].apply(
-        lambda x: classify_season(x, summer_months)
-    )
+    df = standardize_column_datatypes(df, config["column_dtypes"], utility, date_parser)
+    
+    # Add seasons (gas bills state their own)
+    if utility in ("elec", "water"):
+        df["season"] = preprocess.classify_season_series(df["invoice_start"], config["seasons"]["summer"])
     
     # Fill water step dates
-    water_df_silver = fill_water_step_dates(water_df_silver)
+    if utility == "water":
+        df = preprocess.fill_water_step_dates(df)
+    
+    # Compact dtypes once every column has its final values
+    if optimized_dtypes():
+        df = optimize_dtypes(df, f"{utility} silver")
+    
+    return df
+
+
+def date_parser_from_config():
+    """Return the DateParser for the dates config, or None when memoization is disabled"""
+    from transform.date_parsing import DateParser
+    
+    date_options = config.get("dates", {})
+    return DateParser(date_options.get("formats", {})) if date_options.get("memoize", True) else None
+
+
+def transform_track(utility, bronze_df=None, preprocess=None, date_parser=None, persist=True, writer=None):
+    """
+    Transform one utility's bronze layer into its silver DataFrame, saving it when persist is set.
+    Without a bronze_df (in-memory handoff) the bronze layer is read from disk
+    """
+    from load.save_load import load_layer, layer_path
+    
+    storage_format = config.get("storage", {}).get("format", "csv")
+    preprocess = preprocess or transform_engine()
+    
+    with metrics.stage("transform", utility) as record:
+        if bronze_df is not None:
+            # In-memory handoff from the parse stage; copy so the bronze frame stays untouched
+            df = bronze_df.copy()
+        else:
+            # Load raw data
+            raw_df_path = BASE_DIR / config["paths"][f"{utility}_df_raw"]
+            df = load_layer(raw_df_path, storage_format)
+            record.add_read(layer_path(raw_df_path, storage_format))
+        record.rows_in = len(df)
+        
+        silver_df = transform_utility(df, utility, preprocess, date_parser)
+        record.rows_out = len(silver_df)
     
     # Save silver layer
-    elec_silver_output_path = BASE_DIR / config["paths"]["elec_silver_output_path"]
-    water_silver_output_path = BASE_DIR / config["paths"]["water_silver_output_path"]
-    gas_silver_output_path = BASE_DIR / config["paths"]["gas_silver_output_path"]
+    if persist:
+        silver_output_path = BASE_DIR / config["paths"][f"{utility}_silver_output_path"]
+        persist_layer(silver_df, silver_output_path, writer, column_dtypes=config["column_dtypes"], record=record)
+    return silver_df
+
+
+def print_date_stats(date_parser):
+    """Print how many distinct dates the transform parsed and served from the cache"""
+    if date_parser is not None:
+        date_stats = date_parser.stats()
+        print(f"✓ Parsed {date_stats['misses']} distinct dates ({date_stats['hits']} cache hits)")
+
+
+def run_transform_stage(bronze=None, persist=True, writer=None):
+    """Stage 3: Transform data to silver layer. Returns the silver DataFrames by utility"""
+    print("=== TRANSFORM STAGE ===")
+    
+    # Pick the preprocessing implementation
+    preprocess = transform_engine()
     
-    save_dataframe_to_csv(elec_df_silver, elec_silver_output_path)
-    save_dataframe_to_csv(water_df_silver, water_silver_output_path)
-    save_dataframe_to_csv(gas_df_silver, gas_silver_output_path)
+    # One date parser for all utilities, so repeated dates are parsed once
+    date_parser = date_parser_from_config()
+    
+    silver = {}
+    for utility in UTILITY_NAMES:
+        bronze_df = bronze[utility] if bronze is not None else None
+        silver[utility] = transform_track(utility, bronze_df, preprocess, date_parser, persist, writer)
+    
+    print_date_stats(date_parser)
     
     print("✓ Transform stage completed!")
-    return True
+    return silver
 
 
-def run_load_stage():
-    """Stage 4: Combine data to gold layer"""
+def run_load_stage(silver=None, persist=True, writer=None):
+    """Stage 4: Combine data to gold layer. Returns the gold DataFrame.
+    Utilities missing from silver (or all of them, without silver) are read from disk"""
+    import pandas as pd
+    from load.save_load import load_layer, layer_path
+    from transform.standardize_df_cols import concat_optimized
+    
     print("=== LOAD STAGE ===")
     
-    # Load silver data
-    elec_silver_output_path = BASE_DIR / config["paths"]["elec_silver_output_path"]
-    water_silver_output_path = BASE_DIR / config["paths"]["water_silver_output_path"]
-    gas_silver_output_path = BASE_DIR / config["paths"]["gas_silver_output_path"]
+    storage_options = config.get("storage", {})
+    storage_format = storage_options.get("format", "csv")
+    final_labels = config["columns"]["final_labels"]
+    
+    frames = {}
+    for utility in UTILITY_NAMES:
+        with metrics.stage("load", utility) as record:
+            if silver is not None and silver.get(utility) is not None:
+                # In-memory handoff from the transform stage
+                df = silver[utility][final_labels]
+            else:
+                # Parquet silver comes back typed; only the final columns are read
+                silver_output_path = BASE_DIR / config["paths"][f"{utility}_silver_output_path"]
+                df = load_layer(silver_output_path, storage_format, columns=final_labels)
+                record.add_read(layer_path(silver_output_path, storage_format))
+            record.rows_in = len(df)
+        frames[utility] = df
     
-    elec_df_combine = pd.read_csv(elec_silver_output_path)
-    water_df_combine = pd.read_csv(water_silver_output_path)
-    gas_df_combine = pd.read_csv(gas_silver_output_path)
+    with metrics.stage("load", "gold") as record:
+        # Combine datasets
+        if optimized_dtypes():
+            # Keep the silver categoricals, then optimize the columns read back from disk
+            utilities_gold_df = optimize_dtypes(concat_optimized(frames.values()), "gold")
+        else:
+            utilities_gold_df = pd.concat(frames.values(), ignore_index=True)
+        
+        print(f"✓ Combined {len(utilities_gold_df)} total records")
+        
+        gold_options = config.get("gold", {})
+        if gold_options.get("mode", "full") == "incremental":
+            return load_gold_incrementally(utilities_gold_df, storage_format, persist, writer, record, frames)
+        
+        record.rows_out = len(utilities_gold_df)
+        
+        # Save gold layer
+        if persist:
+            utilities_gold_output_path = BASE_DIR / config["paths"]["utiltities_gold_output_path"]
+            persist_layer(utilities_gold_df, utilities_gold_output_path, writer, column_dtypes=config["column_dtypes"],
+                          record=record)
+            
+            # The PowerBI dashboard reads the gold CSV
+            if storage_format != "csv" and storage_options.get("export_gold_csv", True):
+                persist_layer(utilities_gold_df, utilities_gold_output_path, writer, storage_format="csv", record=record)
     
-    # Combine datasets
-    utilities_gold_df = pd.concat([elec_df_combine, water_df_combine, gas_df_combine], ignore_index=True)
+    update_star_schema(utilities_gold_df)
+    update_query_store(utilities_gold_df, frames)
     
-    print(f"✓ Combined {len(utilities_gold_df)} total records")
+    print("✓ Load stage completed!")
+    return {"gold": utilities_gold_df}
+
+
+def load_gold_incrementally(utilities_gold_df, storage_format, persist=True, writer=None, record=None,
+                            silver_frames=None, partial_silver=False):
+    """
+    Upsert the gold rows into the partitioned gold dataset, rewriting only
+    the partitions of new or changed invoices. Returns the upserted rows.
+    With partial_silver, silver_frames hold only the new invoices too
+    """
+    from load.gold_partitions import upsert_gold_partitions, read_gold_partitions
+    
+    gold_options = config.get("gold", {})
+    partitions_dir = BASE_DIR / config["paths"]["gold_partitions_dir"]
+    date_column = gold_options.get("partition_date_column", "invoice_date")
+    
+    result = upsert_gold_partitions(
+        utilities_gold_df, partitions_dir, storage_format,
+        column_dtypes=config["column_dtypes"], date_column=date_column
+    )
+    print(f"✓ Upserted {len(result['rows'])} records from {result['invoices']} new or changed invoices "
+          f"into {len(result['partitions'])} partitions")
+    if record is not None:
+        record.rows_out = len(result["rows"])
+        for written in result["files"]:
+            record.add_written(written)
     
-    # Save gold layer
-    utilities_gold_output_path = BASE_DIR / config["paths"]["utiltities_gold_output_path"]
-    save_dataframe_to_csv(utilities_gold_df, utilities_gold_output_path)
+    # The PowerBI dashboard reads the gold CSV, rebuilt from the partitions when anything changed
+    if persist and result["partitions"] and config.get("storage", {}).get("export_gold_csv", True):
+        utilities_gold_output_path = BASE_DIR / config["paths"]["utiltities_gold_output_path"]
+        gold_df = read_gold_partitions(partitions_dir, storage_format, date_column=date_column)
+        persist_layer(gold_df, utilities_gold_output_path, writer, storage_format="csv", record=record)
+    
+    update_star_schema(result["rows"], incremental=True)
+    update_query_store(result["rows"], silver_frames or {}, incremental=True, partial_silver=partial_silver)
     
     print("✓ Load stage completed!")
-    return True
+    return {"gold": result["rows"], "changed_partitions": result["partitions"]}
+
+
+def update_star_schema(gold_df, incremental=False):
+    """
+    Materialise the star schema (fact_step and dimensions) and the monthly and
+    seasonal rollups for the dashboard, if star_schema.enabled. In incremental
+    mode gold_df holds only new or changed invoices, and only they are refreshed
+    """
+    from load.gold_partitions import read_gold_partitions
+    from load.star_schema import refresh_star_schema, star_schema_exists
+    
+    if not config.get("star_schema", {}).get("enabled", False):
+        return
+    
+    storage_format = config.get("storage", {}).get("format", "csv")
+    star_dir = BASE_DIR / config["paths"]["star_schema_dir"]
+    full = not incremental or not star_schema_exists(star_dir)
+    if incremental and full:
+        # A new star schema starts from the whole partitioned gold dataset
+        gold_df = read_gold_partitions(
+            BASE_DIR / config["paths"]["gold_partitions_dir"], storage_format,
+            date_column=config.get("gold", {}).get("partition_date_column", "invoice_date")
+        )
+    
+    with metrics.stage("load", "star_schema") as record:
+        result = refresh_star_schema(
+            gold_df, star_dir, storage_format, config["column_dtypes"], config["seasons"], full=full
+        )
+        record.rows_out = sum(result["tables"].values())
+        for written in result["files"]:
+            record.add_written(written)
+    print(f"✓ Star schema {'rebuilt' if full else 'refreshed'} for {result['invoices']} invoices in {star_dir}")
+
+
+def update_query_store(gold_df, silver_frames, incremental=False, partial_silver=False):
+    """
+    Write the gold and silver data into the indexed SQLite query store, if
+    query_store.enabled. In incremental mode gold_df holds only new or changed
+    invoices, which replace their previous rows in the store. With
+    partial_silver the silver frames are upserted the same way (daemon cycles)
+    """
+    from load.gold_partitions import read_gold_partitions
+    from load.query_store import write_query_store, has_table
+    
+    store_options = config.get("query_store", {})
+    if not store_options.get("enabled", False):
+        return
+    
+    store_path = BASE_DIR / config["paths"]["query_store"]
+    upsert_tables = ()
+    if incremental:
+        if has_table(store_path, GOLD_TABLE):
+            upsert_tables = (GOLD_TABLE,)
+        else:
+            # A new store starts from the whole partitioned gold dataset
+            gold_df = read_gold_partitions(
+                BASE_DIR / config["paths"]["gold_partitions_dir"], config.get("storage", {}).get("format", "csv"),
+                date_column=config.get("gold", {}).get("partition_date_column", "invoice_date")
+            )
+    
+    tables = {GOLD_TABLE: gold_df}
+    if store_options.get("silver", True):
+        tables.update({f"silver_{utility}": df for utility, df in silver_frames.items()})
+        if partial_silver:
+            upsert_tables += tuple(f"silver_{utility}" for utility in silver_frames
+                                   if has_table(store_path, f"silver_{utility}"))
+    
+    with metrics.stage("load", "query_store") as record:
+        written = write_query_store(store_path, tables, config["column_dtypes"], upsert_tables)
+        record.rows_out = sum(written.values())
+        record.add_written(store_path)
+    print(f"✓ Query store updated: {written[GOLD_TABLE]} gold rows written to {store_path}")
+
+
+def print_query(name, args):
+    """Run a canned query against the query store and print the result"""
+    from load.query_store import run_query
+    
+    store_path = BASE_DIR / config["paths"]["query_store"]
+    result, seconds = run_query(
+        store_path, name, utility_type=args.utility, year=args.year, start=args.start, end=args.end,
+        invoice_number=args.invoice, limit=args.limit
+    )
+    print(result.to_string(index=False) if len(result) else "(no rows)")
+    print(f"✓ {len(result)} rows in {seconds * 1000:.1f} ms")
+
+
+def run_stage(stage_name, stage_func, *args, **kwargs):
+    """Run a stage function, measured as one record of the run metrics"""
+    with metrics.stage(stage_name) as record:
+        result = stage_func(*args, **kwargs)
+        record.succeeded = result is not False
+    return result
+
+
+def write_run_report(succeeded):
+    """Write the run metrics as a JSON report and a Prometheus textfile, and print where time went"""
+    monitoring_options = config.get("monitoring", {})
+    if not monitoring_options.get("enabled", True):
+        return
+    
+    report_path = BASE_DIR / config["paths"]["run_report"]
+    textfile_path = BASE_DIR / config["paths"]["metrics_textfile"]
+    metrics.write_json(report_path, succeeded)
+    metrics.write_prometheus(textfile_path, succeeded)
+    
+    for line in metrics.summary(limit=monitoring_options.get("summary_lines", 5)):
+        print(line)
+    print(f"✓ Run report written to {report_path}")
+
+
+def pipeline_tasks(in_memory=False, persist=True, writer=None, date_parser=None):
+    """
+    Build the DAG of a full run: an extract -> parse -> transform track per
+    utility, all feeding the load of the gold layer. Tracks share nothing
+    before the load, so they run concurrently. In in-memory mode each task
+    hands its DataFrame to the next; otherwise, or when the upstream task was
+    completed by an earlier run, the next task reads the layer from disk.
+    """
+    sync_state, download_kwargs = extract_settings()
+    preprocess = transform_engine()
+    retries = config.get("pipeline", {}).get("task_retries", 0)
+    
+    def handoff(inputs, key):
+        return inputs.get(key) if in_memory else None
+    
+    tasks = []
+    for utility in UTILITY_NAMES:
+        extract_key, parse_key, transform_key = (utility, "extract"), (utility, "parse"), (utility, "transform")
+        tasks += [
+            Task(extract_key, lambda inputs, utility=utility: extract_track(utility, sync_state, download_kwargs),
+                 retries=retries),
+            Task(parse_key, lambda inputs, utility=utility: parse_track(utility, persist, writer),
+                 deps=[extract_key], retries=retries),
+            Task(transform_key, lambda inputs, utility=utility, key=parse_key: transform_track(
+                     utility, handoff(inputs, key), preprocess, date_parser, persist, writer),
+                 deps=[parse_key], retries=retries),
+        ]
+    
+    transform_keys = [(utility, "transform") for utility in UTILITY_NAMES]
+    tasks.append(Task(
+        ("gold", "load"),
+        lambda inputs: run_load_stage({key[0]: handoff(inputs, key) for key in transform_keys}, persist, writer),
+        deps=transform_keys, retries=retries
+    ))
+    return tasks
 
 
-def run_full_pipeline():
-    """Run all stages in sequence"""
+def run_full_pipeline(retry_failed=False):
+    """
+    Run all stages as a DAG of per-utility tasks (see pipeline_tasks).
+    
+    The elec, water and gas tracks run concurrently (pipeline.max_parallel_tasks).
+    A failed task cancels the tasks downstream of it, while the other tracks
+    carry on. Task states are saved to paths.pipeline_state, so with
+    retry_failed only the tasks that failed or were cancelled are re-run.
+    
+    With pipeline.in_memory enabled, each task hands its DataFrame straight
+    to the next instead of re-reading it from disk. Layers are then only
+    persisted as a side output (pipeline.persist_layers), on a background
+    writer thread unless pipeline.async_writes is disabled.
+    """
+    from load.save_load import LayerWriter
+    
     print("🚀 Starting full utility bill pipeline...")
     
-    stages = [
-        ("extract", run_extract_stage),
-        ("parse", run_parse_stage), 
-        ("transform", run_transform_stage),
-        ("load", run_load_stage)
-    ]
+    preload_stages(["extract", "parse", "transform", "load"])
+    
+    pipeline_options = config.get("pipeline", {})
+    in_memory = pipeline_options.get("in_memory", False)
+    persist = not in_memory or pipeline_options.get("persist_layers", True)
+    writer = LayerWriter() if in_memory and persist and pipeline_options.get("async_writes", True) else None
+    
+    # One date parser for all utilities, so repeated dates are parsed once
+    date_parser = date_parser_from_config()
+    tasks = pipeline_tasks(in_memory, persist, writer, date_parser)
+    
+    state_path = BASE_DIR / config["paths"]["pipeline_state"]
+    skip = set()
+    if retry_failed:
+        if persist:
+            skip = completed_tasks(state_path, tasks)
+            print(f"✓ Retrying: {len(skip)} of {len(tasks)} tasks completed in the last run are skipped")
+        else:
+            # Completed tasks left no layers on disk for the retried tasks to read
+            print("✗ Retrying needs persisted layers (pipeline.persist_layers); running all tasks")
+    
+    with metrics.stage("pipeline") as record:
+        results = run_dag(tasks, max_workers=pipeline_options.get("max_parallel_tasks"), skip=skip)
+        save_dag_state(state_path, results)
+        
+        succeeded = True
+        for key, result in results.items():
+            if result.state == FAILED:
+                print(f"✗ {task_id(key)} failed after {result.attempts} attempt(s): {result.error}")
+                succeeded = False
+            elif result.state == CANCELLED:
+                print(f"✗ {task_id(key)} cancelled: {result.error}")
+                succeeded = False
+        print_date_stats(date_parser)
+        
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception as e:
+                print(f"✗ Failed to persist layers: {e}")
+                succeeded = False
+        record.succeeded = succeeded
+    
+    if not succeeded:
+        print("✗ Pipeline failed; re-run only the failed tracks with: python main.py --retry-failed")
+        return False
+    
+    print("🎉 Pipeline completed successfully!")
+    return True
+
+
+def ingest_new_pdfs(new_files, preprocess=None, date_parser=None):
+    """
+    Push newly arrived PDFs through parse, transform and load (one daemon cycle).
+    
+    Only the new PDFs are parsed and transformed. Their rows replace the rows
+    of the same invoices in the bronze and silver layers, and are upserted
+    into the partitioned gold dataset with gold.mode incremental; in full
+    mode the gold layer is rebuilt from the silver layers. Returns False if
+    any step failed, so the files are offered again on the next poll
+    """
+    import pandas as pd
+    from parse.pdf_parser_base import parse_pdf_files
+    from load.save_load import upsert_layer
+    from transform.standardize_df_cols import concat_optimized
     
-    for stage_name, stage_func in stages:
+    storage_format = config.get("storage", {}).get("format", "csv")
+    final_labels = config["columns"]["final_labels"]
+    preprocess = preprocess or transform_engine()
+    
+    silver = {}
+    for utility, pdf_files in new_files.items():
+        with metrics.stage("parse", utility) as record:
+            bronze_df = parse_pdf_files(pdf_files, utility, **parse_settings(utility))
+            record_pdf_metrics(bronze_df, utility, record)
+            if len(bronze_df):
+                record.add_written(upsert_layer(bronze_df, BASE_DIR / config["paths"][f"{utility}_df_raw"],
+                                                storage_format))
+        print(f"✓ Parsed {len(bronze_df)} {UTILITY_NAMES[utility]} records from {len(pdf_files)} new PDFs")
+        if not len(bronze_df):
+            continue
+        
+        with metrics.stage("transform", utility) as record:
+            record.rows_in = len(bronze_df)
+            silver[utility] = transform_utility(bronze_df.copy(), utility, preprocess, date_parser)
+            record.rows_out = len(silver[utility])
+            record.add_written(upsert_layer(
+                silver[utility], BASE_DIR / config["paths"][f"{utility}_silver_output_path"], storage_format,
+                key_columns=("utility_type", "invoice_number"), column_dtypes=config["column_dtypes"]
+            ))
+    
+    if not silver:
+        return True
+    
+    if config.get("gold", {}).get("mode", "full") != "incremental":
+        # Rebuild gold from the silver layers, which already hold the new invoices
+        return run_load_stage() is not False
+    
+    with metrics.stage("load", "gold") as record:
+        gold_frames = [df[final_labels] for df in silver.values()]
+        if optimized_dtypes():
+            gold_df = concat_optimized(gold_frames)
+        else:
+            gold_df = pd.concat(gold_frames, ignore_index=True)
+        load_gold_incrementally(gold_df, storage_format, record=record, silver_frames=silver, partial_silver=True)
+    return True
+
+
+def poll_gmail(sync_state, download_kwargs):
+    """Download the PDFs of emails received since the last poll. Returns False if a utility failed"""
+    global _gmail_search
+    
+    # Every poll searches again; the Gmail session and its connections are kept
+    _gmail_search = None
+    succeeded = True
+    for utility in UTILITY_NAMES:
         try:
-            success = stage_func()
-            if not success:
-                print(f"✗ {stage_name} stage failed!")
-                return False
+            succeeded = extract_track(utility, sync_state, download_kwargs) and succeeded
         except Exception as e:
-            print(f"✗ {stage_name} stage error: {e}")
-            return False
+            print(f"✗ {UTILITY_NAMES[utility]} Gmail poll failed: {type(e).__name__}: {e}")
+            succeeded = False
+    return succeeded
+
+
+def run_daemon(once=False, gmail=None):
+    """
+    Keep the pipeline running: poll Gmail every daemon.gmail_poll_seconds and
+    watch the raw PDF folders every daemon.watch_poll_seconds, pushing only
+    new PDFs through parse, transform and load (see ingest_new_pdfs).
     
-    print("🎉 Pipeline completed successfully!")
+    The process stays up between polls, so imports, the Gmail connection and
+    the date parser cache stay warm and a new bill reaches gold within a few
+    seconds of being downloaded or dropped into data/raw/<utility>. Gmail is
+    polled incrementally (each query lists only mail since its watermark).
+    Processed files are recorded in paths.daemon_state; on start the daemon
+    catches up on any PDF not recorded there. Metrics are reported and reset
+    after every poll that did work. With once, one catch-up poll runs and the
+    daemon exits
+    """
+    global metrics
+    daemon_options = config.get("daemon", {})
+    gmail = daemon_options.get("gmail", True) if gmail is None else gmail
+    gmail_interval = daemon_options.get("gmail_poll_seconds", 300)
+    watch_interval = daemon_options.get("watch_poll_seconds", 5)
+    
+    # Imported once at start-up, so the first new bill does not wait for pandas and pdfplumber
+    preload_stages((["extract"] if gmail else []) + ["parse", "transform", "load"])
+    sync_state, download_kwargs = extract_settings(incremental=True)
+    watcher = FolderWatcher(
+        {utility: BASE_DIR / config["paths"][f"{utility}_pdf_raw"] for utility in UTILITY_NAMES},
+        state_path=BASE_DIR / config["paths"]["daemon_state"],
+        # Downloads are renamed into place whole; settling only guards files copied in by hand
+        settle_seconds=0 if once else daemon_options.get("settle_seconds", 2)
+    )
+    
+    # Shared by every cycle, so dates seen before are never parsed again
+    preprocess = transform_engine()
+    date_parser = date_parser_from_config()
+    
+    sources = [f"Gmail every {gmail_interval}s"] if gmail else []
+    sources.append(f"the raw PDF folders every {watch_interval}s")
+    print(f"🚀 Pipeline daemon started, polling {' and '.join(sources)} (Ctrl+C to stop)")
+    next_gmail_poll = time.monotonic()
+    try:
+        while True:
+            worked = False
+            succeeded = True
+            if gmail and time.monotonic() >= next_gmail_poll:
+                worked = True
+                succeeded = poll_gmail(sync_state, download_kwargs)
+                next_gmail_poll = time.monotonic() + gmail_interval
+            
+            new_files = watcher.poll()
+            if new_files:
+                worked = True
+                started = time.perf_counter()
+                try:
+                    with metrics.stage("daemon") as record:
+                        record.succeeded = ingested = ingest_new_pdfs(new_files, preprocess, date_parser)
+                except Exception as e:
+                    print(f"✗ Ingest failed, retrying on the next poll: {type(e).__name__}: {e}")
+                    ingested = False
+                if ingested:
+                    watcher.mark_done(new_files)
+                    file_count = sum(len(paths) for paths in new_files.values())
+                    print(f"✓ Ingested {file_count} new PDFs in {time.perf_counter() - started:.1f}s")
+                succeeded = succeeded and ingested
+            
+            if worked:
+                write_run_report(succeeded)
+                metrics = RunMetrics()
+            if once:
+                return succeeded
+            time.sleep(watch_interval)
+    except KeyboardInterrupt:
+        print("✓ Daemon stopped")
+    return True
+
+
+def account_gold(name):
+    """Read the gold layer of an account's last run. Returns None if it has not produced one yet"""
+    from load.save_load import load_layer, layer_path
+    from load.gold_partitions import read_gold_partitions, load_manifest
+    
+    account = account_config(config, name)
+    storage_format = account.get("storage", {}).get("format", "csv")
+    if account.get("gold", {}).get("mode", "full") == "incremental":
+        partitions_dir = BASE_DIR / account["paths"]["gold_partitions_dir"]
+        if not load_manifest(partitions_dir)["partitions"]:
+            return None
+        date_column = account["gold"].get("partition_date_column", "invoice_date")
+        return read_gold_partitions(partitions_dir, storage_format, date_column=date_column)
+    
+    gold_path = BASE_DIR / account["paths"]["utiltities_gold_output_path"]
+    if not layer_path(gold_path, storage_format).exists():
+        return None
+    return load_layer(gold_path, storage_format)
+
+
+def merge_account_gold(names):
+    """
+    Upsert the gold layers of accounts into the merged gold dataset
+    (multi_account.merged_gold_dir), partitioned by account / utility_type /
+    year / month. Only the partitions of new or changed invoices are
+    rewritten. Accounts not in names keep the rows of their last merge.
+    Returns False if an account's gold could not be read
+    """
+    from load.gold_partitions import upsert_gold_partitions, read_account_partitions, ACCOUNT_COLUMN
+    
+    options = config.get("multi_account", {})
+    storage_format = config.get("storage", {}).get("format", "csv")
+    merged_dir = BASE_DIR / options.get("merged_gold_dir", "data/gold/accounts")
+    date_column = config.get("gold", {}).get("partition_date_column", "invoice_date")
+    
+    succeeded = True
+    changed = []
+    for name in names:
+        with metrics.stage("merge", name) as record:
+            gold_df = account_gold(name)
+            if gold_df is None:
+                print(f"✗ Account {name} has no gold layer to merge")
+                record.succeeded = succeeded = False
+                continue
+            record.rows_in = len(gold_df)
+            result = upsert_gold_partitions(
+                gold_df, merged_dir / f"{ACCOUNT_COLUMN}={name}", storage_format,
+                column_dtypes=config["column_dtypes"], date_column=date_column
+            )
+            record.rows_out = len(result["rows"])
+            for written in result["files"]:
+                record.add_written(written)
+            changed += result["partitions"]
+            print(f"✓ Account {name}: merged {len(result['rows'])} records from {result['invoices']} new or changed "
+                  f"invoices into {len(result['partitions'])} partitions")
+    
+    # One CSV of all accounts for the dashboard, rebuilt when anything changed
+    merged_csv = options.get("merged_gold_csv")
+    if merged_csv and changed:
+        with metrics.stage("merge", "csv") as record:
+            merged_df = read_account_partitions(merged_dir, storage_format, date_column=date_column)
+            persist_layer(merged_df, BASE_DIR / merged_csv, storage_format="csv", record=record)
+            record.rows_out = len(merged_df)
+            print(f"✓ Merged gold of {merged_df[ACCOUNT_COLUMN].nunique()} accounts written to {merged_csv}")
+    return succeeded
+
+
+def run_accounts_pipeline(only=None, max_parallel=None, merge_only=False):
+    """
+    Multi-account mode: run the full pipeline once per account in
+    config["accounts"], then merge their gold layers (merge_account_gold).
+    
+    Each account runs as `main.py --account <name>` in its own process, with
+    its own credentials, queries and data folder (see
+    orchestrate/accounts.py), so accounts share no state and one failing or
+    hanging account (multi_account.timeout_minutes) only fails itself.
+    Accounts are sharded across multi_account.max_parallel workers, and each
+    is limited to its share of the CPU cores for parse workers. A failed
+    account is re-run with --retry-failed up to multi_account.retries times.
+    Output goes to a pipeline.log next to each account's run report.
+    Failed accounts are left out of the merge, so the merged dataset keeps
+    their rows from their last successful run.
+    """
+    names = account_names(config)
+    if not names:
+        print("✗ No accounts configured (accounts section of the config)")
+        return False
+    unknown = [name for name in only or [] if name not in names]
+    if unknown:
+        print(f"✗ Unknown accounts: {', '.join(unknown)} (configured: {', '.join(names)})")
+        return False
+    names = [name for name in names if not only or name in only]
+    
+    options = config.get("multi_account", {})
+    max_parallel = max_parallel or options.get("max_parallel", 2)
+    timeout_minutes = options.get("timeout_minutes")
+    cpus = cpu_share(max_parallel)
+    
+    succeeded_names = names
+    if not merge_only:
+        print(f"🚀 Running {len(names)} accounts, {max_parallel} at a time ({cpus} CPU cores each)...")
+        
+        def run(name, attempt):
+            args = ["--account", name, "--cpus", str(cpus), "--stage", "all"]
+            if attempt:
+                args.append("--retry-failed")
+            log_path = (BASE_DIR / account_config(config, name)["paths"]["run_report"]).parent / "pipeline.log"
+            with metrics.stage("accounts", name) as record:
+                result = run_account(
+                    name, args, log_path, env=account_environment(config, name),
+                    timeout=timeout_minutes * 60 if timeout_minutes else None, cwd=BASE_DIR
+                )
+                record.succeeded = result["succeeded"]
+            return result
+        
+        def report(result):
+            if result["succeeded"]:
+                print(f"✓ Account {result['account']} completed in {result['seconds']:.1f}s")
+            else:
+                print(f"✗ Account {result['account']} failed after {result['attempts']} attempt(s): "
+                      f"{result['error']} (see {result['log']})")
+        
+        with metrics.stage("accounts") as record:
+            results = run_accounts(names, run, max_parallel, options.get("retries", 0), on_done=report)
+            succeeded_names = [name for name, result in results.items() if result["succeeded"]]
+            record.succeeded = len(succeeded_names) == len(names)
+    
+    with metrics.stage("merge") as record:
+        record.succeeded = merged = merge_account_gold(succeeded_names)
+    
+    failed = len(names) - len(succeeded_names)
+    if failed:
+        print(f"✗ {failed} of {len(names)} accounts failed; re-run them with: python main.py accounts --only <name>")
+    if failed or not merged:
+        return False
+    
+    print(f"🎉 All {len(names)} accounts completed and merged!")
     return True
 
 
@@ -225,8 +1102,7 @@ if __name__ == "__main__":
     BASE_DIR = Path(__file__).resolve().parent
     config_path = BASE_DIR / "config/config.yaml"
 
-    with open(config_path) as f:
-        config = yaml.safe_load(f)
+    config = load_config(config_path)
 
     parser = argparse.ArgumentParser(description="Utility Bill Data Pipeline")
     parser.add_argument(
@@ -235,17 +1111,87 @@ if __name__ == "__main__":
         default="all",
         help="Run specific stage or full pipeline (default: all)"
     )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Full pipeline: re-run only the tasks that failed or were cancelled in the last run"
+    )
+    parser.add_argument(
+        "--account",
+        help="Run as one account of the accounts config section (its own credentials, queries and data folder)"
+    )
+    parser.add_argument("--cpus", type=int, help=argparse.SUPPRESS)  # Set by `accounts`: the account's CPU share
+    
+    subparsers = parser.add_subparsers(dest="command")
+    query_parser = subparsers.add_parser(
+        "query",
+        help="Run a canned aggregate query against the query store",
+        description="\n".join(f"{name}: {query['description']}" for name, query in CANNED_QUERIES.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    query_parser.add_argument("name", choices=list(CANNED_QUERIES), help="Canned query to run")
+    query_parser.add_argument("--utility", choices=list(UTILITY_NAMES), help="Only this utility")
+    query_parser.add_argument("--year", type=int, help="Only invoices dated in this year")
+    query_parser.add_argument("--start", help="Only invoices dated on or after this date (YYYY-MM-DD)")
+    query_parser.add_argument("--end", help="Only invoices dated on or before this date (YYYY-MM-DD)")
+    query_parser.add_argument("--invoice", help="Only this invoice number")
+    query_parser.add_argument("--limit", type=int, default=10, help="Rows of top_invoices (default: 10)")
+    
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        help="Keep running: poll Gmail and the raw PDF folders, and ingest new bills as they arrive"
+    )
+    daemon_parser.add_argument("--once", action="store_true", help="Run one catch-up poll and exit")
+    daemon_parser.add_argument("--no-gmail", action="store_true", help="Only watch the raw PDF folders")
+    
+    accounts_parser = subparsers.add_parser(
+        "accounts",
+        help="Run the full pipeline for every configured account, then merge their gold layers"
+    )
+    accounts_parser.add_argument("--only", nargs="+", metavar="ACCOUNT", help="Only run (and merge) these accounts")
+    accounts_parser.add_argument("--max-parallel", type=int, help="Accounts run at once (default: multi_account.max_parallel)")
+    accounts_parser.add_argument("--merge-only", action="store_true", help="Only merge the accounts' existing gold layers")
     
     args = parser.parse_args()
     
-    if args.stage == "extract":
-        run_extract_stage()
-    elif args.stage == "parse":
-        run_parse_stage()
-    elif args.stage == "transform":
-        run_transform_stage()
-    elif args.stage == "load":
-        run_load_stage()
+    if args.account and args.account not in account_names(config):
+        parser.error(f"unknown account '{args.account}' (configured: {', '.join(account_names(config)) or 'none'})")
+    if args.account:
+        # Everything below runs on the account's config, paths and Gmail credentials
+        os.environ.update(account_environment(config, args.account))
+        config = account_config(config, args.account, cpus=args.cpus)
+        create_account_folders(config, BASE_DIR)
+    
+    if args.command == "query":
+        print_query(args.name, args)
+    elif args.command == "daemon":
+        # Reports are written after every poll
+        run_daemon(once=args.once, gmail=False if args.no_gmail else None)
+    elif args.command == "accounts":
+        result = False
+        try:
+            result = run_accounts_pipeline(only=args.only, max_parallel=args.max_parallel, merge_only=args.merge_only)
+        finally:
+            write_run_report(result)
+        if not result:
+            raise SystemExit(1)
     else:
-        run_full_pipeline()
-
+        stage_functions = {
+            "extract": run_extract_stage,
+            "parse": run_parse_stage,
+            "transform": run_transform_stage,
+            "load": run_load_stage,
+        }
+        
+        result = False
+        try:
+            if args.stage == "all":
+                result = run_full_pipeline(retry_failed=args.retry_failed)
+            else:
+                result = run_stage(args.stage, stage_functions[args.stage])
+        finally:
+            # Written even when a stage raises, so failed runs are visible too
+            write_run_report(result is not False)
+        if args.account and result is False:
+            # `main.py accounts` reads an account's outcome from its exit status
+            raise SystemExit(1)
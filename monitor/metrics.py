@@ -0,0 +1,369 @@
+import os
+import sys
+import json
+import time
+import heapq
+import bisect
+import threading
+from datetime import datetime, timezone
+from contextlib import contextmanager
+
+from utils.atomic_write import atomic_write_text
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, so RSS and child CPU time are not reported
+    resource = None
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "utility_pipeline"
+
+
+def peak_rss_bytes():
+    """High-water mark of resident memory of this process and its finished children (e.g. parse workers)."""
+    if resource is None:
+        return 0
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+
+def _cpu_seconds():
+    """CPU time of this process plus its finished children, so worker-process parsing is counted."""
+    if resource is None:
+        return time.process_time()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class StageRecord:
+    """Measurements of one stage, or of one utility within a stage."""
+
+    def __init__(self, stage, utility=None, parent=None):
+        self.stage = stage
+        self.utility = utility
+        self.parent = parent
+        self.children = []
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_bytes = 0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.succeeded = None
+        self._lock = threading.Lock()
+
+    def add_read(self, path):
+        """Count the size of a file read by the stage."""
+        with self._lock:
+            self.bytes_read += _file_size(path)
+
+    def add_written(self, path):
+        """Count the size of a file written by the stage (safe to call from writer threads)."""
+        with self._lock:
+            self.bytes_written += _file_size(path)
+
+    def totals(self):
+        """Rows and bytes of this record plus those of the per-utility records measured inside it."""
+        totals = {
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+        for child in self.children:
+            for key, value in child.totals().items():
+                totals[key] += value
+        return totals
+
+    def to_dict(self):
+        return {
+            "stage": self.stage,
+            "utility": self.utility,
+            "succeeded": self.succeeded,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "peak_rss_bytes": self.peak_rss_bytes,
+            **self.totals(),
+        }
+
+
+class LatencyHistogram:
+    """Cumulative-bucket latency histogram that also keeps the slowest observations."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, keep_slowest=10):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.keep_slowest = keep_slowest
+        self._slowest = []  # min-heap of (seconds, label)
+
+    def observe(self, seconds, label=None):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if self.keep_slowest:
+            entry = (seconds, str(label))
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def cumulative_counts(self):
+        """Return [(le, count)] with Prometheus' cumulative semantics, ending with +Inf."""
+        total = 0
+        cumulative = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def slowest(self):
+        return [{"file": label, "seconds": round(seconds, 6)} for seconds, label in sorted(self._slowest, reverse=True)]
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.sum, 6),
+            "mean_seconds": round(self.sum / self.count, 6) if self.count else None,
+            "buckets": {("+Inf" if bound == float("inf") else str(bound)): count
+                        for bound, count in self.cumulative_counts()},
+            "slowest": self.slowest(),
+        }
+
+
+class RunMetrics:
+    """
+    Collects the measurements of one pipeline run.
+
+    Stages (and utilities within a stage) are timed with the stage() context
+    manager, which records wall time, CPU time and peak RSS; the caller fills
+    in rows and bytes on the yielded StageRecord. Per-file latencies go into
+    histograms with observe(), event counts (e.g. extractor fallbacks) with
+    count(). The run is written out as a JSON report and as
+    a Prometheus textfile (for node_exporter's textfile collector).
+
+    Example:
+        metrics = RunMetrics()
+        with metrics.stage("parse", "elec") as record:
+            df = parse_all_pdfs(...)
+            record.rows_out = len(df)
+        metrics.observe("pdf_parse_seconds", 0.02, "elec", "INV001.pdf")
+        metrics.write_json("data/reports/run_report.json")
+        metrics.write_prometheus("data/reports/utility_pipeline.prom")
+    """
+
+    def __init__(self, keep_slowest=10):
+        self.started_at = datetime.now(timezone.utc)
+        self.keep_slowest = keep_slowest
+        self.records = []
+        self.histograms = {}
+        self.counters = {}
+        self._open_stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, stage, utility=None, per_thread=None):
+        """
+        Measure a block as one stage record.
+
+        Parameters:
+            stage (str): Stage name, e.g. 'parse'
+            utility (str): Optional utility the block is limited to
+            per_thread (bool): Count only this thread's CPU time, for blocks
+                running concurrently on a thread pool (default: only when
+                called off the main thread)
+        """
+        if per_thread is None:
+            per_thread = threading.current_thread() is not threading.main_thread()
+        with self._lock:
+            # Per-utility records roll up into the stage-wide record they run inside
+            parent = self._open_stages.get(stage) if utility is not None else None
+            record = StageRecord(stage, utility, parent)
+            if parent is not None:
+                parent.children.append(record)
+            elif utility is None:
+                self._open_stages[stage] = record
+            self.records.append(record)
+
+        cpu_clock = time.thread_time if per_thread else _cpu_seconds
+        wall_started = time.perf_counter()
+        cpu_started = cpu_clock()
+        try:
+            yield record
+        except BaseException:
+            record.succeeded = False
+            raise
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_started
+            record.cpu_seconds = cpu_clock() - cpu_started
+            record.peak_rss_bytes = peak_rss_bytes()
+            if record.succeeded is None:
+                record.succeeded = True
+            if utility is None:
+                with self._lock:
+                    self._open_stages.pop(stage, None)
+
+    def observe(self, name, seconds, utility=None, label=None):
+        """Add one latency observation (e.g. one PDF) to the histogram name for utility."""
+        with self._lock:
+            histogram = self.histograms.get((name, utility))
+            if histogram is None:
+                histogram = self.histograms[(name, utility)] = LatencyHistogram(keep_slowest=self.keep_slowest)
+            histogram.observe(seconds, label)
+
+    def count(self, name, utility=None, amount=1):
+        """Add amount to the counter name for utility."""
+        with self._lock:
+            self.counters[(name, utility)] = self.counters.get((name, utility), 0) + amount
+
+    def report(self, succeeded=None):
+        """Return the run as a JSON-serialisable dict."""
+        finished_at = datetime.now(timezone.utc)
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": finished_at.isoformat(),
+            "wall_seconds": round((finished_at - self.started_at).total_seconds(), 6),
+            "succeeded": succeeded,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": [record.to_dict() for record in self.records],
+            "histograms": [
+                {"name": name, "utility": utility, **histogram.to_dict()}
+                for (name, utility), histogram in sorted(self.histograms.items(), key=lambda item: (item[0][0], str(item[0][1])))
+            ],
+            "counters": [
+                {"name": name, "utility": utility, "value": value}
+                for (name, utility), value in sorted(self.counters.items(), key=lambda item: (item[0][0], str(item[0][1])))
+            ],
+        }
+
+    def summary(self, limit=5, slowest_histogram="pdf_extract_seconds"):
+        """
+        Return printable lines for the slowest stage records and PDFs.
+
+        The slowest PDFs come from slowest_histogram only: the per-backend
+        histograms time the same extractions again, so they would list the
+        same files twice.
+        """
+        lines = []
+        records = sorted(self.records, key=lambda record: record.wall_seconds, reverse=True)
+        for record in records[:limit]:
+            name = record.stage if record.utility is None else f"{record.stage}/{record.utility}"
+            totals = record.totals()
+            lines.append(
+                f"  {name:<18} {record.wall_seconds:8.2f}s wall {record.cpu_seconds:8.2f}s cpu "
+                f"{totals['rows_in']:>8} in {totals['rows_out']:>8} out"
+            )
+        slowest = []
+        for (name, utility), histogram in self.histograms.items():
+            if name == slowest_histogram:
+                slowest.extend((entry["seconds"], entry["file"]) for entry in histogram.slowest())
+        for seconds, label in sorted(slowest, reverse=True)[:limit]:
+            lines.append(f"  slowest {slowest_histogram}: {seconds:.3f}s {label}")
+        return lines
+
+    def write_json(self, path, succeeded=None):
+        """Write the JSON run report atomically."""
+        atomic_write_text(path, json.dumps(self.report(succeeded), indent=2))
+
+    def prometheus_text(self, succeeded=None):
+        """Render the run in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+        def sample(name, labels, value):
+            label_text = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items() if value is not None)
+            lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{METRIC_PREFIX}_{name} {value}")
+
+        gauges = [
+            ("stage_wall_seconds", "Wall-clock time of the stage", "wall_seconds"),
+            ("stage_cpu_seconds", "CPU time (including worker processes) of the stage", "cpu_seconds"),
+            ("stage_peak_rss_bytes", "Process peak resident memory at the end of the stage", "peak_rss_bytes"),
+            ("stage_rows_in", "Rows (or files) the stage consumed", "rows_in"),
+            ("stage_rows_out", "Rows (or files) the stage produced", "rows_out"),
+            ("stage_bytes_read", "Bytes the stage read from disk", "bytes_read"),
+            ("stage_bytes_written", "Bytes the stage wrote to disk", "bytes_written"),
+        ]
+        stages = self._stage_totals()
+        for name, help_text, attribute in gauges:
+            family(name, "gauge", help_text)
+            for (stage, utility), totals in stages.items():
+                sample(name, {"stage": stage, "utility": utility}, totals[attribute])
+
+        family("stage_attempts", "gauge", "Times the stage ran in this run (retries included)")
+        for (stage, utility), totals in stages.items():
+            sample("stage_attempts", {"stage": stage, "utility": utility}, totals["attempts"])
+
+        family("stage_success", "gauge", "1 if the stage completed, 0 if it failed")
+        for (stage, utility), totals in stages.items():
+            sample("stage_success", {"stage": stage, "utility": utility}, int(bool(totals["succeeded"])))
+
+        for name in sorted({name for name, _ in self.histograms}):
+            family(name, "histogram", f"Per-file latency: {name.replace('_', ' ')}")
+            for (histogram_name, utility), histogram in sorted(self.histograms.items(), key=lambda item: str(item[0][1])):
+                if histogram_name != name:
+                    continue
+                for bound, count in histogram.cumulative_counts():
+                    sample(f"{name}_bucket", {"utility": utility, "le": "+Inf" if bound == float("inf") else bound}, count)
+                sample(f"{name}_sum", {"utility": utility}, round(histogram.sum, 6))
+                sample(f"{name}_count", {"utility": utility}, histogram.count)
+
+        for name in sorted({name for name, _ in self.counters}):
+            family(f"{name}_total", "counter", f"Count of {name.replace('_', ' ')}")
+            for (counter_name, utility), value in sorted(self.counters.items(), key=lambda item: str(item[0][1])):
+                if counter_name == name:
+                    sample(f"{name}_total", {"utility": utility}, value)
+
+        if succeeded is not None:
+            family("run_success", "gauge", "1 if the last run succeeded")
+            sample("run_success", {}, int(succeeded))
+        family("run_last_timestamp_seconds", "gauge", "Unix time the last run finished")
+        sample("run_last_timestamp_seconds", {}, int(time.time()))
+        return "\n".join(lines) + "\n"
+
+    def _stage_totals(self):
+        """
+        Records combined per (stage, utility), in first-run order. A stage that
+        ran several times (a retried task or account) must appear once in the
+        Prometheus textfile: times, rows and bytes are summed, peak memory is
+        the highest, and success is that of the last attempt.
+        """
+        stages = {}
+        for record in self.records:
+            values = record.to_dict()
+            totals = stages.get((record.stage, record.utility))
+            if totals is None:
+                stages[(record.stage, record.utility)] = dict(values, attempts=1)
+                continue
+            for key in ("wall_seconds", "cpu_seconds", "rows_in", "rows_out", "bytes_read", "bytes_written"):
+                totals[key] += values[key]
+            totals["wall_seconds"] = round(totals["wall_seconds"], 6)
+            totals["cpu_seconds"] = round(totals["cpu_seconds"], 6)
+            totals["peak_rss_bytes"] = max(totals["peak_rss_bytes"], values["peak_rss_bytes"])
+            totals["succeeded"] = values["succeeded"]
+            totals["attempts"] += 1
+        return stages
+
+    def write_prometheus(self, path, succeeded=None):
+        """Write the Prometheus textfile atomically, as the textfile collector requires."""
+        atomic_write_text(path, self.prometheus_text(succeeded))
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
@@ -0,0 +1,201 @@
+import os
+import re
+import sys
+import copy
+import time
+import signal
+import subprocess
+from pathlib import Path, PurePosixPath
+from concurrent.futures import ThreadPoolExecutor
+
+# paths entries every account shares instead of keeping its own copy
+SHARED_PATHS = ("gmail_discovery_cache",)
+
+ACCOUNT_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def account_names(config) -> list:
+    """
+    Names of the accounts in config["accounts"], in config order.
+
+    Raises:
+        ValueError: If a name cannot be used as a folder and partition name
+    """
+    names = list(config.get("accounts") or {})
+    for name in names:
+        if not ACCOUNT_NAME_RE.match(name):
+            raise ValueError(f"Invalid account name '{name}': use letters, digits, '_', '-' and '.' only")
+    return names
+
+
+def _merge(base: dict, overrides: dict) -> dict:
+    """Deep-merge overrides into a copy of base (nested dicts merge, everything else replaces)."""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def account_path(path, account_dir) -> str:
+    """
+    Move a pipeline path into an account's folder: 'data/silver/elec (silver).csv'
+    becomes '<account_dir>/silver/elec (silver).csv'. Paths outside data/ are
+    moved in whole.
+    """
+    path = PurePosixPath(path)
+    if path.parts and path.parts[0] == "data":
+        path = path.relative_to("data")
+    return str(PurePosixPath(account_dir) / path)
+
+
+def account_config(config, name, cpus=None) -> dict:
+    """
+    The pipeline config of one account.
+
+    The account's entry in config["accounts"] may replace gmail_queries and
+    override any other section. Every path in `paths` (except SHARED_PATHS)
+    is moved under multi_account.accounts_dir/<name>, so accounts never read
+    or write each other's PDFs, layers, sync watermarks or reports.
+
+    Parameters:
+        config (dict): Base pipeline config
+        name (str): Account name (a key of config["accounts"])
+        cpus (int): CPU cores the account may use; caps parse.workers
+
+    Returns:
+        dict: The account's config, without the accounts sections
+
+    Raises:
+        KeyError: If the account is not configured
+    """
+    if name not in account_names(config):
+        raise KeyError(f"Unknown account '{name}' (configured: {', '.join(account_names(config)) or 'none'})")
+    settings = config["accounts"][name] or {}
+
+    base = {key: value for key, value in config.items() if key not in ("accounts", "multi_account")}
+    overrides = {key: value for key, value in settings.items() if key not in ("credentials", "token")}
+    if "gmail_queries" in overrides:
+        # An account's queries replace the base set rather than adding to it
+        base.pop("gmail_queries", None)
+    account = _merge(base, overrides)
+
+    account_dir = PurePosixPath(config.get("multi_account", {}).get("accounts_dir", "data/accounts")) / name
+    for key, path in account["paths"].items():
+        if key not in SHARED_PATHS and key not in settings.get("paths", {}):
+            account["paths"][key] = account_path(path, account_dir)
+
+    if cpus is not None:
+        workers = account.setdefault("parse", {}).get("workers", 1)
+        account["parse"]["workers"] = max(1, min(workers or os.cpu_count() or 1, cpus))
+    return account
+
+
+def create_account_folders(account, base_dir) -> None:
+    """Create the folders of an account's paths (files' parent folders), which the stages expect to exist."""
+    for key, path in account["paths"].items():
+        if key in SHARED_PATHS or not path:
+            continue
+        path = Path(base_dir) / path
+        folder = path.parent if path.suffix else path
+        folder.mkdir(parents=True, exist_ok=True)
+
+
+def account_environment(config, name) -> dict:
+    """Environment variables of an account's pipeline process: its own Gmail credentials and token files."""
+    settings = config["accounts"][name] or {}
+    env = {}
+    if settings.get("credentials"):
+        env["GMAIL_CREDENTIALS_PATH"] = settings["credentials"]
+    if settings.get("token"):
+        env["GMAIL_TOKEN_PATH"] = settings["token"]
+    return env
+
+
+def cpu_share(max_parallel) -> int:
+    """CPU cores each of max_parallel concurrent accounts may use, so together they do not oversubscribe the machine."""
+    return max(1, (os.cpu_count() or 1) // max(1, max_parallel))
+
+
+def run_account(name, args, log_path, env=None, timeout=None, cwd=None) -> dict:
+    """
+    Run one account's pipeline in its own process, output going to log_path.
+
+    Parameters:
+        name (str): Account name
+        args (list): main.py arguments, e.g. ['--account', 'home', '--stage', 'all']
+        log_path (str): File the process's stdout and stderr are appended to
+        env (dict): Environment variables set on top of this process's
+        timeout (float): Seconds before the process is killed and the account failed
+
+    Returns:
+        dict: {"account", "succeeded", "returncode", "seconds", "error", "log"}
+    """
+    log_path = Path(log_path)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    returncode, error = None, None
+    with open(log_path, "a") as log:
+        log.write(f"\n=== {time.strftime('%Y-%m-%d %H:%M:%S')} main.py {' '.join(args)} ===\n")
+        log.flush()
+        try:
+            # In a session of its own, so a timeout also kills the account's parse worker processes
+            process = subprocess.Popen(
+                [sys.executable, "main.py", *args], cwd=cwd, env={**os.environ, **(env or {})},
+                stdout=log, stderr=subprocess.STDOUT, start_new_session=os.name == "posix"
+            )
+            try:
+                returncode = process.wait(timeout=timeout)
+                if returncode != 0:
+                    error = f"exited with status {returncode}"
+            except subprocess.TimeoutExpired:
+                if os.name == "posix":
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
+                process.wait()
+                error = f"killed after {timeout:.0f}s"
+        except OSError as e:
+            error = f"{type(e).__name__}: {e}"
+    return {
+        "account": name,
+        "succeeded": error is None,
+        "returncode": returncode,
+        "seconds": time.perf_counter() - started,
+        "error": error,
+        "log": str(log_path),
+    }
+
+
+def run_accounts(names, run, max_parallel=2, retries=0, on_done=None) -> dict:
+    """
+    Shard accounts across a pool of max_parallel workers, one process per account.
+
+    An account's failure (non-zero exit, timeout) only fails that account;
+    the other accounts carry on. A failed account is run again up to
+    retries more times once its first attempt has finished.
+
+    Parameters:
+        names (list): Accounts to run
+        run (callable): run(name, attempt) -> result dict of run_account
+        max_parallel (int): Accounts running at once
+        retries (int): Extra attempts for a failed account
+        on_done (callable): Called with each account's final result
+
+    Returns:
+        dict: {name: result dict, with "attempts" added}
+    """
+    def run_with_retries(name):
+        for attempt in range(retries + 1):
+            result = run(name, attempt)
+            result["attempts"] = attempt + 1
+            if result["succeeded"]:
+                break
+        if on_done is not None:
+            on_done(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as executor:
+        return dict(zip(names, executor.map(run_with_retries, names)))
@@ -0,0 +1,212 @@
+import json
+import time
+from pathlib import Path
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.atomic_write import atomic_write_text
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"
+
+# States of tasks that do not have to run again on a retry
+DONE_STATES = (SUCCEEDED, SKIPPED)
+
+
+def task_id(key):
+    """Printable id of a task key: ('elec', 'parse') -> 'elec/parse'."""
+    return "/".join(key) if isinstance(key, tuple) else str(key)
+
+
+class Task:
+    """
+    One node of the pipeline DAG, e.g. the parse step of the elec track.
+
+    func is called with a dict of the results of the tasks it depends on
+    ({dependency key: result}); a task skipped because an earlier run
+    completed it contributes None. A task fails when func raises or returns
+    False, like a pipeline stage, and is re-run up to retries more times.
+    """
+
+    def __init__(self, key, func, deps=(), retries=0):
+        self.key = key
+        self.func = func
+        self.deps = tuple(deps)
+        self.retries = retries
+
+
+class TaskResult:
+    """Outcome of one task: its state, return value, error message, attempts and wall time."""
+
+    def __init__(self, key, state, result=None, error=None, attempts=0, seconds=0.0):
+        self.key = key
+        self.state = state
+        self.result = result
+        self.error = error
+        self.attempts = attempts
+        self.seconds = seconds
+
+    def to_dict(self):
+        return {
+            "state": self.state,
+            "error": self.error,
+            "attempts": self.attempts,
+            "seconds": round(self.seconds, 6),
+        }
+
+
+def topological_order(tasks):
+    """
+    Return the task keys ordered so every task comes after its dependencies.
+
+    Raises:
+        ValueError: If a dependency is not one of the tasks, or the tasks form a cycle
+    """
+    by_key = {task.key: task for task in tasks}
+    order = []
+    visiting = set()
+    visited = set()
+
+    def visit(key, path):
+        if key in visited:
+            return
+        if key in visiting:
+            raise ValueError(f"Task cycle: {' -> '.join(task_id(k) for k in path + [key])}")
+        visiting.add(key)
+        for dep in by_key[key].deps:
+            if dep not in by_key:
+                raise ValueError(f"Task {task_id(key)} depends on unknown task {task_id(dep)}")
+            visit(dep, path + [key])
+        visiting.discard(key)
+        visited.add(key)
+        order.append(key)
+
+    for task in tasks:
+        visit(task.key, [])
+    return order
+
+
+def _run_task(task, inputs):
+    """Worker entry point: run a task with its retries and return a TaskResult instead of raising."""
+    started = time.perf_counter()
+    error = None
+    for attempt in range(1, task.retries + 2):
+        try:
+            result = task.func(inputs)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        else:
+            if result is not False:
+                return TaskResult(task.key, SUCCEEDED, result, None, attempt, time.perf_counter() - started)
+            error = "returned False"
+        if attempt <= task.retries:
+            print(f"✗ {task_id(task.key)} failed ({error}), retrying ({attempt}/{task.retries})")
+    return TaskResult(task.key, FAILED, None, error, task.retries + 1, time.perf_counter() - started)
+
+
+def run_dag(tasks, max_workers=None, skip=()):
+    """
+    Run tasks concurrently, each as soon as all of its dependencies succeeded.
+
+    When a task fails, every task downstream of it is cancelled without
+    running, while tasks that do not depend on it carry on. Keyboard
+    interrupts cancel everything not yet started, wait for running tasks to
+    return and re-raise.
+
+    Parameters:
+        tasks (list): Task objects
+        max_workers (int): Tasks running at once (default: one thread per task)
+        skip (iterable): Keys of tasks an earlier run already completed. They
+            are not run, unless one of their dependencies has to run again
+
+    Returns:
+        dict: {task key: TaskResult} for every task
+
+    Example:
+        results = run_dag([
+            Task(("elec", "parse"), lambda inputs: parse("elec")),
+            Task(("elec", "transform"), lambda inputs: transform(inputs[("elec", "parse")]),
+                 deps=[("elec", "parse")]),
+        ])
+    """
+    by_key = {task.key: task for task in tasks}
+    order = topological_order(tasks)
+
+    results = {}
+    skip = set(skip)
+    for key in order:
+        if key in skip and all(dep in results for dep in by_key[key].deps):
+            results[key] = TaskResult(key, SKIPPED)
+
+    pending = [key for key in order if key not in results]
+    dependents = {key: [] for key in order}
+    for key in order:
+        for dep in by_key[key].deps:
+            dependents[dep].append(key)
+
+    def cancel_downstream(key, reason):
+        stack = list(dependents[key])
+        while stack:
+            dependent = stack.pop()
+            if dependent in results:
+                continue
+            results[dependent] = TaskResult(dependent, CANCELLED, error=reason)
+            pending.remove(dependent)
+            stack.extend(dependents[dependent])
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or max(len(pending), 1), thread_name_prefix="dag")
+    running = {}
+    try:
+        while pending or running:
+            for key in list(pending):
+                deps = by_key[key].deps
+                if all(dep in results and results[dep].state in DONE_STATES for dep in deps):
+                    pending.remove(key)
+                    inputs = {dep: results[dep].result for dep in deps}
+                    running[executor.submit(_run_task, by_key[key], inputs)] = key
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = running.pop(future)
+                results[key] = future.result()
+                if results[key].state == FAILED:
+                    cancel_downstream(key, f"upstream task {task_id(key)} failed")
+    except BaseException:
+        for future, key in running.items():
+            if future.cancel():
+                results[key] = TaskResult(key, CANCELLED, error="run interrupted")
+        for key in pending:
+            results[key] = TaskResult(key, CANCELLED, error="run interrupted")
+        raise
+    finally:
+        executor.shutdown(wait=True)
+    return {key: results[key] for key in order}
+
+
+def save_dag_state(path, results):
+    """
+    Write the state of every task atomically, so a later run can retry only
+    the tasks that did not complete.
+
+    File format:
+        {"finished_at": "...", "tasks": {"elec/parse": {"state": "failed", "error": "...", ...}}}
+    """
+    state = {
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "tasks": {task_id(key): result.to_dict() for key, result in results.items()},
+    }
+    atomic_write_text(path, json.dumps(state, indent=2))
+
+
+def completed_tasks(path, tasks):
+    """Return the keys of tasks recorded as completed in a state file (none if it does not exist)."""
+    path = Path(path)
+    if not path.exists():
+        return set()
+    with open(path) as f:
+        states = json.load(f).get("tasks", {})
+    return {task.key for task in tasks if states.get(task_id(task.key), {}).get("state") in DONE_STATES}
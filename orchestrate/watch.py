@@ -0,0 +1,76 @@
+import os
+import json
+import time
+import glob
+from pathlib import Path
+
+from utils.atomic_write import atomic_write_text
+
+
+class FolderWatcher:
+    """
+    Polls folders for new or changed files, so the daemon can push just
+    those files through the pipeline.
+
+    A file counts as new when its size or modification time differs from the
+    last time it was handed out, and is only reported once it has not been
+    modified for settle_seconds, so a PDF still being copied in is picked up
+    on a later poll. Polling needs no platform file-notification API and also
+    sees files dropped into the folders by hand.
+
+    The files handed out are recorded in state_path ({path: [size, mtime_ns]})
+    once the caller marks them done, so a restarted daemon neither skips nor
+    re-processes them. Without a state file every existing file is new, so
+    the first poll catches up on everything already in the folders.
+
+    Example:
+        watcher = FolderWatcher({"elec": "data/raw/elec"}, state_path="data/state/daemon_watch.json")
+        new_files = watcher.poll()          # {"elec": ["data/raw/elec/INV001.pdf"]}
+        ...
+        watcher.mark_done(new_files)
+    """
+
+    def __init__(self, folders: dict, pattern="*.pdf", state_path=None, settle_seconds=2.0):
+        self.folders = {key: Path(folder) for key, folder in folders.items()}
+        self.pattern = pattern
+        self.state_path = Path(state_path) if state_path else None
+        self.settle_seconds = settle_seconds
+        self.seen = {}
+        if self.state_path is not None and self.state_path.exists():
+            with open(self.state_path) as f:
+                self.seen = json.load(f)
+
+    def poll(self) -> dict:
+        """
+        Return the settled new or changed files of each folder.
+
+        Returns:
+            dict: {folder key: sorted file paths}, only for folders with new files
+        """
+        now = time.time()
+        new_files = {}
+        for key, folder in self.folders.items():
+            for file_path in sorted(glob.glob(os.path.join(folder, self.pattern))):
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                if self.seen.get(os.path.abspath(file_path)) == [stat.st_size, stat.st_mtime_ns]:
+                    continue
+                if now - stat.st_mtime < self.settle_seconds:
+                    continue
+                new_files.setdefault(key, []).append(file_path)
+        return new_files
+
+    def mark_done(self, files: dict) -> None:
+        """Record files returned by poll() as processed, so later polls skip them until they change."""
+        for paths in files.values():
+            for file_path in paths:
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                self.seen[os.path.abspath(file_path)] = [stat.st_size, stat.st_mtime_ns]
+
+        if self.state_path is not None:
+            atomic_write_text(self.state_path, json.dumps(self.seen))
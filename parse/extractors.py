@@ -0,0 +1,87 @@
+import importlib.util
+
+# Backend used when none is configured, and as the fallback for the fast ones
+DEFAULT_EXTRACTOR = "pdfplumber"
+
+EXTRACTORS = {}
+
+
+def register_extractor(name, module=None):
+    """
+    Function decorator registering a text extraction backend under name.
+
+    A backend takes a PDF path and returns its text, pages joined with
+    newlines. module names the optional package the backend needs; the
+    backend is only available when it is installed.
+    """
+    def decorator(func):
+        func.extractor_name = name
+        func.required_module = module
+        EXTRACTORS[name] = func
+        return func
+    return decorator
+
+
+def _join_pages(pages):
+    """Join non-empty page texts with newlines, as pdfplumber's extract_text output is joined."""
+    return "\n".join(text for text in (page.strip("\x0c\n ") for page in pages) if text)
+
+
+@register_extractor("pdfplumber")
+def extract_text_pdfplumber(pdf_path):
+    """Layout-aware extraction with pdfplumber: the slowest backend, but the one the provider regexes were written for."""
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        # extract_text is expensive, so it runs once per page
+        return "\n".join(text for text in (page.extract_text() for page in pdf.pages) if text)
+
+
+@register_extractor("pdfminer", module="pdfminer")
+def extract_text_pdfminer(pdf_path):
+    """Plain pdfminer.six line extraction (installed with pdfplumber), skipping pdfplumber's character layout pass."""
+    from pdfminer.high_level import extract_text
+
+    return _join_pages(extract_text(pdf_path).split("\x0c"))
+
+
+@register_extractor("pypdfium2", module="pypdfium2")
+def extract_text_pypdfium2(pdf_path):
+    """Text from PDFium's text layer via pypdfium2 (optional dependency): the fastest backend."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        pages = []
+        for page in pdf:
+            text_page = page.get_textpage()
+            pages.append(text_page.get_text_range().replace("\r\n", "\n"))
+            text_page.close()
+            page.close()
+        return _join_pages(pages)
+    finally:
+        pdf.close()
+
+
+def available_extractors():
+    """Names of the registered backends whose optional package is installed."""
+    return [name for name, func in EXTRACTORS.items()
+            if func.required_module is None or importlib.util.find_spec(func.required_module) is not None]
+
+
+def get_extractor(name=None):
+    """
+    Returns the extraction function of a backend.
+
+    Args:
+        name (str): Registered backend name (default: DEFAULT_EXTRACTOR)
+
+    Raises:
+        ValueError: If the backend is unknown or its optional package is not installed
+    """
+    name = name or DEFAULT_EXTRACTOR
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown PDF text extractor: {name} (available: {', '.join(available_extractors())})")
+    if name not in available_extractors():
+        raise ValueError(f"PDF text extractor {name} needs the {EXTRACTORS[name].required_module} package")
+    return EXTRACTORS[name]
@@ -1,57 +1,74 @@
 import re
-import os
+
+from parse.registry import InvoiceParser, register_parser
+
+
+@register_parser
+class ElectricityParser(InvoiceParser):
+    utility_type = "elec"
+    required_fields = ("invoice_date", "invoice_total", "period_start", "period_end")
+    invoice_columns = ("invoice_number", "utility_type", "invoice_date", "invoice_total")
+    row_columns = ("period_start", "period_end", "usage_kwh", "rate_per_kwh", "usage_charge",
+                   "service_days", "service_rate_per_day", "service_charge")
+
+    # --- Define regex patterns ---
+    # Each field is one named alternative, so a single finditer pass over the
+    # text collects every field. m.lastgroup names the alternative that matched.
+    SCAN_RE = re.compile(
+        r"(?P<date>(?i:issuedate\s*(?P<invoice_date>[0-9]{1,2}[A-Z]{3}[0-9]{2})))"
+        r"|(?P<total>(?i:ElectricityCharges \$(?P<invoice_total>[\d.]+)))"
+        r"|(?P<period>YourPlanSingleRate\s*From(?P<period_start>\d{2}\w+\d{4})to(?P<period_end>\d{2}\w+\d{4}))"
+        r"|(?P<usage>Total\s*Anytime\s*(?P<usage_kwh>\d+)\s*\$(?P<rate_per_kwh>[\d.]+)\s*\$(?P<usage_charge>[\d.]+))"  # usage kWh, rate, cost
+        r"|(?P<service>Service\s*to\s*Property\s*Charge\s*(?P<service_days>\d+)\s*days\s*\$(?P<service_rate>[\d.]+)\s*/day\s*\$(?P<service_charge>[\d.]+))"  # days, rate/day, charge
+    )
+
+    def parse(self, full_text, file_path):
+        """
+        Parses PDF text to extract invoice date, invoice total, and table data.
+
+        Returns:
+            ParsedRows: One row per usage/service block, each including
+                        invoice_date and invoice_total
+        """
+        invoice_date = None
+        invoice_total = None
+        usage_matches = []
+        service_matches = []
+        period_matches = []
+
+        # --- Single pass: single-value fields keep their first match ---
+        for match in self.SCAN_RE.finditer(full_text):
+            kind = match.lastgroup
+            if kind == "usage":
+                usage_matches.append(match.group("usage_kwh", "rate_per_kwh", "usage_charge"))
+            elif kind == "service":
+                service_matches.append(match.group("service_days", "service_rate", "service_charge"))
+            elif kind == "period":
+                period_matches.append(match.group("period_start", "period_end"))
+            elif kind == "date" and invoice_date is None:
+                invoice_date = match.group("invoice_date")
+            elif kind == "total" and invoice_total is None:
+                invoice_total = match.group("invoice_total")
+
+        # --- Combine into rows with invoice info ---
+        table_data = self.new_rows()
+        blocks = min(len(usage_matches), len(service_matches))
+        # Assign period for each table if available
+        periods = period_matches[:blocks] + [(None, None)] * (blocks - len(period_matches))
+
+        table_data.append_invoice(
+            self.file_fields(file_path) + (invoice_date, invoice_total),
+            [period + usage + service for period, usage, service in zip(periods, usage_matches, service_matches)]
+        )
+        return table_data
+
 
 def parse_electricity_pdf(full_text, file_path):
     """
     Parses PDF text to extract invoice date, invoice total, and table data.
-    
+
     Returns:
         table_data: list of dicts (one dict per usage/service block),
                     each including invoice_date and invoice_total
     """
-    # --- Define regex patterns ---
-    Invoice_Date_re = r"issuedate\s*([0-9]{1,2}[A-Z]{3}[0-9]{2})"
-    Period_start_end_re = r"YourPlanSingleRate\s*From(\d{2}\w+\d{4})to(\d{2}\w+\d{4})"
-    Invoice_Total_re = r"ElectricityCharges \$([\d.]+)"
-    usage_re = r"Total\s*Anytime\s*(\d+)\s*\$([\d.]+)\s*\$([\d.]+)"  # usage kWh, rate, cost
-    service_re = r"Service\s*to\s*Property\s*Charge\s*(\d+)\s*days\s*\$([\d.]+)\s*/day\s*\$([\d.]+)"  # days, rate/day, charge
-
-    # --- Extract single-value fields ---
-    invoice_date_match = re.search(Invoice_Date_re, full_text, re.IGNORECASE)
-    invoice_date = invoice_date_match.group(1) if invoice_date_match else None
-
-    invoice_total_match = re.search(Invoice_Total_re, full_text, re.IGNORECASE)
-    invoice_total = invoice_total_match.group(1) if invoice_total_match else None
-
-    # --- Extract multi-value fields (tables) ---
-    usage_matches = re.findall(usage_re, full_text)
-    service_matches = re.findall(service_re, full_text)
-    period_matches = re.findall(Period_start_end_re, full_text)
-
-    # --- Combine into structured data with invoice info ---
-    file_name = os.path.basename(file_path)
-    table_data = []
-    for i, (usage, service) in enumerate(zip(usage_matches, service_matches)):
-        usage_kwh, rate_per_kwh, usage_charge = usage
-        service_days, service_rate, service_charge = service
-
-        # Assign period for each table if available
-        period_start, period_end = period_matches[i] if i < len(period_matches) else (None, None)
-
-        table_data.append({
-            "invoice_number": os.path.splitext(file_name)[0],
-            "utility_type": os.path.normpath(file_path).split(os.sep)[-2],            
-            "invoice_date": invoice_date,
-            "invoice_total": invoice_total,
-            "period_start": period_start,
-            "period_end": period_end,
-            "usage_kwh": usage_kwh,
-            "rate_per_kwh": rate_per_kwh,
-            "usage_charge": usage_charge,
-            "service_days": service_days,
-            "service_rate_per_day": service_rate,
-            "service_charge": service_charge
-        })
-
-    return table_data
-
+    return ElectricityParser().parse(full_text, file_path).to_dicts()
@@ -1,69 +1,83 @@
 import re
-import os
 
-def parse_gas_pdf(full_text, file_path):
-    """
-    Parses gas bill PDF text into structured table data.
+from parse.registry import InvoiceParser, register_parser
 
-    Returns:
-        table_data: list of dicts (one row per Step)
-    """
-    # --- Define regex patterns ---
-    Invoice_Date_re = r"IssueDate\s*(\d{1,2}[A-Za-z]{3}\d{2,4})"
-    Invoice_Total_re = r"GasCharges \$([\d.]+)"
-    Period_start_end_re = r"From(\d{1,2}[A-Za-z]+?\d{4})to(\d{1,2}[A-Za-z]+?\d{4})"
-    Season_re = r"(TotalWinter|TotalSummer|TotalSpring|TotalAutumn|TotalFall)"
-    step_re = r"Step(\d+)\s+([\d.]+)\s+\$([\d.]+)\s+\$([\d.]+)"  # Step number, usage_MJ, rate per MJ, usage_cost
-    service_re = r"ServicetoPropertyCharge\s+(\d+)days\s+\$([\d.]+)\/day\s+\$([\d.]+)"  # service_days, rate/day, charge
 
-    # --- Extract invoice info ---
-    invoice_date_match = re.search(Invoice_Date_re, full_text, re.IGNORECASE)
-    invoice_date = invoice_date_match.group(1) if invoice_date_match else None
+@register_parser
+class GasParser(InvoiceParser):
+    utility_type = "gas"
+    required_fields = ("invoice_date", "invoice_total", "period_start", "period_end", "season", "service_charge")
+    invoice_columns = ("invoice_number", "utility_type", "invoice_date", "invoice_total")
+    row_columns = ("period_start", "period_end", "season", "step_number", "usage_MJ", "Rate_per_MJ", "usage_cost",
+                   "service_days", "service_rate_per_day", "service_charge")
 
-    invoice_total_match = re.search(Invoice_Total_re, full_text, re.IGNORECASE)
-    invoice_total = invoice_total_match.group(1) if invoice_total_match else None
+    # --- Define regex patterns ---
+    # One named alternative per field, scanned in a single finditer pass.
+    # A period match starts a new block; season, steps and service belong
+    # to the most recent period, as with the previous re.split approach.
+    SCAN_RE = re.compile(
+        r"(?P<period>From(?P<period_start>\d{1,2}[A-Za-z]+?\d{4})to(?P<period_end>\d{1,2}[A-Za-z]+?\d{4}))"
+        r"|(?P<step>(?i:Step(?P<step_number>\d+)\s+(?P<usage_MJ>[\d.]+)\s+\$(?P<rate_per_MJ>[\d.]+)\s+\$(?P<usage_cost>[\d.]+)))"  # Step number, usage_MJ, rate per MJ, usage_cost
+        r"|(?P<service>(?i:ServicetoPropertyCharge\s+(?P<service_days>\d+)days\s+\$(?P<service_rate>[\d.]+)\/day\s+\$(?P<service_charge>[\d.]+)))"  # service_days, rate/day, charge
+        r"|(?P<season_match>(?i:(?P<season>TotalWinter|TotalSummer|TotalSpring|TotalAutumn|TotalFall)))"
+        r"|(?P<date>(?i:IssueDate\s*(?P<invoice_date>\d{1,2}[A-Za-z]{3}\d{2,4})))"
+        r"|(?P<total>(?i:GasCharges \$(?P<invoice_total>[\d.]+)))"
+    )
 
-    # --- Split text by periods ---
-    blocks = re.split(Period_start_end_re, full_text)
-    table_data = []
+    def parse(self, full_text, file_path):
+        """
+        Parses gas bill PDF text into structured table data.
 
-    file_name = os.path.basename(file_path)
-    utility_type = os.path.normpath(file_path).split(os.sep)[-2]
+        Returns:
+            ParsedRows: One row per Step
+        """
+        invoice_date = None
+        invoice_total = None
 
-    # Iterate through blocks containing period info
-    for i in range(1, len(blocks), 3):
-        period_start = blocks[i]
-        period_end = blocks[i+1]
-        block_text = blocks[i+2]
+        # Each block is [period_start, period_end, season, service, steps]
+        blocks = []
+        block = None
 
-        # Extract season
-        season_match = re.search(Season_re, block_text, re.IGNORECASE)
-        season = season_match.group(1) if season_match else None
+        # --- Single pass over the text ---
+        for match in self.SCAN_RE.finditer(full_text):
+            kind = match.lastgroup
+            if kind == "period":
+                block = [match.group("period_start"), match.group("period_end"), None, None, []]
+                blocks.append(block)
+            elif kind == "date":
+                if invoice_date is None:
+                    invoice_date = match.group("invoice_date")
+            elif kind == "total":
+                if invoice_total is None:
+                    invoice_total = match.group("invoice_total")
+            elif block is None:
+                # Text before the first period does not belong to any block
+                continue
+            elif kind == "step":
+                block[4].append(match.group("step_number", "usage_MJ", "rate_per_MJ", "usage_cost"))
+            elif kind == "season_match" and block[2] is None:
+                block[2] = match.group("season")
+            elif kind == "service" and block[3] is None:
+                # Assume only one service line per period
+                block[3] = match.group("service_days", "service_rate", "service_charge")
 
-        # Extract steps
-        steps = re.findall(step_re, block_text, re.IGNORECASE)
+        rows = []
+        for period_start, period_end, season, service, steps in blocks:
+            # Period, season and service values repeat on every step of the block
+            period = (period_start, period_end, season)
+            service = service or (None, None, None)
+            rows.extend(period + step + service for step in steps)
 
-        # Extract service info (assume only one service line per period)
-        service_match = re.search(service_re, block_text, re.IGNORECASE)
-        service_days, service_rate, service_charge = (service_match.groups() if service_match else (None, None, None))
+        table_data = self.new_rows()
+        table_data.append_invoice(self.file_fields(file_path) + (invoice_date, invoice_total), rows)
+        return table_data
 
-        for step in steps:
-            step_number, usage_MJ, rate_per_MJ, usage_cost = step
-            table_data.append({
-                "invoice_number": os.path.splitext(file_name)[0],
-                "utility_type": utility_type,
-                "invoice_date": invoice_date,
-                "invoice_total": invoice_total,
-                "period_start": period_start,
-                "period_end": period_end,
-                "season": season,
-                "step_number": step_number,
-                "usage_MJ": usage_MJ,
-                "Rate_per_MJ": rate_per_MJ,
-                "usage_cost": usage_cost,
-                "service_days": service_days,
-                "service_rate_per_day": service_rate,
-                "service_charge": service_charge
-            })
 
-    return table_data
\ No newline at end of file
+def parse_gas_pdf(full_text, file_path):
+    """
+    Parses gas bill PDF text into structured table data.
+
+    Returns:
+        table_data: list of dicts (one row per Step)
+    """
+    return GasParser().parse(full_text, file_path).to_dicts()
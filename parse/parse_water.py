@@ -1,86 +1,79 @@
 import re
-import os
 
-def parse_water_pdf(full_text, file_path):
-    """
-    Parses PDF text to extract invoice date, invoice total, and table data.
+from parse.registry import InvoiceParser, register_parser
+
+
+@register_parser
+class WaterParser(InvoiceParser):
+    utility_type = "water"
+    required_fields = ("invoice_date", "invoice_total", "invoice_period_start", "invoice_period_end")
+    invoice_columns = ("invoice_number", "utility_type", "invoice_date", "invoice_total",
+                       "invoice_period_start", "invoice_period_end")
+    row_columns = ("step_period_start", "step_period_end", "step_number", "usage_kL", "Price $/kL", "usage_cost")
 
-    Returns:
-        table_data: list of dicts (one dict per usage/service block),
-                    each including invoice_date, invoice_total, and step-level periods
-    """
     # --- Define regex patterns ---
-    Invoice_Date_re = r"Issuedate\s*(\d{1,2}[A-Za-z]{3}\d{4})"
-    Period_start_end_re = r"From(\d{1,2}[A-Za-z]{3}\d{4})-(\d{1,2}[A-Za-z]{3}\d{4})"
-    Invoice_Total_re = r"Totalusagecharges \$([\d.]+)"
-    usage_re = r"(?i)STEP(\d+).*?([\d.]+)kL\s*x\s*\$([\d.]+)\s*=\s*\$([\d.]+)"  # step number, usage_kL, price, total
-    sub_period_re = r"(\d{2}/\d{2}/\d{4})-(\d{2}/\d{2}/\d{4})"
+    # One named alternative per field, scanned in a single finditer pass.
+    # Sub-periods (dd/mm/yyyy-dd/mm/yyyy) open a new block for the steps that
+    # follow; a step may not run across a sub-period, matching the old re.split.
+    SCAN_RE = re.compile(
+        r"(?P<sub_period>(?P<step_period_start>\d{2}/\d{2}/\d{4})-(?P<step_period_end>\d{2}/\d{2}/\d{4}))"
+        r"|(?P<step>(?i:STEP(?P<step_number>\d+)(?:(?!\d{2}/\d{2}/\d{4}-\d{2}/\d{2}/\d{4}).)*?"
+        r"(?P<usage_kL>[\d.]+)kL\s*x\s*\$(?P<price_per_kL>[\d.]+)\s*=\s*\$(?P<usage_cost>[\d.]+)))"  # step number, usage_kL, price, total
+        r"|(?P<period>From(?P<period_start>\d{1,2}[A-Za-z]{3}\d{4})-(?P<period_end>\d{1,2}[A-Za-z]{3}\d{4}))"
+        r"|(?P<date>(?i:Issuedate\s*(?P<invoice_date>\d{1,2}[A-Za-z]{3}\d{4})))"
+        r"|(?P<total>(?i:Totalusagecharges \$(?P<invoice_total>[\d.]+)))"
+    )
 
-    # --- Extract single-value fields ---
-    invoice_date_match = re.search(Invoice_Date_re, full_text, re.IGNORECASE)
-    invoice_date = invoice_date_match.group(1) if invoice_date_match else None
-    
-    invoice_total_match = re.search(Invoice_Total_re, full_text, re.IGNORECASE)
-    invoice_total = invoice_total_match.group(1) if invoice_total_match else None
+    def parse(self, full_text, file_path):
+        """
+        Parses PDF text to extract invoice date, invoice total, and table data.
 
-    # --- Extract periods ---
-    invoice_period_matches = re.findall(Period_start_end_re, full_text)
-    
-    # --- Extract steps ---
-    # Split text by sub-periods so each step can be assigned a sub-period
-    blocks = re.split(sub_period_re, full_text)
-    table_data = []
-    file_name = os.path.basename(file_path)
-    utility_type = os.path.normpath(file_path).split(os.sep)[-2]
+        Returns:
+            ParsedRows: One row per step, each including invoice_date,
+                        invoice_total, and step-level periods
+        """
+        invoice_date = None
+        invoice_total = None
+        invoice_period = None
+        has_sub_periods = False
+        step_period = (None, None)
+        steps = []
 
-    if len(blocks) == 1:
-        # No sub-periods found, treat all steps as belonging to invoice period
-        usage_matches = re.findall(usage_re, full_text)
-        for usage in usage_matches:
-            step_number, usage_kL, price_per_kL, usage_cost = usage
-            period_start, period_end = (invoice_period_matches[0] if invoice_period_matches else (None, None))
-            table_data.append({
-                "invoice_number": os.path.splitext(file_name)[0],
-                "utility_type": utility_type,            
-                "invoice_date": invoice_date,
-                "invoice_total": invoice_total,
-                "invoice_period_start": period_start,
-                "invoice_period_end": period_end,
-                "step_period_start": None,
-                "step_period_end": None,
-                "step_number": step_number,
-                "usage_kL": usage_kL,
-                "Price $/kL": price_per_kL,
-                "usage_cost": usage_cost,
-            })
-    else:
-        # Sub-periods exist, assign each step to its corresponding sub-period
-        # re.split returns ['', start1, end1, block1, start2, end2, block2, ...]
-        for i in range(1, len(blocks), 3):
-            step_period_start = blocks[i]
-            step_period_end = blocks[i+1]
-            block_text = blocks[i+2]
+        # --- Single pass over the text ---
+        for match in self.SCAN_RE.finditer(full_text):
+            kind = match.lastgroup
+            if kind == "step":
+                steps.append(step_period + match.group("step_number", "usage_kL", "price_per_kL", "usage_cost"))
+            elif kind == "sub_period":
+                has_sub_periods = True
+                step_period = match.group("step_period_start", "step_period_end")
+            elif kind == "period" and invoice_period is None:
+                invoice_period = match.group("period_start", "period_end")
+            elif kind == "date" and invoice_date is None:
+                invoice_date = match.group("invoice_date")
+            elif kind == "total" and invoice_total is None:
+                invoice_total = match.group("invoice_total")
 
-            usage_matches = re.findall(usage_re, block_text)
-            for usage in usage_matches:
-                step_number, usage_kL, price_per_kL, usage_cost = usage
-                # If invoice_period exists, use first one
-                period_start, period_end = (invoice_period_matches[0] if invoice_period_matches else (None, None))
-                table_data.append({
-                    "invoice_number": os.path.splitext(file_name)[0],
-                    "utility_type": utility_type,            
-                    "invoice_date": invoice_date,
-                    "invoice_total": invoice_total,
-                    "invoice_period_start": period_start,
-                    "invoice_period_end": period_end,
-                    "step_period_start": step_period_start,
-                    "step_period_end": step_period_end,
-                    "step_number": step_number,
-                    "usage_kL": usage_kL,
-                    "Price $/kL": price_per_kL,
-                    "usage_cost": usage_cost,
-                })
+        if has_sub_periods:
+            # Sub-periods exist, so steps before the first one are not assigned to any period
+            steps = [step for step in steps if step[:2] != (None, None)]
 
-    return table_data
+        # If invoice_period exists, use first one
+        period_start, period_end = invoice_period or (None, None)
 
+        table_data = self.new_rows()
+        table_data.append_invoice(
+            self.file_fields(file_path) + (invoice_date, invoice_total, period_start, period_end), steps
+        )
+        return table_data
 
+
+def parse_water_pdf(full_text, file_path):
+    """
+    Parses PDF text to extract invoice date, invoice total, and table data.
+
+    Returns:
+        table_data: list of dicts (one dict per usage/service block),
+                    each including invoice_date, invoice_total, and step-level periods
+    """
+    return WaterParser().parse(full_text, file_path).to_dicts()
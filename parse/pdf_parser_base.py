@@ -1,47 +1,249 @@
 import os
 import glob
-import pandas as pd
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 import pdfplumber
 
-from parse.parse_electricity import parse_electricity_pdf
-from parse.parse_water import parse_water_pdf
-from parse.parse_gas import parse_gas_pdf
+from parse.registry import get_parser
+from parse.extractors import DEFAULT_EXTRACTOR, get_extractor
+from parse.text_cache import file_sha256
+
+# Bump the suffix whenever an extraction backend changes, so cached text is re-extracted
+EXTRACTOR_VERSION = f"pdfplumber{pdfplumber.__version__}-1"
+
+
+def _cache_variant(backend):
+    # pdfplumber text keeps the plain cache entry name, so existing caches stay valid
+    return None if backend == DEFAULT_EXTRACTOR else backend
+
+
+def parse_pdf(pdf_path, parser, text_cache=None, digest=None, timings=None, extractor=None,
+              fallback=DEFAULT_EXTRACTOR):
+    """
+    Extracts the text of a single PDF and runs it through a provider parser.
+
+    The text comes from the extractor backend (default: the parser's own
+    extractor, else pdfplumber). When the parsed rows leave one of the
+    parser's required_fields empty, the PDF is extracted again with the
+    fallback backend and parsed once more, so a fast backend whose layout
+    the regexes do not match still yields the pdfplumber result.
+
+    When a text_cache is given, the text is read from the cache if the PDF
+    (by content digest) was already extracted by that backend, so only the
+    regex parsing runs. When a timings dict is given, it receives the
+    seconds spent in text extraction ('extract', None when all text came
+    from the cache) and in the parser ('parse'), the extraction seconds per
+    backend ('backends'), the backend whose text was used ('backend') and
+    whether the fallback was needed ('fallback').
+
+    Returns:
+        ParsedRows: The table rows (or a list of row dicts, from parsers that return one)
+    """
+    backend = extractor or parser.extractor or DEFAULT_EXTRACTOR
+    if text_cache is not None:
+        digest = digest or file_sha256(pdf_path)
+
+    extract_seconds = {}
+    parse_seconds = 0.0
+    for name in dict.fromkeys([backend, fallback or backend]):
+        full_text = text_cache.get(digest, _cache_variant(name)) if text_cache is not None else None
+        if full_text is None:
+            started = time.perf_counter()
+            full_text = get_extractor(name)(pdf_path)
+            extract_seconds[name] = time.perf_counter() - started
+            if text_cache is not None:
+                text_cache.put(digest, full_text, _cache_variant(name))
+
+        started = time.perf_counter()
+        table_data = parser.parse(full_text, pdf_path)
+        parse_seconds += time.perf_counter() - started
+        if not parser.missing_fields(table_data):
+            break
+
+    if timings is not None:
+        timings["extract"] = sum(extract_seconds.values()) if extract_seconds else None
+        timings["parse"] = parse_seconds
+        timings["backends"] = extract_seconds
+        timings["backend"] = name
+        timings["fallback"] = name != backend
+    return table_data
+
+
+def _parse_pdf_safe(pdf_path, parser, text_cache=None, digest=None, extractor=None, fallback=DEFAULT_EXTRACTOR):
+    """Worker entry point: returns (table_data, error, cache_hit, timings) instead of raising."""
+    timings = {}
+    try:
+        table_data = parse_pdf(pdf_path, parser, text_cache=text_cache, digest=digest, timings=timings,
+                               extractor=extractor, fallback=fallback)
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}", False, timings
+    return table_data, None, text_cache is not None and not timings["backends"], timings
+
+
+def parse_pdf_files(pdf_files, utility_type, workers=1, chunksize=8, text_cache=None, parser_modules=(),
+                    extractor=None, fallback_extractor=DEFAULT_EXTRACTOR):
+    """
+    Parses a list of PDFs and returns a Pandas DataFrame.
+
+    Files that fail to open or parse are skipped and recorded in
+    df.attrs["failed_files"] as (path, error) tuples, so a single bad
+    invoice does not abort the whole stage. Per-file latencies are recorded
+    in df.attrs["pdf_timings"] as (path, extract seconds, parse seconds,
+    {backend: extract seconds}, fell back) tuples; extract seconds is None
+    when the text came from the cache.
+
+    Args:
+        pdf_files (list): Paths of the PDFs to parse
+        utility_type (str): Registered utility type, e.g. 'water', 'elec' or 'gas'
+        workers (int): Number of worker processes. 1 parses in-process,
+            None uses one process per CPU core
+        chunksize (int): Number of PDFs handed to a worker per task
+        text_cache (TextCache): Optional cache of extracted text. Cached PDFs
+            skip pdfplumber entirely and are only re-run through the regexes
+        parser_modules (list): Extra modules that register provider parsers
+        extractor (str): Text extraction backend (see parse/extractors.py).
+            None uses the parser's extractor attribute, else pdfplumber
+        fallback_extractor (str): Backend re-run on PDFs whose text leaves
+            a required field empty (None disables the fallback)
+
+    Returns:
+        pd.DataFrame: Each row is a table entry with invoice info, in the
+            same order as pdf_files regardless of the number of workers
+    """
+    return next(iter_parsed_batches(pdf_files, utility_type, None, workers, chunksize, text_cache, parser_modules,
+                                    extractor, fallback_extractor))
+
+
+def _iter_results(pdf_files, parser, workers, chunksize, text_cache, window=None, extractors=(None, None)):
+    """
+    Yield (pdf path, _parse_pdf_safe result) in the order of pdf_files.
+
+    With a window, worker processes are handed at most that many PDFs at a
+    time, so finished results never pile up faster than they are consumed.
+    """
+    # Hash in the parent process so the digest index is only written once
+    digests = text_cache.digests(pdf_files) if text_cache is not None else [None] * len(pdf_files)
+
+    if workers == 1:
+        yield from zip(pdf_files, map(_parse_pdf_safe, pdf_files, repeat(parser), repeat(text_cache), digests,
+                                      repeat(extractors[0]), repeat(extractors[1])))
+        return
+
+    window = window or len(pdf_files)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(pdf_files), window):
+            # Executor.map yields results in submission order, keeping row order deterministic
+            window_files = pdf_files[start:start + window]
+            yield from zip(window_files, executor.map(
+                _parse_pdf_safe, window_files, repeat(parser), repeat(text_cache),
+                digests[start:start + window], repeat(extractors[0]), repeat(extractors[1]),
+                chunksize=max(1, chunksize)
+            ))
+
+
+def iter_parsed_batches(pdf_files, utility_type, batch_rows=50000, workers=1, chunksize=8, text_cache=None,
+                        parser_modules=(), extractor=None, fallback_extractor=DEFAULT_EXTRACTOR):
+    """
+    Parses a list of PDFs and yields the rows as DataFrames of at most
+    batch_rows rows, so memory stays bounded by the batch size rather than
+    by the number of PDFs. Rows of one PDF are never split across batches
+    (a batch may exceed batch_rows by the rows of its last PDF).
+
+    Each batch carries the failed_files and pdf_timings (see parse_pdf_files)
+    of the PDFs finished since the previous batch. The last batch may be
+    empty; at least one batch is always yielded.
+
+    Args:
+        pdf_files (list): Paths of the PDFs to parse
+        utility_type (str): Registered utility type, e.g. 'water', 'elec' or 'gas'
+        batch_rows (int): Rows per batch (None yields everything as one batch)
+        workers, chunksize, text_cache, parser_modules, extractor, fallback_extractor:
+            As for parse_pdf_files
+
+    Yields:
+        pd.DataFrame: Table rows, in the same order as pdf_files
+    """
+    # Resolve the provider once; the instance is pickled to worker processes
+    parser = get_parser(utility_type, parser_modules)
+    backend = extractor or parser.extractor or DEFAULT_EXTRACTOR
+    # Fail fast on an unknown or uninstalled backend instead of once per PDF
+    get_extractor(backend)
+    if fallback_extractor:
+        get_extractor(fallback_extractor)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(pdf_files)) or 1
+    window = workers * max(1, chunksize) * 4 if batch_rows else None
+
+    table_data = parser.new_rows()
+    failed_files = []
+    pdf_timings = []
+    cache_hits = 0
+    fallbacks = 0
+
+    def batch():
+        # Build the DataFrame straight from the parsed columns
+        df = table_data.to_frame()
+        df.attrs["failed_files"] = failed_files
+        df.attrs["pdf_timings"] = pdf_timings
+        return df
+
+    results = _iter_results(pdf_files, parser, workers, chunksize, text_cache, window, (backend, fallback_extractor))
+    for pdf_path, (rows, error, cache_hit, timings) in results:
+        cache_hits += cache_hit
+        if timings:
+            fallbacks += timings["fallback"]
+            pdf_timings.append((pdf_path, timings["extract"], timings["parse"], timings["backends"],
+                                timings["fallback"]))
+        if error is not None:
+            print(f"✗ Failed to parse {pdf_path}: {error}")
+            failed_files.append((pdf_path, error))
+            continue
+        table_data.extend(rows)  # Add each table row to the list
+
+        if batch_rows and len(table_data) >= batch_rows:
+            yield batch()
+            table_data, failed_files, pdf_timings = parser.new_rows(), [], []
+
+    if text_cache is not None:
+        print(f"✓ Text cache: {cache_hits}/{len(pdf_files)} {utility_type} PDFs reparsed from cached text")
+        text_cache.evict()
+    if backend != fallback_extractor and fallback_extractor:
+        print(f"✓ Extractor {backend}: {fallbacks}/{len(pdf_files)} {utility_type} PDFs fell back to "
+              f"{fallback_extractor}")
+
+    yield batch()
+
+
+def list_pdfs(folder_path, pattern="*.pdf"):
+    """Return the PDFs in a folder matching pattern, sorted so row order does not depend on directory listing order."""
+    return sorted(glob.glob(os.path.join(folder_path, pattern)))
+
 
-def parse_all_pdfs(folder_path, utility_type, pattern="*.pdf"):
+def parse_all_pdfs(folder_path, utility_type, pattern="*.pdf", workers=1, chunksize=8, text_cache=None,
+                   parser_modules=(), extractor=None, fallback_extractor=DEFAULT_EXTRACTOR):
     """
     Parses all PDFs in a folder and returns a Pandas DataFrame.
-    Chooses parser based on utility_type.
+    Chooses parser from the registry based on utility_type.
 
     Args:
         folder_path (str): Path to the folder containing PDFs
-        utility_type (str): 'water' or 'elec' (case-insensitive)
+        utility_type (str): Registered utility type, e.g. 'water', 'elec' or 'gas'
         pattern (str): Glob pattern to match files (default: *.pdf)
+        workers (int): Number of worker processes (default: 1, in-process)
+        chunksize (int): Number of PDFs handed to a worker per task (default: 8)
+        text_cache (TextCache): Optional extracted-text cache (default: None)
+        parser_modules (list): Extra modules that register provider parsers (default: none)
+        extractor (str): Text extraction backend (default: the parser's, else pdfplumber)
+        fallback_extractor (str): Backend used when the text misses required fields (default: pdfplumber)
 
     Returns:
         pd.DataFrame: Each row is a table entry with invoice info
     """
-    all_table_data = []
-
-    pdf_files = glob.glob(os.path.join(folder_path, pattern))
-    for pdf_path in pdf_files:
-        # Extract full text from PDF
-        with pdfplumber.open(pdf_path) as pdf:
-            full_text = "\n".join(
-                page.extract_text() for page in pdf.pages if page.extract_text()
-            )
-
-        # Call the correct parser based on utility type
-        if utility_type.lower() == "water":
-            table_data = parse_water_pdf(full_text, pdf_path)
-        elif utility_type.lower() == "elec":
-            table_data = parse_electricity_pdf(full_text, pdf_path)
-        elif utility_type.lower() == "gas":
-            table_data = parse_gas_pdf(full_text, pdf_path)
-        else:
-            raise ValueError(f"Unsupported utility type: {utility_type}")
-
-        all_table_data.extend(table_data)  # Add each table row to the list
-
-    # Convert to Pandas DataFrame
-    df = pd.DataFrame(all_table_data)
-    return df
\ No newline at end of file
+    pdf_files = list_pdfs(folder_path, pattern)
+    return parse_pdf_files(pdf_files, utility_type, workers=workers, chunksize=chunksize, text_cache=text_cache,
+                           parser_modules=parser_modules, extractor=extractor,
+                           fallback_extractor=fallback_extractor)
@@ -0,0 +1,99 @@
+import os
+import importlib
+
+from parse.rows import ParsedRows
+
+# Modules that register the built-in providers when imported
+BUILTIN_PARSER_MODULES = (
+    "parse.parse_electricity",
+    "parse.parse_gas",
+    "parse.parse_water",
+)
+
+PARSERS = {}
+
+
+class InvoiceParser:
+    """
+    Base class for provider parsers.
+
+    Subclasses set utility_type and their bronze columns, compile their
+    patterns once as class attributes and implement parse(), appending each
+    invoice to the ParsedRows from new_rows(). Decorate them with @register_parser
+    so parse_all_pdfs can find them without an if/elif chain. Setting
+    required_fields lets a fast extractor fall back to pdfplumber when its
+    text does not match the provider's regexes.
+    """
+
+    utility_type = None
+
+    # Bronze columns the parser produces, in order: the invoice-level ones
+    # (repeated on every row of an invoice), then the per-row ones
+    invoice_columns = ()
+    row_columns = ()
+
+    # Text extraction backend for this provider's PDFs (see parse/extractors.py);
+    # None uses parse.extractor from config
+    extractor = None
+
+    # Row fields the regexes must fill. When the chosen backend's text leaves
+    # one of them empty, the PDF is re-read with the fallback backend
+    required_fields = ()
+
+    def missing_fields(self, table_data):
+        """Return the required fields that table_data leaves empty (all of them when there are no rows)."""
+        if not len(table_data):
+            return list(self.required_fields)
+        if not isinstance(table_data, ParsedRows):
+            return [field for field in self.required_fields if any(row.get(field) is None for row in table_data)]
+        return [field for field in self.required_fields if table_data.has_missing(field)]
+
+    @staticmethod
+    def file_fields(file_path):
+        """(invoice_number, utility_type) of a PDF: its file name without extension and its parent folder name."""
+        folder, file_name = os.path.split(file_path)
+        return os.path.splitext(file_name)[0], os.path.basename(os.path.normpath(folder))
+
+    def new_rows(self):
+        """An empty ParsedRows with this parser's columns."""
+        return ParsedRows(self.invoice_columns, self.row_columns)
+
+    def parse(self, full_text, file_path):
+        """
+        Parses the extracted text of one PDF.
+
+        Returns:
+            ParsedRows: The table rows (parsers returning a list of dicts,
+                one per row, are still supported)
+        """
+        raise NotImplementedError
+
+
+def register_parser(cls):
+    """Class decorator registering an InvoiceParser subclass under its utility_type."""
+    PARSERS[cls.utility_type.lower()] = cls
+    return cls
+
+
+def load_parser_modules(module_names=()):
+    """Import the built-in provider modules plus any extra ones (e.g. from config)."""
+    for module_name in (*BUILTIN_PARSER_MODULES, *module_names):
+        importlib.import_module(module_name)
+
+
+def get_parser(utility_type, module_names=()):
+    """
+    Returns a parser instance for a utility type.
+
+    Args:
+        utility_type (str): Registered utility type, e.g. 'elec' (case-insensitive)
+        module_names (list): Extra modules to import so their providers register
+
+    Raises:
+        ValueError: If no parser is registered for utility_type
+    """
+    load_parser_modules(module_names)
+    parser_cls = PARSERS.get(utility_type.lower())
+    if parser_cls is None:
+        raise ValueError(f"Unsupported utility type: {utility_type}")
+    return parser_cls()
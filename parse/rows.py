@@ -0,0 +1,109 @@
+from itertools import chain, repeat
+
+import pandas as pd
+
+
+class ParsedRows:
+    """
+    Compact accumulator for the table rows parsed from invoices.
+
+    Parsers append a whole invoice at a time: the values shared by every row
+    of the invoice (invoice number, dates, totals) are stored once as a tuple,
+    and each row is stored as the tuple of its own values, as the regex
+    groups return them. No dict is built per row; to_frame() expands the
+    invoice values and transposes the rows into columns in one pass, and the
+    DataFrame is made straight from those columns instead of pandas
+    inferring them from a list of dicts.
+
+    Instances pickle compactly, so worker processes return them as they are.
+
+    Example:
+        rows = ParsedRows(("invoice_number", "invoice_date"), ("step_number", "usage_kL"))
+        rows.append_invoice(("W3000", "01 Mar 2024"), [("1", "10"), ("2", "4.5")])
+        df = rows.to_frame()
+    """
+
+    __slots__ = ("invoice_columns", "row_columns", "invoices", "row_counts", "rows")
+
+    def __init__(self, invoice_columns=(), row_columns=()):
+        self.invoice_columns = tuple(invoice_columns)
+        self.row_columns = tuple(row_columns)
+        self.invoices = []
+        self.row_counts = []
+        self.rows = []
+
+    @property
+    def columns(self):
+        """All columns, in DataFrame order: invoice columns, then row columns."""
+        return self.invoice_columns + self.row_columns
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getstate__(self):
+        return self.invoice_columns, self.row_columns, self.invoices, self.row_counts, self.rows
+
+    def __setstate__(self, state):
+        self.invoice_columns, self.row_columns, self.invoices, self.row_counts, self.rows = state
+
+    def append_invoice(self, invoice_values: tuple, rows: list) -> None:
+        """
+        Append the rows of one invoice.
+
+        Parameters:
+            invoice_values (tuple): Values repeated on every row, in invoice_columns order
+            rows (list): One tuple per row, in row_columns order
+        """
+        if not rows:
+            return
+        self.invoices.append(invoice_values)
+        self.row_counts.append(len(rows))
+        self.rows.extend(rows)
+
+    def extend(self, rows) -> None:
+        """Append the rows of another ParsedRows, or of a list of row dicts (parsers that still return dicts)."""
+        if isinstance(rows, ParsedRows):
+            if not self.columns:
+                self.invoice_columns, self.row_columns = rows.invoice_columns, rows.row_columns
+            self.invoices.extend(rows.invoices)
+            self.row_counts.extend(rows.row_counts)
+            self.rows.extend(rows.rows)
+            return
+
+        for row in rows:
+            if not self.columns:
+                # A dict-returning parser: its first row fixes the column order
+                self.row_columns = tuple(row)
+            self.append_invoice((), [tuple(row.get(column) for column in self.row_columns)])
+
+    def has_missing(self, column: str) -> bool:
+        """Return True if some row has no value (None) for column, or the column does not exist."""
+        if column in self.invoice_columns:
+            index = self.invoice_columns.index(column)
+            return any(values[index] is None for values in self.invoices)
+        if column in self.row_columns:
+            index = self.row_columns.index(column)
+            return any(values[index] is None for values in self.rows)
+        return True
+
+    def to_frame(self) -> pd.DataFrame:
+        """Build a DataFrame from the invoice and row values, one column at a time."""
+        columns = list(self.columns)
+        if not self.rows:
+            return pd.DataFrame(columns=columns)
+
+        data = {}
+        if self.invoice_columns:
+            # One reference to the invoice's tuple per row it has
+            invoices = self.invoices
+            if len(invoices) != len(self.rows):
+                invoices = chain.from_iterable(map(repeat, invoices, self.row_counts))
+            data.update(zip(self.invoice_columns, map(list, zip(*invoices))))
+        data.update(zip(self.row_columns, map(list, zip(*self.rows))))
+        return pd.DataFrame(data, columns=columns)
+
+    def to_dicts(self) -> list:
+        """The rows as a list of dicts, as the parsers used to return them."""
+        columns = self.columns
+        invoices = chain.from_iterable(map(repeat, self.invoices, self.row_counts))
+        return [dict(zip(columns, invoice + row)) for invoice, row in zip(invoices, self.rows)]
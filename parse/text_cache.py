@@ -0,0 +1,141 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+from utils.atomic_write import atomic_write_bytes, atomic_write_text
+
+# Serialises updates of digests.json by caches parsing different utilities at once
+_INDEX_LOCK = threading.Lock()
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """Return the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TextCache:
+    """
+    Persistent, gzip-compressed cache of extracted PDF text.
+
+    Entries are keyed by the SHA-256 of the PDF and the extractor version,
+    so renaming a file still hits the cache while a change to the
+    extraction code (a new version string) misses it. Parser regexes are
+    applied after the cache, so changing them never invalidates entries.
+    Text of extraction backends other than pdfplumber is stored under a
+    variant (the backend name) next to the pdfplumber text.
+
+    Layout:
+        <cache_dir>/<sha[:2]>/<sha>-<version>[-<variant>].txt.gz
+        <cache_dir>/digests.json   path -> (size, mtime_ns, sha) so unchanged
+                                   files are not re-hashed on every run
+    """
+
+    def __init__(self, cache_dir, version, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, digest, variant=None):
+        suffix = f"-{variant}" if variant else ""
+        return self.cache_dir / digest[:2] / f"{digest}-{self.version}{suffix}.txt.gz"
+
+    def _digest_index_path(self):
+        return self.cache_dir / "digests.json"
+
+    def digests(self, pdf_files):
+        """
+        Return the SHA-256 of each file, re-hashing only files whose size or
+        modification time changed since the last run.
+        """
+        with _INDEX_LOCK:
+            return self._update_digests(pdf_files)
+
+    def _update_digests(self, pdf_files):
+        index_path = self._digest_index_path()
+        index = {}
+        if index_path.exists():
+            with open(index_path) as f:
+                index = json.load(f)
+
+        digests = []
+        for pdf_path in pdf_files:
+            key = os.path.abspath(pdf_path)
+            stat = os.stat(pdf_path)
+            entry = index.get(key)
+            if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                digests.append(entry[2])
+                continue
+            digest = file_sha256(pdf_path)
+            index[key] = [stat.st_size, stat.st_mtime_ns, digest]
+            digests.append(digest)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(index_path, json.dumps(index))
+        return digests
+
+    def get(self, digest, variant=None):
+        """Return cached text for a PDF digest, or None on a miss."""
+        entry_path = self._entry_path(digest, variant)
+        try:
+            with gzip.open(entry_path, "rt", encoding="utf-8") as f:
+                text = f.read()
+        except (FileNotFoundError, OSError, EOFError):
+            self.misses += 1
+            return None
+
+        # Touch the entry so eviction drops the least recently used files first
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            # Evicted since it was read; the text is still good
+            pass
+        self.hits += 1
+        return text
+
+    def put(self, digest, text, variant=None):
+        """Store extracted text for a PDF digest."""
+        atomic_write_bytes(self._entry_path(digest, variant), gzip.compress(text.encode("utf-8")))
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            int: Number of bytes removed
+        """
+        # Tracks sharing the cache evict one at a time; entries removed by
+        # another process between listing and removal are skipped
+        with _INDEX_LOCK:
+            return self._evict()
+
+    def _evict(self):
+        if not self.cache_dir.exists():
+            return 0
+
+        entries = []
+        total_bytes = 0
+        for entry_path in self.cache_dir.glob("*/*.txt.gz"):
+            try:
+                stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+            total_bytes += stat.st_size
+
+        removed = 0
+        for _, size, entry_path in sorted(entries):
+            if total_bytes - removed <= self.max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            removed += size
+        return removed
+
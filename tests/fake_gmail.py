@@ -0,0 +1,225 @@
+import base64
+import itertools
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+
+class FakeGmailService:
+    """
+    In-memory stand-in for the Gmail API service returned by connect_gmail.
+
+    Supports the calls the extract stage makes (getProfile, paginated
+    messages.list with from:/after:/OR filters, messages.get,
+    messages.attachments.get and batch requests) so the
+    download code can be exercised offline. fields masks are accepted and
+    ignored: full resources are returned. http_calls counts round trips:
+    a batch counts as one call however many sub-requests it carries.
+
+    Example:
+        service = FakeGmailService()
+        service.add_message("m1", {"INV001.pdf": b"%PDF-1.4 ..."})
+        service.fail("attachments.get", "m1", status=429, times=2)
+        download_pdf_attachments(service, [{"id": "m1"}], save_folder="tmp")
+    """
+
+    def __init__(self, email_address="me@example.com"):
+        self.email_address = email_address
+        self.messages = {}
+        self.attachments = {}
+        self.http_calls = 0
+        self._failures = {}
+        self._attachment_ids = itertools.count(1)
+
+    def add_message(self, msg_id, attachments=None, sender="bills@example.com", internal_date=0):
+        """
+        Add a message with optional attachments.
+
+        Parameters:
+            msg_id (str): Gmail message id
+            attachments (dict): Mapping of filename -> file bytes
+            sender (str): Value of the From header
+            internal_date (int): Receive time in epoch milliseconds
+        """
+        parts = [{"partId": "0", "mimeType": "text/plain", "filename": "", "body": {"size": 0}}]
+        for filename, data in (attachments or {}).items():
+            attachment_id = f"att{next(self._attachment_ids)}"
+            self.attachments[(msg_id, attachment_id)] = data
+            parts.append({
+                "partId": str(len(parts)),
+                "mimeType": "application/pdf",
+                "filename": filename,
+                "body": {"attachmentId": attachment_id, "size": len(data)},
+            })
+
+        self.messages[msg_id] = {
+            "id": msg_id,
+            "threadId": msg_id,
+            "internalDate": str(internal_date),
+            "payload": {
+                "headers": [{"name": "From", "value": sender}],
+                "parts": parts,
+            },
+        }
+
+    def fail(self, method, key, status=500, times=1):
+        """Make the next `times` calls of method ('messages.get' or 'attachments.get') for key fail."""
+        self._failures[(method, key)] = (status, times)
+
+    def _maybe_fail(self, method, key):
+        status, times = self._failures.get((method, key), (None, 0))
+        if times <= 0:
+            return
+        self._failures[(method, key)] = (status, times - 1)
+        resp = httplib2.Response({"status": status})
+        resp.reason = "Injected failure"
+        raise HttpError(resp, b"{}")
+
+    def users(self):
+        return _FakeUsers(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _FakeBatchHttpRequest(self, callback)
+
+
+def _split_terms(query):
+    """Split a query into whitespace-separated terms, keeping parenthesised groups whole."""
+    terms, depth, current = [], 0, ""
+    for char in query:
+        depth += (char == "(") - (char == ")")
+        if char.isspace() and depth == 0:
+            if current:
+                terms.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        terms.append(current)
+    return terms
+
+
+def _matches_query(message, query):
+    """Evaluate the subset of Gmail search syntax used by the pipeline: from:, after:, OR and (groups)."""
+    terms = _split_terms(query or "")
+    if "OR" in terms:
+        alternatives, current = [], []
+        for term in terms + ["OR"]:
+            if term == "OR":
+                alternatives.append(" ".join(current))
+                current = []
+            else:
+                current.append(term)
+        return any(_matches_query(message, alternative) for alternative in alternatives)
+
+    headers = {h["name"].lower(): h["value"] for h in message["payload"]["headers"]}
+    for term in terms:
+        if term.startswith("(") and term.endswith(")") and not _matches_query(message, term[1:-1]):
+            return False
+        if term.startswith("from:") and term[len("from:"):].lower() not in headers.get("from", "").lower():
+            return False
+        if term.startswith("after:") and int(message["internalDate"]) // 1000 <= int(term[len("after:"):]):
+            return False
+    return True
+
+
+class _FakeRequest:
+    def __init__(self, service, func):
+        self._service = service
+        self._func = func
+
+    def _call(self):
+        return self._func()
+
+    def execute(self, **kwargs):
+        self._service.http_calls += 1
+        return self._call()
+
+
+class _FakeBatchHttpRequest:
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        if request_id is None:
+            request_id = str(len(self._requests))
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self, **kwargs):
+        self._service.http_calls += 1
+        for request_id, request, callback in self._requests:
+            try:
+                response, exception = request._call(), None
+            except HttpError as e:
+                response, exception = None, e
+            if callback is not None:
+                callback(request_id, response, exception)
+
+
+class _FakeUsers:
+    def __init__(self, service):
+        self._service = service
+
+    def getProfile(self, userId):
+        service = self._service
+        return _FakeRequest(service, lambda: {
+            "emailAddress": service.email_address,
+            "messagesTotal": len(service.messages),
+        })
+
+    def messages(self):
+        return _FakeMessages(self._service)
+
+
+class _FakeMessages:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, userId, q=None, maxResults=100, pageToken=None, fields=None):
+        service = self._service
+
+        def call():
+            matching = [msg for msg in service.messages.values() if _matches_query(msg, q)]
+            start = int(pageToken or 0)
+            page = matching[start:start + maxResults]
+            response = {
+                "messages": [{"id": msg["id"], "threadId": msg["threadId"]} for msg in page],
+                "resultSizeEstimate": len(page),
+            }
+            if start + maxResults < len(matching):
+                response["nextPageToken"] = str(start + maxResults)
+            return response
+
+        return _FakeRequest(service, call)
+
+    def get(self, userId, id, **kwargs):
+        service = self._service
+
+        def call():
+            service._maybe_fail("messages.get", id)
+            if id not in service.messages:
+                resp = httplib2.Response({"status": 404})
+                resp.reason = "Not Found"
+                raise HttpError(resp, b"{}")
+            return service.messages[id]
+
+        return _FakeRequest(service, call)
+
+    def attachments(self):
+        return _FakeAttachments(self._service)
+
+
+class _FakeAttachments:
+    def __init__(self, service):
+        self._service = service
+
+    def get(self, userId, messageId, id):
+        service = self._service
+
+        def call():
+            service._maybe_fail("attachments.get", messageId)
+            data = service.attachments[(messageId, id)]
+            return {"size": len(data), "data": base64.urlsafe_b64encode(data).decode("UTF-8")}
+
+        return _FakeRequest(service, call)
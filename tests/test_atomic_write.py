@@ -0,0 +1,26 @@
+import pytest
+
+import utils.atomic_write as atomic_write
+from utils.atomic_write import atomic_write_bytes, atomic_write_text
+
+
+def test_writes_whole_file_and_creates_folder(tmp_path):
+    path = tmp_path / "state" / "sync.json"
+    atomic_write_text(path, '{"a": 1}')
+    atomic_write_bytes(path, b'{"a": 2}')
+    assert path.read_text() == '{"a": 2}'
+    assert [p.name for p in path.parent.iterdir()] == ["sync.json"]
+
+
+def test_failed_write_keeps_previous_file_and_removes_temp_file(tmp_path, monkeypatch):
+    path = tmp_path / "sync.json"
+    atomic_write_text(path, "old")
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(atomic_write.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        atomic_write_text(path, "new")
+    assert path.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["sync.json"]
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from transform.date_parsing import DateParser, detect_format
+
+
+def test_detects_the_format_matching_most_values():
+    assert detect_format(["01Feb2024", "15Mar2024", "2024-03-05"]) == "%d%b%Y"
+    assert detect_format(["NULL", "n/a"]) is None
+
+
+def test_parses_column_with_its_detected_format_first():
+    parser = DateParser()
+    parsed = parser.parse(pd.Series(["01Feb2024", "15Mar2024", "2024-03-05", "NULL", None]), "water", "invoice_date")
+
+    assert parser.detected[("water", "invoice_date")] == "%d%b%Y"
+    # Values the detected format does not match fall back to the other candidates
+    assert parsed.tolist()[:3] == [pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-15"), pd.Timestamp("2024-03-05")]
+    assert parsed.isna().tolist()[3:] == [True, True]
+
+
+def test_detected_format_is_kept_for_later_batches():
+    parser = DateParser()
+    parser.parse(pd.Series(["01/02/24", "13/02/24"]), "elec", "invoice_date")
+    parsed = parser.parse(pd.Series(["03/04/24"]), "elec", "invoice_date")
+    assert parser.detected[("elec", "invoice_date")] == "%d/%m/%y"
+    assert parsed.tolist() == [pd.Timestamp("2024-04-03")]
+
+
+def test_configured_formats_are_not_detected():
+    parser = DateParser({"water": ["%d/%m/%Y"]})
+    parsed = parser.parse(pd.Series(["05/03/2024"]), "water", "invoice_date")
+    assert parsed.tolist() == [pd.Timestamp("2024-03-05")]
+    assert parser.detected == {}
@@ -0,0 +1,80 @@
+import pytest
+from googleapiclient.errors import HttpError
+
+from extract.gmail_batch import execute_batched, execute_with_backoff
+from fake_gmail import FakeGmailService
+
+
+def get_requests(service, ids):
+    return {msg_id: (lambda msg_id=msg_id: service.users().messages().get(userId="me", id=msg_id)) for msg_id in ids}
+
+
+@pytest.fixture
+def service():
+    service = FakeGmailService()
+    for i in range(5):
+        service.add_message(f"m{i}", {f"INV{i}.pdf": b"%PDF"})
+    return service
+
+
+def test_batches_requests(service):
+    results, errors = execute_batched(service, get_requests(service, [f"m{i}" for i in range(5)]), batch_size=2,
+                                      backoff_seconds=0)
+    assert sorted(results) == [f"m{i}" for i in range(5)]
+    assert errors == {}
+    assert service.http_calls == 3
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_retryable_statuses(service, status):
+    service.fail("messages.get", "m1", status=status, times=2)
+    results, errors = execute_batched(service, get_requests(service, ["m0", "m1"]), max_retries=3, backoff_seconds=0)
+    assert sorted(results) == ["m0", "m1"]
+    assert errors == {}
+    # One batch of both, then m1 alone twice
+    assert service.http_calls == 3
+
+
+@pytest.mark.parametrize("status", [400, 403, 404])
+def test_does_not_retry_client_errors(service, status):
+    service.fail("messages.get", "m1", status=status, times=1)
+    results, errors = execute_batched(service, get_requests(service, ["m0", "m1"]), max_retries=3, backoff_seconds=0)
+    assert list(results) == ["m0"]
+    assert errors["m1"].resp.status == status
+    assert service.http_calls == 1
+
+
+def test_failures_are_per_item(service):
+    service.fail("messages.get", "m2", status=500, times=10)
+    results, errors = execute_batched(service, get_requests(service, ["m0", "m1", "m2", "missing"]),
+                                      max_retries=2, backoff_seconds=0)
+    assert sorted(results) == ["m0", "m1"]
+    assert sorted(errors) == ["m2", "missing"]
+    assert errors["m2"].resp.status == 500
+    assert errors["missing"].resp.status == 404
+
+
+def test_on_result_streams_responses(service):
+    seen = []
+    results, errors = execute_batched(service, get_requests(service, ["m0", "m1"]),
+                                      on_result=lambda key, response: seen.append((key, response["id"])))
+    assert results == {}
+    assert sorted(seen) == [("m0", "m0"), ("m1", "m1")]
+
+
+def test_execute_with_backoff_retries_then_raises(service):
+    service.fail("messages.get", "m0", status=503, times=2)
+    request = service.users().messages().get(userId="me", id="m0")
+    assert execute_with_backoff(request, max_retries=2, backoff_seconds=0)["id"] == "m0"
+
+    service.fail("messages.get", "m0", status=503, times=5)
+    with pytest.raises(HttpError):
+        execute_with_backoff(request, max_retries=2, backoff_seconds=0)
+
+
+def test_execute_with_backoff_does_not_retry_client_errors(service):
+    service.fail("messages.get", "m0", status=404, times=1)
+    request = service.users().messages().get(userId="me", id="m0")
+    with pytest.raises(HttpError):
+        execute_with_backoff(request, max_retries=3, backoff_seconds=0)
+    assert service.http_calls == 1
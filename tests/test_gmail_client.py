@@ -0,0 +1,36 @@
+from extract.gmail_client import GmailClient
+from fake_gmail import FakeGmailService
+
+QUERIES = {
+    "elec": "from:bills@power.example has:attachment",
+    "gas": "from:bills@gas.example has:attachment",
+}
+
+
+def client_with_messages():
+    service = FakeGmailService()
+    service.add_message("e1", {"E1.pdf": b"%PDF"}, sender="Power <bills@power.example>", internal_date=1_000)
+    service.add_message("e2", {"E2.pdf": b"%PDF"}, sender="Power <bills@power.example>", internal_date=2_000)
+    service.add_message("g1", {"G1.pdf": b"%PDF"}, sender="Gas <bills@gas.example>", internal_date=1_500)
+    return service, GmailClient(service, http_factory=lambda: None)
+
+
+def test_routes_messages_by_sender():
+    service, client = client_with_messages()
+    emails, incomplete = client.search_by_sender(QUERIES, max_retries=0)
+    assert [msg["id"] for msg in emails["elec"]] == ["e1", "e2"]
+    assert [msg["id"] for msg in emails["gas"]] == ["g1"]
+    assert incomplete == set()
+
+
+def test_failed_fetch_is_reported_without_dropping_the_others(capsys):
+    service, client = client_with_messages()
+    service.fail("messages.get", "e2", status=404)
+
+    emails, incomplete = client.search_by_sender(QUERIES, max_retries=0)
+
+    assert [msg["id"] for msg in emails["elec"]] == ["e1"]
+    assert [msg["id"] for msg in emails["gas"]] == ["g1"]
+    # The sender of e2 is unknown, so no combined query may treat its search as complete
+    assert incomplete == {"elec", "gas"}
+    assert "✗ Failed to fetch message e2" in capsys.readouterr().out
@@ -0,0 +1,58 @@
+import pandas as pd
+
+from load.gold_partitions import upsert_gold_partitions, read_gold_partitions
+
+
+def gold_rows(*rows):
+    """Rows of (utility_type, invoice_number, invoice_date, step_number, usage_amount)."""
+    return pd.DataFrame(rows, columns=["utility_type", "invoice_number", "invoice_date", "step_number", "usage_amount"])
+
+
+def read_sorted(root):
+    gold = read_gold_partitions(root)
+    return sorted(gold[["utility_type", "invoice_number", "step_number", "usage_amount"]].itertuples(index=False, name=None))
+
+
+def test_changed_invoice_keeps_other_utilities_invoices(tmp_path):
+    upsert_gold_partitions(gold_rows(
+        ("elec", "INV1", "2024-03-01", 1, 10.0),
+        ("elec", "INV2", "2024-03-15", 1, 20.0),
+    ), tmp_path)
+
+    # gas INV1 shares its invoice and step number with the stored elec INV1
+    upsert_gold_partitions(gold_rows(
+        ("elec", "INV2", "2024-03-15", 1, 25.0),
+        ("gas", "INV1", "2024-03-20", 1, 30.0),
+    ), tmp_path)
+
+    assert read_sorted(tmp_path) == [
+        ("elec", "INV1", 1, 10.0),
+        ("elec", "INV2", 1, 25.0),
+        ("gas", "INV1", 1, 30.0),
+    ]
+
+
+def test_changed_invoice_replaces_all_of_its_steps(tmp_path):
+    upsert_gold_partitions(gold_rows(
+        ("water", "W1", "2024-03-01", 1, 10.0),
+        ("water", "W1", "2024-03-01", 2, 5.0),
+    ), tmp_path)
+    upsert_gold_partitions(gold_rows(("water", "W1", "2024-03-01", 1, 12.0)), tmp_path)
+
+    assert read_sorted(tmp_path) == [("water", "W1", 1, 12.0)]
+
+
+def test_moved_invoice_leaves_its_old_partition(tmp_path):
+    upsert_gold_partitions(gold_rows(("gas", "G1", "2024-01-10", 1, 1.0)), tmp_path)
+    result = upsert_gold_partitions(gold_rows(("gas", "G1", "2024-02-10", 1, 1.0)), tmp_path)
+
+    assert result["partitions"] == ["utility_type=gas/year=2024/month=01", "utility_type=gas/year=2024/month=02"]
+    assert read_gold_partitions(tmp_path, start="2024-01-01", end="2024-01-31").empty
+    assert read_sorted(tmp_path) == [("gas", "G1", 1, 1.0)]
+
+
+def test_unchanged_invoices_are_skipped(tmp_path):
+    rows = gold_rows(("elec", "INV1", "2024-03-01", 1, 10.0))
+    upsert_gold_partitions(rows, tmp_path)
+    result = upsert_gold_partitions(rows, tmp_path)
+    assert (result["invoices"], result["files"]) == (0, [])
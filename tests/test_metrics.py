@@ -0,0 +1,41 @@
+from monitor.metrics import RunMetrics
+
+
+def samples(text, name):
+    return [line for line in text.splitlines() if line.startswith(f"utility_pipeline_{name}{{")]
+
+
+def test_retried_stage_is_one_prometheus_sample():
+    metrics = RunMetrics()
+    with metrics.stage("elec/parse") as record:
+        record.rows_out = 5
+        record.succeeded = False
+    with metrics.stage("elec/parse") as record:
+        record.rows_out = 7
+    with metrics.stage("load", "gold"):
+        pass
+
+    text = metrics.prometheus_text(succeeded=True)
+    for name in ("stage_wall_seconds", "stage_rows_out", "stage_success", "stage_attempts"):
+        series = [line.rsplit(" ", 1)[0] for line in samples(text, name)]
+        assert len(series) == len(set(series)) == 2, name
+
+    assert 'utility_pipeline_stage_rows_out{stage="elec/parse"} 12' in text
+    assert 'utility_pipeline_stage_attempts{stage="elec/parse"} 2' in text
+    assert 'utility_pipeline_stage_success{stage="elec/parse"} 1' in text
+    # The JSON report keeps every attempt
+    assert len(metrics.report()["stages"]) == 3
+
+
+def test_summary_lists_each_slow_pdf_once():
+    metrics = RunMetrics()
+    for name in ("pdf_extract_seconds", "pdf_extract_pdfplumber_seconds"):
+        metrics.observe(name, 2.0, "elec", "data/raw/elec/INV1.pdf")
+        metrics.observe(name, 1.0, "gas", "data/raw/gas/INV2.pdf")
+    metrics.observe("pdf_parse_seconds", 0.5, "elec", "data/raw/elec/INV1.pdf")
+
+    slowest = [line for line in metrics.summary() if "slowest" in line]
+    assert slowest == [
+        "  slowest pdf_extract_seconds: 2.000s data/raw/elec/INV1.pdf",
+        "  slowest pdf_extract_seconds: 1.000s data/raw/gas/INV2.pdf",
+    ]
@@ -0,0 +1,75 @@
+import time
+import threading
+
+import extract.raw_store as raw_store
+from extract.raw_store import RawPdfStore
+from extract.pdf_downloader import download_pdf_attachments
+from parse.registry import InvoiceParser
+from fake_gmail import FakeGmailService
+
+
+def slow_writes(monkeypatch, seconds=0.05):
+    """Widen the window between claiming a digest and its file appearing, as a slow disk does."""
+    write = raw_store.atomic_write_bytes
+
+    def slow_write(path, data):
+        time.sleep(seconds)
+        write(path, data)
+
+    monkeypatch.setattr(raw_store, "atomic_write_bytes", slow_write)
+
+
+def test_concurrent_puts_of_same_bytes_store_one_file(tmp_path, monkeypatch):
+    slow_writes(monkeypatch)
+    store = RawPdfStore(tmp_path)
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(store.put(b"%PDF same", f"m{i}", "INV1.pdf")))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(path.name for path in tmp_path.glob("*.pdf")) == ["INV1.pdf"]
+    assert sorted(is_new for _, _, is_new in results) == [False, False, False, True]
+    assert all(store.has_attachment(f"m{i}", "INV1.pdf") for i in range(4))
+
+
+def test_reissued_bill_replaces_the_stored_one(tmp_path):
+    store = RawPdfStore(tmp_path)
+    store.put(b"%PDF one", "m1", "INV1.pdf")
+    _, stored_name, is_new = store.put(b"%PDF two", "m2", "INV1.pdf")
+
+    assert is_new
+    # Parsing takes invoice_number from the file name, so the bill stays one invoice
+    assert InvoiceParser.file_fields(tmp_path / stored_name)[0] == "INV1"
+    assert [path.read_bytes() for path in tmp_path.glob("*.pdf")] == [b"%PDF two"]
+    # The email of the replaced bill is not downloaded again
+    assert store.has_attachment("m1", "INV1.pdf")
+    store.flush()
+    assert RawPdfStore(tmp_path).has_attachment("m1", "INV1.pdf")
+
+
+def test_index_forgets_deleted_files(tmp_path):
+    store = RawPdfStore(tmp_path)
+    store.put(b"%PDF one", "m1", "INV1.pdf")
+    store.flush()
+    (tmp_path / "INV1.pdf").unlink()
+
+    store = RawPdfStore(tmp_path)
+    assert not store.has_attachment("m1", "INV1.pdf")
+    assert store.put(b"%PDF one", "m1", "INV1.pdf")[2]
+
+
+def test_concurrent_downloads_dedupe_identical_attachments(tmp_path, monkeypatch):
+    slow_writes(monkeypatch)
+    service = FakeGmailService()
+    for i in range(4):
+        service.add_message(f"m{i}", {"INV1.pdf": b"%PDF same bill"})
+    service.add_message("m9", {"INV2.pdf": b"%PDF other bill"})
+
+    messages = [{"id": msg_id} for msg_id in service.messages]
+    stats = download_pdf_attachments(service, messages, save_folder=tmp_path, max_workers=4, max_retries=0)
+
+    assert sorted(path.name for path in tmp_path.glob("*.pdf")) == ["INV1.pdf", "INV2.pdf"]
+    assert (stats["files"], stats["duplicates"], stats["failed"]) == (2, 3, 0)
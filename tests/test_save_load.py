@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from load.save_load import BatchLayerWriter, load_layer
+
+
+@pytest.mark.parametrize("storage_format", ["csv", "parquet"])
+def test_layer_without_rows_keeps_its_columns(tmp_path, storage_format):
+    pytest.importorskip("pyarrow")
+    with BatchLayerWriter(tmp_path / "elec_raw.csv", storage_format) as writer:
+        writer.write(pd.DataFrame(columns=["invoice_number", "usage_amount"]))
+
+    df = load_layer(tmp_path / "elec_raw.csv", storage_format)
+    assert list(df.columns) == ["invoice_number", "usage_amount"]
+    assert df.empty
+
+
+@pytest.mark.parametrize("storage_format", ["csv", "parquet"])
+def test_batches_are_aligned_to_the_first_batch(tmp_path, storage_format):
+    pytest.importorskip("pyarrow")
+    with BatchLayerWriter(tmp_path / "gas_raw.csv", storage_format) as writer:
+        writer.write(pd.DataFrame(columns=["invoice_number", "step_number"]))
+        writer.write(pd.DataFrame({"step_number": ["1"], "invoice_number": ["G1"]}))
+        writer.write(pd.DataFrame({"invoice_number": ["G2"], "step_number": ["2"]}))
+
+    df = load_layer(tmp_path / "gas_raw.csv", storage_format)
+    assert list(df.columns) == ["invoice_number", "step_number"]
+    assert df["invoice_number"].astype(str).tolist() == ["G1", "G2"]
+    assert writer.rows == 2
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from transform.standardize_df_cols import concat_optimized, optimize_column_dtypes
+
+COLUMN_DTYPES = {"invoice_number": "string", "utility_type": "string", "step_number": "int"}
+
+
+def test_missing_text_is_not_a_category():
+    # astype(str) on pandas < 3 turns missing values into 'nan' and 'None'
+    df = pd.DataFrame({
+        "invoice_number": ["E1", "nan", "None", "E2"],
+        "utility_type": ["elec", "elec", "<NA>", "elec"],
+        "step_number": ["1", "nan", "2", "None"],
+    })
+
+    optimized = optimize_column_dtypes(df, COLUMN_DTYPES)
+
+    assert list(optimized["invoice_number"].cat.categories) == ["E1", "E2"]
+    assert optimized["invoice_number"].isna().tolist() == [False, True, True, False]
+    assert list(optimized["utility_type"].cat.categories) == ["elec"]
+    assert optimized["step_number"].dtype == "Int16"
+    assert optimized["step_number"].isna().tolist() == [False, True, False, True]
+
+
+def test_concat_keeps_missing_values_missing():
+    first = optimize_column_dtypes(
+        pd.DataFrame({"invoice_number": ["E1", "nan"], "utility_type": ["elec", "elec"], "step_number": ["1", "2"]}),
+        COLUMN_DTYPES,
+    )
+    second = optimize_column_dtypes(
+        pd.DataFrame({"invoice_number": [np.nan, "G1"], "utility_type": ["gas", "gas"], "step_number": ["1", "1"]}),
+        COLUMN_DTYPES,
+    )
+
+    combined = concat_optimized([first, second])
+
+    assert isinstance(combined["invoice_number"].dtype, pd.CategoricalDtype)
+    assert list(combined["invoice_number"].cat.categories) == ["E1", "G1"]
+    assert combined["invoice_number"].isna().tolist() == [False, True, True, False]
+    assert list(combined["utility_type"].cat.categories) == ["elec", "gas"]
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from load.star_schema import refresh_star_schema, load_star_table, TABLES
+
+COLUMN_DTYPES = {
+    "invoice_number": "string", "utility_type": "string", "invoice_date": "datetime", "invoice_total": "float",
+    "invoice_start": "datetime", "invoice_end": "datetime", "step_number": "int", "step_start": "datetime",
+    "step_end": "datetime", "season": "string", "usage_amount": "float", "usage_rate": "float",
+    "usage_charge": "float", "service_days": "int", "service_rate": "float", "service_charge": "float",
+}
+SEASONS = {"summer": {"start_month": 11, "end_month": 4}, "winter": {"start_month": 5, "end_month": 10}}
+SORT_KEYS = ["invoice_key", "step_number", "date_key", "utility_type_key", "year", "month", "season_key"]
+
+
+def invoice(utility, number, date, steps):
+    start = pd.Timestamp(date) - pd.Timedelta(days=30)
+    return [{
+        "invoice_number": number, "utility_type": utility, "invoice_date": date, "invoice_total": 100.0,
+        "invoice_start": start, "invoice_end": date, "step_number": step, "step_start": start, "step_end": date,
+        "season": "Summer" if pd.Timestamp(date).month in (11, 12, 1, 2, 3, 4) else "Winter",
+        "usage_amount": 10.0 * step, "usage_rate": 0.3, "usage_charge": 3.0 * step,
+        "service_days": 30, "service_rate": 1.0, "service_charge": 30.0,
+    } for step in range(1, steps + 1)]
+
+
+def gold(*invoices):
+    return pd.DataFrame([row for rows in invoices for row in rows])
+
+
+def read_tables(root):
+    tables = {}
+    for table in TABLES:
+        df = load_star_table(root, table, column_dtypes=COLUMN_DTYPES)
+        keys = [key for key in SORT_KEYS if key in df]
+        tables[table] = df.sort_values(keys, ignore_index=True)
+    return tables
+
+
+def test_incremental_refresh_matches_full_rebuild(tmp_path):
+    elec_1 = invoice("elec", "E1", "2023-02-05", 2)
+    elec_2 = invoice("elec", "E2", "2023-03-05", 1)
+    gas_1 = invoice("gas", "G1", "2024-07-10", 3)
+    # E1 comes back with a new date (another partition) and one step fewer
+    elec_1_changed = invoice("elec", "E1", "2024-01-05", 1)
+
+    refresh_star_schema(gold(elec_1, elec_2), tmp_path / "incremental", column_dtypes=COLUMN_DTYPES, seasons=SEASONS, full=True)
+    refresh_star_schema(gold(gas_1), tmp_path / "incremental", column_dtypes=COLUMN_DTYPES, seasons=SEASONS)
+    result = refresh_star_schema(gold(elec_1_changed), tmp_path / "incremental", column_dtypes=COLUMN_DTYPES,
+                                 seasons=SEASONS)
+    refresh_star_schema(gold(elec_1_changed, elec_2, gas_1), tmp_path / "full", column_dtypes=COLUMN_DTYPES,
+                        seasons=SEASONS, full=True)
+
+    incremental, full = read_tables(tmp_path / "incremental"), read_tables(tmp_path / "full")
+    for table in TABLES:
+        if table != "dim_date":
+            pd.testing.assert_frame_equal(incremental[table], full[table], check_dtype=False, obj=table)
+    # The calendar is only ever extended, so it still covers E1's old dates
+    assert set(full["dim_date"]["date_key"]) <= set(incremental["dim_date"]["date_key"])
+    assert len(full["fact_step"]) == 5
+    # Only E1's new partition was written and its old one removed; G1's (another utility) was untouched
+    fact_files = [path.relative_to(tmp_path / "incremental").parent.as_posix() for path in result["files"]
+                  if "fact_step" in path.parts]
+    assert fact_files == ["fact_step/utility_type=elec/year=2024/month=01"]
+    assert not (tmp_path / "incremental" / "fact_step" / "utility_type=elec" / "year=2023" / "month=02").exists()
+
+
+def test_refresh_needs_a_built_star_schema(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        refresh_star_schema(gold(invoice("gas", "G1", "2024-07-10", 1)), tmp_path, column_dtypes=COLUMN_DTYPES,
+                            seasons=SEASONS)
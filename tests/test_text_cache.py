@@ -0,0 +1,48 @@
+import os
+import threading
+
+from parse.text_cache import TextCache
+
+
+def fill(cache, count, size=2000):
+    for i in range(count):
+        cache.put(f"{i:064x}", os.urandom(size).hex())
+
+
+def test_evict_keeps_cache_under_budget(tmp_path):
+    cache = TextCache(tmp_path, version="v1", max_bytes=20_000)
+    fill(cache, 20)
+    assert cache.evict() > 0
+    assert sum(path.stat().st_size for path in tmp_path.glob("*/*.txt.gz")) <= 20_000
+
+
+def test_concurrent_evictions_do_not_fail(tmp_path):
+    caches = [TextCache(tmp_path, version="v1", max_bytes=10_000) for _ in range(4)]
+    fill(caches[0], 40)
+    errors = []
+
+    def evict(cache):
+        try:
+            cache.evict()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=evict, args=(cache,)) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sum(path.stat().st_size for path in tmp_path.glob("*/*.txt.gz")) <= 10_000
+
+
+def test_get_survives_entry_evicted_after_read(tmp_path, monkeypatch):
+    cache = TextCache(tmp_path, version="v1")
+    cache.put("ab" * 32, "text")
+
+    def utime(path, *args):
+        os.unlink(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", utime)
+    assert cache.get("ab" * 32) == "text"
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.transform_benchmark import transform_cases
+from transform import data_preprocess, vectorized_preprocess
+
+# Small generated inputs with multi-step invoices, missing and unparseable dates,
+# missing invoice numbers and missing service columns
+CASES = [
+    pytest.param(func_name, build_args, id=f"seed{seed}-{name}")
+    for seed in (0, 1)
+    for name, func_name, build_args in transform_cases(np.random.default_rng(seed), 300)
+]
+
+
+@pytest.mark.parametrize("func_name, build_args", CASES)
+def test_vectorized_engine_matches_legacy(func_name, build_args):
+    expected = getattr(data_preprocess, func_name)(*build_args())
+    actual = getattr(vectorized_preprocess, func_name)(*build_args())
+    if isinstance(expected, pd.Series):
+        pd.testing.assert_series_equal(actual, expected)
+    else:
+        pd.testing.assert_frame_equal(actual, expected)
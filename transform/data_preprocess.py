@@ -1,7 +1,4 @@
 import pandas as pd
-import yaml
-from pathlib import Path
-import pandas as pd
 
 
 def fill_gas_invoice_start_end(df: pd.DataFrame) -> pd.DataFrame:
@@ -87,6 +84,12 @@ def classify_season(date: pd.Timestamp, summer_months: dict) -> str:
     if month >= summer_months["start_month"] or month <= summer_months["end_month"]:
         return "Summer"
     return "Winter"
+
+def classify_season_series(dates: pd.Series, summer_months: dict) -> pd.Series:
+    """
+    Classify every date of a Series with classify_season.
+    """
+    return dates.apply(lambda x: classify_season(x, summer_months))
     
 def fill_missing_service_columns_for_water(df: pd.DataFrame) -> pd.DataFrame:
     """
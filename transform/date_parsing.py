@@ -0,0 +1,153 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Day-first formats tried, in order, when a column has no configured formats
+CANDIDATE_FORMATS = [
+    "%d/%m/%Y",
+    "%d%b%Y",
+    "%d%b%y",
+    "%d %b %Y",
+    "%d %B %Y",
+    "%d-%m-%Y",
+    "%Y-%m-%d",
+    "%d.%m.%Y",
+    "%d/%m/%y",
+]
+
+NULL_VALUES = ["NULL"]
+
+
+def detect_format(values):
+    """The CANDIDATE_FORMATS entry matching most of values (the first on a tie), or None if none matches any."""
+    values = pd.Series(list(values), dtype=object)
+    best_format, best_count = None, 0
+    for date_format in CANDIDATE_FORMATS:
+        count = int(pd.to_datetime(values, format=date_format, errors="coerce").notna().sum())
+        if count > best_count:
+            best_format, best_count = date_format, count
+    return best_format
+
+
+class DateParser:
+    """
+    Parses date columns by distinct value instead of by row.
+
+    Bills repeat a handful of dates across many step rows, so every column is
+    reduced to its unique strings, only the strings not seen before are
+    parsed, and the results are mapped back onto the rows. Parsed values are
+    memoized across columns and utilities for the life of the parser, which
+    can be shared by transforms running on different threads.
+
+    Formats come from the dates.formats config, per utility and optionally
+    per column:
+
+        dates:
+          formats:
+            water: ["%d%b%Y", "%d/%m/%Y"]
+            gas:
+              invoice_date: ["%d%b%Y"]
+
+    Columns without configured formats have theirs detected the first time
+    they are parsed: the CANDIDATE_FORMATS entry matching most of the
+    column's distinct values becomes the column's format (see detected), so
+    an ambiguous day/month column is read one way throughout. Values it does
+    not match are tried against the other candidates in order, and values
+    matching no format fall back to day-first dateutil parsing, like
+    pd.to_datetime(dayfirst=True).
+
+    Example:
+        parser = DateParser(config.get("dates", {}).get("formats", {}))
+        df["invoice_date"] = parser.parse(df["invoice_date"], "water", "invoice_date")
+        print(parser.stats())
+    """
+
+    def __init__(self, formats: dict = None, dayfirst_fallback: bool = True):
+        self.formats = formats or {}
+        self.dayfirst_fallback = dayfirst_fallback
+        self.detected = {}
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def formats_for(self, utility_type: str, column: str):
+        """Return the configured format list for a utility column, or None to detect it."""
+        utility_formats = self.formats.get(utility_type.lower())
+        if isinstance(utility_formats, dict):
+            utility_formats = utility_formats.get(column)
+        return list(utility_formats) if utility_formats else None
+
+    def parse(self, series: pd.Series, utility_type: str, column: str) -> pd.Series:
+        """
+        Parse a column of date strings.
+
+        Parameters:
+            series (pd.Series): Raw values ('NULL' and missing values become NaT)
+            utility_type (str): Utility the column belongs to ('elec', 'gas', 'water')
+            column (str): Column name, used for per-column formats and detection
+
+        Returns:
+            pd.Series: datetime64 Series with the same index and name
+        """
+        values = series.replace(NULL_VALUES, np.nan)
+        codes, uniques = pd.factorize(values.astype(object))
+        uniques = [str(value) for value in uniques]
+
+        with self._lock:
+            formats = self.formats_for(utility_type, column) or self._detected_formats(uniques, utility_type, column)
+            # Values are cached per format list: the same string may mean another date in another column
+            cache = self._cache.setdefault(tuple(formats), {})
+            pending = [value for value in uniques if value not in cache]
+            self.hits += len(uniques) - len(pending)
+            self.misses += len(pending)
+            if pending:
+                cache.update(self._parse_unique(pending, formats))
+            parsed_uniques = pd.DatetimeIndex([cache[value] for value in uniques] + [pd.NaT])
+        # factorize marks missing values with -1, which takes the trailing NaT
+        result = parsed_uniques.take(np.where(codes < 0, len(uniques), codes))
+        return pd.Series(result, index=series.index, name=series.name)
+
+    def _detected_formats(self, values, utility_type, column):
+        """Candidate formats for an unconfigured column, its detected format first (detected on first sight)."""
+        key = (utility_type.lower(), column)
+        if key not in self.detected:
+            detected = detect_format(values)
+            if detected is None:
+                # Nothing to go by yet (e.g. an all-NULL column); detect again next time
+                return CANDIDATE_FORMATS
+            self.detected[key] = detected
+        detected = self.detected[key]
+        return [detected] + [date_format for date_format in CANDIDATE_FORMATS if date_format != detected]
+
+    def _parse_unique(self, values, formats):
+        """Parse distinct strings with the first of formats that matches each. Returns {value: Timestamp or NaT}."""
+        remaining = pd.Series(values, dtype=object)
+        parsed = {}
+
+        for date_format in formats:
+            if remaining.empty:
+                break
+            attempt = pd.to_datetime(remaining, format=date_format, errors="coerce")
+            matched = attempt.notna()
+            parsed.update(zip(remaining[matched], attempt[matched]))
+            remaining = remaining[~matched]
+
+        if not remaining.empty and self.dayfirst_fallback:
+            fallback = pd.to_datetime(remaining, format="mixed", dayfirst=True, errors="coerce")
+            parsed.update(zip(remaining, fallback))
+        else:
+            parsed.update(dict.fromkeys(remaining, pd.NaT))
+
+        return parsed
+
+    def stats(self) -> dict:
+        """Return the cache counters: distinct values served from the cache (hits) and parsed (misses)."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "cached_values": sum(len(cache) for cache in self._cache.values()),
+        }
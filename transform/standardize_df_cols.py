@@ -1,7 +1,5 @@
 import numpy as np
 import pandas as pd
-import yaml
-from pathlib import Path
 
 def standardize_column_names(df, final_labels):
     # Add missing columns with NaN
@@ -30,7 +28,7 @@ def parse_water_dates(series: pd.Series) -> pd.Series:
     return parsed
 
 
-def standardize_column_datatypes(df: pd.DataFrame, column_dtypes: dict, utility_type: str) -> pd.DataFrame:
+def standardize_column_datatypes(df: pd.DataFrame, column_dtypes: dict, utility_type: str, date_parser=None) -> pd.DataFrame:
     """
     Standardize a DataFrame by converting columns to the datatypes
     defined in column_dtypes. Handles water utility dates separately.
@@ -39,6 +37,8 @@ def standardize_column_datatypes(df: pd.DataFrame, column_dtypes: dict, utility_
         df (pd.DataFrame): Input DataFrame
         column_dtypes (dict): Mapping of column names to target dtypes
         utility_type (str): Type of utility ('Water', 'Electricity', 'Gas')
+        date_parser (DateParser): Optional memoized parser (transform/date_parsing.py)
+            used for every datetime column instead of pd.to_datetime
 
     Returns:
         pd.DataFrame: Standardized DataFrame
@@ -49,7 +49,9 @@ def standardize_column_datatypes(df: pd.DataFrame, column_dtypes: dict, utility_
         if col in df.columns:
 
             if dtype == "datetime":
-                if utility_type.lower() == "water" and col in ["invoice_date", "invoice_start", "invoice_end", "step_start", "step_end"]:
+                if date_parser is not None:
+                    df[col] = date_parser.parse(df[col], utility_type, col)
+                elif utility_type.lower() == "water" and col in ["invoice_date", "invoice_start", "invoice_end", "step_start", "step_end"]:
                     df[col] = parse_water_dates(df[col])
                 else:
                     # electricity/gas: infer format
@@ -59,4 +61,99 @@ def standardize_column_datatypes(df: pd.DataFrame, column_dtypes: dict, utility_
             elif dtype in ["float", "int"]:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
 
-    return df
\ No newline at end of file
+    return df
+
+# Smallest nullable integer dtypes tried, in order, by optimize_column_dtypes
+NULLABLE_INT_DTYPES = ("Int16", "Int32", "Int64")
+
+# Text columns with few distinct values per row, stored as categoricals by default
+CATEGORICAL_COLUMNS = ("utility_type", "season", "invoice_number")
+
+# Text astype(str) gives missing values on pandas < 3; read back as missing by optimize_column_dtypes
+MISSING_TEXT = ("nan", "NaN", "None", "<NA>", "NaT")
+
+
+def _smallest_int_dtype(numbers: pd.Series):
+    """The smallest nullable integer dtype holding every value of numbers, or None if some value is fractional."""
+    values = numbers.dropna()
+    if not (values == values.round()).all():
+        return None
+    if values.empty:
+        return NULLABLE_INT_DTYPES[0]
+    low, high = values.min(), values.max()
+    for dtype in NULLABLE_INT_DTYPES:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return dtype
+    return None
+
+
+def optimize_column_dtypes(df: pd.DataFrame, column_dtypes: dict, categorical_columns=CATEGORICAL_COLUMNS,
+                           downcast_floats: bool = False) -> pd.DataFrame:
+    """
+    Store a standardized DataFrame in compact dtypes:
+    - categorical_columns become categoricals (repeated text is stored once)
+    - int columns become the smallest nullable integer dtype that holds them
+      (Int16, Int32 or Int64) instead of float64
+    - float columns become float32 when downcast_floats is set; float32 keeps
+      about 7 significant digits, so it is off by default for money values
+
+    Values are unchanged (missing values stay missing), so layers written
+    from the optimized frame are identical. Missing values that
+    standardize_column_datatypes turned into the text 'nan' or 'None'
+    (astype(str) on pandas < 3) become missing again instead of categories.
+
+    Parameters:
+        df (pd.DataFrame): Standardized DataFrame
+        column_dtypes (dict): Mapping of column names to target dtypes
+        categorical_columns (iterable): Text columns to store as categoricals
+        downcast_floats (bool): Store float columns as float32
+
+    Returns:
+        pd.DataFrame: DataFrame with compact dtypes
+    """
+    df = df.copy()
+    for col in categorical_columns:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            values = df[col].mask(df[col].isin(MISSING_TEXT))
+            df[col] = values.astype("category")
+
+    for col, dtype in column_dtypes.items():
+        if col not in df.columns:
+            continue
+        if dtype == "int":
+            numbers = pd.to_numeric(df[col], errors="coerce")
+            int_dtype = _smallest_int_dtype(numbers)
+            if int_dtype is not None:
+                df[col] = numbers.astype(int_dtype)
+        elif dtype == "float" and downcast_floats:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    return df
+
+
+def concat_optimized(frames) -> pd.DataFrame:
+    """
+    Concatenate optimized DataFrames, keeping their categorical columns
+    categorical. pd.concat falls back to plain text when the categories of
+    the frames differ, so the categories are unioned first.
+    """
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    categorical = [col for col in frames[0].columns
+                   if all(col in frame and isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames)]
+    if categorical:
+        frames = [frame.copy() for frame in frames]
+        for col in categorical:
+            first, *rest = (frame[col].cat.categories for frame in frames)
+            categories = first.append(rest).unique().sort_values()
+            for frame in frames:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def bytes_per_row(df: pd.DataFrame) -> float:
+    """Memory used by a DataFrame per row, including the text held by string and object columns."""
+    if not len(df):
+        return 0.0
+    return df.memory_usage(deep=True, index=False).sum() / len(df)
@@ -0,0 +1,143 @@
+"""
+Vectorized versions of the transforms in transform/data_preprocess.py.
+
+Each function has the same name, arguments and output as its counterpart,
+but runs whole-column operations instead of per-row or per-group Python
+code, and updates the DataFrame in place (returning it for chaining)
+instead of copying it. Select them with transform.engine: vectorized.
+tests/test_vectorized_preprocess.py checks both implementations agree.
+"""
+import numpy as np
+import pandas as pd
+
+
+def fill_gas_invoice_start_end(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fill 'invoice_start' and 'invoice_end' based on earliest and latest
+    'step_start' and 'step_end' per invoice_number **but preserve original
+    string formats** of the step columns.
+
+    Uses one groupby().idxmin / idxmax over the parsed dates instead of a
+    Python lambda per invoice. Modifies df in place.
+
+    Parameters:
+        df (pd.DataFrame): Must have ['invoice_number', 'step_start', 'step_end', 'invoice_start', 'invoice_end']
+
+    Returns:
+        pd.DataFrame: The same df with 'invoice_start' and 'invoice_end' filled
+    """
+    # Temporary datetime copies for computation
+    step_start_temp = pd.to_datetime(df['step_start'], errors='coerce', dayfirst=True)
+    step_end_temp = pd.to_datetime(df['step_end'], errors='coerce', dayfirst=True)
+
+    # Row labels of the earliest step_start and latest step_end per invoice_number
+    idx_start = step_start_temp.groupby(df['invoice_number']).idxmin()
+    idx_end = step_end_temp.groupby(df['invoice_number']).idxmax()
+
+    # Original strings at those rows, keyed by invoice_number
+    first_start = pd.Series(df['step_start'].loc[idx_start.to_numpy()].to_numpy(), index=idx_start.index)
+    last_end = pd.Series(df['step_end'].loc[idx_end.to_numpy()].to_numpy(), index=idx_end.index)
+
+    df['invoice_start'] = df['invoice_number'].map(first_start)
+    df['invoice_end'] = df['invoice_number'].map(last_end)
+
+    return df
+
+
+def clean_gas_season(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Removes the 'Total' prefix from the 'season' column in the gas dataframe.
+    e.g. 'TotalWinter' -> 'Winter', 'TotalSummer' -> 'Summer'
+
+    Modifies df in place.
+
+    Parameters:
+        df (pd.DataFrame): DataFrame with a 'season' column
+
+    Returns:
+        pd.DataFrame: The same df with cleaned 'season' values
+    """
+    df['season'] = df['season'].str.replace(r'^Total', '', regex=True).str.strip()
+    return df
+
+
+def fill_electricity_step_fields(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fills step_number, step_start, and step_end for electricity invoices.
+    - step_number is always 1
+    - step_start = invoice_start
+    - step_end = invoice_end
+
+    Modifies df in place.
+
+    Parameters:
+        df (pd.DataFrame): DataFrame with columns
+            ['invoice_start', 'invoice_end', 'step_start', 'step_end', 'step_number']
+
+    Returns:
+        pd.DataFrame: The same df
+    """
+    df['step_number'] = 1
+    df['step_start'] = df['invoice_start']
+    df['step_end'] = df['invoice_end']
+    return df
+
+
+def classify_season_series(dates: pd.Series, summer_months: dict) -> pd.Series:
+    """
+    Classify a Series of dates into Lumo Energy's gas billing seasons
+    using month masks instead of calling classify_season per row.
+    - Season 1 (Summer): start_month → end_month (wraps year)
+    - Season 2 (Winter): all other months
+    Missing dates map to None.
+    """
+    month = dates.dt.month
+    # Summer wraps the year: e.g., Oct (10) → May (5)
+    is_summer = (month >= summer_months["start_month"]) | (month <= summer_months["end_month"])
+
+    seasons = np.where(is_summer, "Summer", "Winter").astype(object)
+    seasons[dates.isna().to_numpy()] = None
+    return pd.Series(seasons, index=dates.index, name=dates.name)
+
+
+def fill_missing_service_columns_for_water(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ensure 'service_days', 'service_rate', 'service_charge' columns exist,
+    and fill them with 0 if missing or NaN.
+
+    Modifies df in place.
+
+    Parameters:
+        df (pd.DataFrame)
+
+    Returns:
+        pd.DataFrame: The same df with the columns filled
+    """
+    service_cols = ["service_days", "service_rate", "service_charge"]
+
+    for col in service_cols:
+        if col not in df.columns:
+            df[col] = 0
+        else:
+            df[col] = df[col].fillna(0)
+
+    return df
+
+
+def fill_water_step_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    For water_df, fill missing step_start and step_end dates
+    with invoice_start and invoice_end respectively.
+
+    Modifies df in place.
+
+    Parameters:
+        df (pd.DataFrame): Water dataframe with columns
+            ['invoice_start', 'invoice_end', 'step_start', 'step_end', ...]
+
+    Returns:
+        pd.DataFrame: The same df with step_start and step_end filled
+    """
+    df["step_start"] = df["step_start"].fillna(df["invoice_start"])
+    df["step_end"] = df["step_end"].fillna(df["invoice_end"])
+    return df
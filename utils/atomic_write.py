@@ -0,0 +1,36 @@
+import os
+import threading
+from pathlib import Path
+
+
+def atomic_write_bytes(path, data: bytes) -> None:
+    """
+    Write data to path through a temporary file and an atomic rename, so
+    readers and interrupted runs see either the previous file or the whole
+    new one, never a partial write.
+
+    The temporary file (.<name>.<pid>.<thread>.tmp, next to path) is fsynced
+    before the rename and removed if the write fails. The parent folder is
+    created if needed.
+
+    Parameters:
+        path (str | Path): File to write
+        data (bytes): Complete new contents
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_text(path, text: str, encoding: str = "utf-8") -> None:
+    """Write text to path atomically (atomic_write_bytes), encoded with encoding."""
+    atomic_write_bytes(path, text.encode(encoding))